@@ -0,0 +1,9 @@
+"""
+Benchmark harness for the backend API.
+
+Seeds a database with realistic users, posts and tags, drives the real
+FastAPI app in-process through scenarios (listing, create, update, login
+storm, export, ...) and writes p50/p95/p99 latency and throughput to a
+JSON file so runs can be compared between commits. See ``python -m bench
+--help`` and the Benchmarks section of the README.
+"""
@@ -0,0 +1,150 @@
+"""
+Command line entry point.
+
+    python -m bench run [--database-url URL] [--users N] [--posts N] ...
+    python -m bench compare OLD.json NEW.json [--threshold 0.1]
+    python -m bench serialization [--posts N]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+
+def _parse(argv):
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="seed a database and run scenarios against the API")
+    run.add_argument(
+        "--database-url",
+        help="database to seed and serve from (default: a fresh SQLite file). "
+             "Postgres databases must be empty unless --reset is given",
+    )
+    run.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    run.add_argument("--base-url", help="benchmark a running server instead of the app in-process")
+    run.add_argument("--users", type=int, default=1000)
+    run.add_argument("--posts", type=int, default=10000)
+    run.add_argument("--scenarios", default="all", help="comma-separated names, or 'all'")
+    run.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    run.add_argument("--concurrency", type=int, default=10)
+    run.add_argument("--warmup", type=int, default=20)
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--out", help="results file (default: bench-results/<timestamp>.json)")
+
+    compare = commands.add_parser("compare", help="diff two results files")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=0.10, help="regression threshold (default 0.10)")
+
+    serialization = commands.add_parser("serialization", help="time listing serialization and compression")
+    serialization.add_argument("--posts", type=int, default=1000)
+    serialization.add_argument("--repeat", type=int, default=5, help="best of this many runs")
+    return parser.parse_args(argv)
+
+
+async def _run(args) -> dict:
+    # App modules read their configuration at import time.
+    import httpx
+    from sqlalchemy import func, select
+
+    import models
+    from bench.datagen import seed
+    from bench.runner import SCENARIOS, metadata, run
+    from database import Base, async_engine, engine, init_db
+    from utils import password_hasher
+
+    names = list(SCENARIOS) if args.scenarios == "all" else args.scenarios.split(",")
+    unknown = set(names) - SCENARIOS.keys()
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}. Choose from {', '.join(SCENARIOS)}.")
+
+    if args.reset:
+        Base.metadata.drop_all(bind=engine)
+    init_db()
+    with engine.connect() as connection:
+        if connection.scalar(select(func.count()).select_from(models.User)):
+            sys.exit("The database already has users; pass --reset to start from an empty schema.")
+
+    print(f"Seeding {args.users} users / {args.posts} posts on {engine.dialect.name}...", file=sys.stderr)
+    dataset = seed(engine, args.users, args.posts, seed=args.seed)
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        from main import app
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    try:
+        async with client:
+            results = await run(
+                client, dataset, names, args.requests, args.concurrency, warmup=args.warmup, seed=args.seed,
+            )
+    finally:
+        password_hasher.shutdown()
+        await async_engine.dispose()
+
+    return {
+        "meta": metadata(
+            database=engine.dialect.name, users=args.users, posts=args.posts, seed=args.seed,
+            requests=args.requests, concurrency=args.concurrency,
+            target=args.base_url or "in-process",
+        ),
+        "scenarios": results,
+    }
+
+
+def main(argv=None) -> None:
+    args = _parse(argv)
+
+    if args.command == "compare":
+        from bench.report import compare, load
+
+        lines, regressions = compare(load(args.old), load(args.new), args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            sys.exit(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: " + "; ".join(regressions))
+        return
+
+    if args.command == "serialization":
+        from bench.serialization import run as run_serialization
+
+        result = run_serialization(args.posts, args.repeat)
+        print(
+            f"serialize {result['posts']} posts: stdlib {result['stdlib_ms']:.1f} ms, "
+            f"pydantic {result['pydantic_ms']:.1f} ms, orjson {result['orjson_ms']:.1f} ms; "
+            f"payload {result['raw_bytes']} B raw, {result['gzip_bytes']} B gzip"
+        )
+        return
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+    # Measure the app, not the limiter; export RATE_LIMIT_ENABLED=true to include it.
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    report = asyncio.run(_run(args))
+
+    out = args.out or os.path.join("bench-results", f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'scenario':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'errors':>8}")
+    for name, result in report["scenarios"].items():
+        print(
+            f"{name:<14}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+            f"{result['throughput_rps']:>10.1f}{result['errors']:>8}"
+        )
+    print(f"\nSaved {out}")
+
+
+if __name__ == "__main__":
+    main()
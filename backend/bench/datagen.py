@@ -0,0 +1,120 @@
+"""
+Deterministic data generator.
+
+Everything is derived from one seed, so two runs with the same arguments
+produce the same journal. Rows are written with batched INSERTs through
+the models and then put through the same tag linking and stats rebuild
+the app uses, so the database looks like one the API had built.
+"""
+
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models import Post, Prompt, User
+from stats import rebuild_all_stats
+from tags import link_tags
+from utils import hash_password
+
+BENCH_PASSWORD = "bench-password"
+BATCH_SIZE = 1000
+HISTORY_DAYS = 730
+
+MOODS = ["great", "good", "okay", "low", "difficult", None]
+TAGS = [
+    "work", "family", "gratitude", "sleep", "exercise", "travel", "reading",
+    "friends", "health", "anxiety", "music", "cooking", "nature", "goals",
+    "therapy", "weekend", "school", "money", "creativity", "rest",
+]
+_TEXT = (
+    "today felt slower than usual and I noticed how much lighter the morning was "
+    "after a walk with coffee I kept thinking about the conversation from last week "
+    "work was busy but the team meeting went better than I expected I am grateful "
+    "for small things like the sun on the kitchen table and a quiet evening reading "
+    "I want to sleep earlier and stop scrolling before bed tomorrow I will try again"
+)
+WORDS = _TEXT.split()
+
+
+@dataclass
+class Dataset:
+    """What the scenarios need to know about the seeded data."""
+
+    user_ids: list[int]
+    emails: dict[int, str]
+    post_ids: dict[int, list[int]] = field(default_factory=dict)
+
+
+def _content(rng: random.Random) -> str:
+    sentences = []
+    for _ in range(rng.randint(2, 12)):
+        words = rng.choices(WORDS, k=rng.randint(8, 24))
+        sentences.append(" ".join(words).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def seed(engine: Engine, users: int, posts: int, seed: int = 42) -> Dataset:
+    """
+    Create `users` users (all with BENCH_PASSWORD) and `posts` posts spread
+    over them with a long-tail distribution, a few prolific writers and
+    many occasional ones, over the last HISTORY_DAYS days.
+    """
+    rng = random.Random(seed)
+    # bcrypt is deliberately slow; one hash shared by everyone keeps seeding fast.
+    hashed = hash_password(BENCH_PASSWORD)
+    today = date.today()
+
+    with Session(engine) as db:
+        prompt_ids = db.scalars(select(Prompt.id)).all()
+        if not prompt_ids:
+            prompt_ids = db.execute(insert(Prompt).returning(Prompt.id), [
+                {"content": f"Bench prompt {i}", "date_created": today} for i in range(20)
+            ]).scalars().all()
+
+        user_ids: list[int] = []
+        emails: dict[int, str] = {}
+        for start in range(0, users, BATCH_SIZE):
+            rows = [
+                {
+                    "username": f"bench{n}", "email": f"bench{n}@example.com",
+                    "first_name": "Bench", "last_name": str(n), "hashed_password": hashed,
+                }
+                for n in range(start, min(start + BATCH_SIZE, users))
+            ]
+            ids = db.execute(insert(User).returning(User.id, sort_by_parameter_order=True), rows).scalars().all()
+            user_ids.extend(ids)
+            emails.update(zip(ids, (row["email"] for row in rows)))
+
+        weights = [1 / (rank + 1) for rank in range(len(user_ids))]
+        owners = rng.choices(user_ids, weights=weights, k=posts) if user_ids else []
+        dataset = Dataset(user_ids=user_ids, emails=emails)
+        for start in range(0, posts, BATCH_SIZE):
+            batch = owners[start:start + BATCH_SIZE]
+            rows, names = [], []
+            for owner_id in batch:
+                post_tags = rng.sample(TAGS, k=rng.choice([0, 1, 1, 2, 3]))
+                names.append(post_tags)
+                rows.append({
+                    "owner_id": owner_id,
+                    "content": _content(rng),
+                    "mood": rng.choice(MOODS),
+                    "privacy": "private",
+                    "tags": ",".join(post_tags) or None,
+                    "prompt_id": rng.choice(prompt_ids) if rng.random() < 0.3 else None,
+                    "date_posted": today - timedelta(days=int(rng.expovariate(1 / 120)) % HISTORY_DAYS),
+                })
+            ids = db.execute(insert(Post).returning(Post.id, sort_by_parameter_order=True), rows).scalars().all()
+            by_owner: dict[int, list[tuple[int, list[str]]]] = {}
+            for owner_id, post_id, post_tag_names in zip(batch, ids, names):
+                dataset.post_ids.setdefault(owner_id, []).append(post_id)
+                by_owner.setdefault(owner_id, []).append((post_id, post_tag_names))
+            for owner_id, post_names in by_owner.items():
+                link_tags(db, owner_id, post_names)
+            db.commit()
+
+        rebuild_all_stats(db, only_missing=True)
+    return dataset
@@ -0,0 +1,36 @@
+"""
+Comparing result files. Kept free of app imports so it runs without a
+database configured.
+"""
+
+import json
+
+# Larger is better for these; for everything else (latencies) smaller is.
+HIGHER_IS_BETTER = {"throughput_rps"}
+COMPARED = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+
+def compare(old: dict, new: dict, threshold: float) -> tuple[list[str], list[str]]:
+    """
+    Compare two result files. Returns (report lines, regressions), where a
+    regression is any compared metric that got worse by more than
+    `threshold` (a fraction, e.g. 0.1 for 10%).
+    """
+    lines = [f"{'scenario':<14}{'metric':<16}{'old':>12}{'new':>12}{'change':>10}"]
+    regressions = []
+    for name in sorted(old["scenarios"].keys() & new["scenarios"].keys()):
+        for metric in COMPARED:
+            before, after = old["scenarios"][name][metric], new["scenarios"][name][metric]
+            change = (after - before) / before if before else 0.0
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = ""
+            if worse > threshold:
+                flag = "  !"
+                regressions.append(f"{name} {metric} {change:+.1%}")
+            lines.append(f"{name:<14}{metric:<16}{before:>12.2f}{after:>12.2f}{change:>+10.1%}{flag}")
+    return lines, regressions
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,190 @@
+"""
+Scenarios and the load loop.
+
+Each scenario issues one API call per iteration. A run keeps
+`concurrency` iterations in flight until `requests` have completed, then
+reports latency percentiles, throughput and status codes.
+"""
+
+import asyncio
+import math
+import platform
+import random
+import subprocess
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+import httpx
+
+from bench.datagen import BENCH_PASSWORD, MOODS, TAGS, WORDS, Dataset
+from routers.auth import create_access_token
+
+
+@dataclass
+class Context:
+    client: httpx.AsyncClient
+    dataset: Dataset
+    rng: random.Random
+    tokens: dict[int, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.writers = list(self.dataset.post_ids) or self.dataset.user_ids
+
+    def writer(self) -> int:
+        """A user who has posts."""
+        return self.rng.choice(self.writers)
+
+    def headers(self, user_id: int) -> dict[str, str]:
+        # Minted once per user so the client side doesn't add signing time.
+        token = self.tokens.get(user_id)
+        if token is None:
+            token = self.tokens[user_id] = create_access_token({"sub": str(user_id)})
+        return {"Authorization": f"Bearer {token}"}
+
+
+Scenario = Callable[[Context], Awaitable[httpx.Response]]
+
+
+async def list_posts(ctx: Context) -> httpx.Response:
+    return await ctx.client.get("/api/posts/", params={"limit": 50}, headers=ctx.headers(ctx.writer()))
+
+
+async def list_by_tag(ctx: Context) -> httpx.Response:
+    return await ctx.client.get(
+        "/api/posts/", params={"limit": 50, "tag": ctx.rng.choice(TAGS)}, headers=ctx.headers(ctx.writer())
+    )
+
+
+async def me(ctx: Context) -> httpx.Response:
+    return await ctx.client.get("/api/auth/me", headers=ctx.headers(ctx.writer()))
+
+
+async def create(ctx: Context) -> httpx.Response:
+    return await ctx.client.post("/api/posts/", json={
+        "content": " ".join(ctx.rng.choices(WORDS, k=80)),
+        "mood": ctx.rng.choice(MOODS),
+        "tags": ",".join(ctx.rng.sample(TAGS, k=2)),
+    }, headers=ctx.headers(ctx.writer()))
+
+
+async def update(ctx: Context) -> httpx.Response:
+    owner_id = ctx.writer()
+    post_id = ctx.rng.choice(ctx.dataset.post_ids[owner_id])
+    return await ctx.client.put(
+        f"/api/posts/{post_id}", json={"mood": ctx.rng.choice(MOODS)}, headers=ctx.headers(owner_id)
+    )
+
+
+async def login(ctx: Context) -> httpx.Response:
+    email = ctx.dataset.emails[ctx.rng.choice(ctx.dataset.user_ids)]
+    return await ctx.client.post("/api/auth/login", json={"email": email, "password": BENCH_PASSWORD})
+
+
+async def summary(ctx: Context) -> httpx.Response:
+    return await ctx.client.get("/api/analytics/summary", headers=ctx.headers(ctx.writer()))
+
+
+async def search(ctx: Context) -> httpx.Response:
+    return await ctx.client.get(
+        "/api/posts/search", params={"q": ctx.rng.choice(WORDS)}, headers=ctx.headers(ctx.writer())
+    )
+
+
+async def export(ctx: Context) -> httpx.Response:
+    return await ctx.client.get("/api/posts/export", headers=ctx.headers(ctx.writer()))
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "list": list_posts,
+    "list_by_tag": list_by_tag,
+    "me": me,
+    "create": create,
+    "update": update,
+    "login": login,
+    "summary": summary,
+    "search": search,
+    "export": export,
+}
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+async def run_scenario(ctx: Context, scenario: Scenario, requests: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    issued = 0
+
+    async def worker() -> None:
+        nonlocal issued
+        while issued < requests:
+            issued += 1
+            start = time.perf_counter()
+            try:
+                response = await scenario(ctx)
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as exc:
+                statuses[type(exc).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": sum(count for status, count in statuses.items() if not status.startswith(("2", "3"))),
+        "status_codes": dict(statuses),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "max_ms": round(ms[-1], 3) if ms else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+async def run(
+    client: httpx.AsyncClient,
+    dataset: Dataset,
+    scenarios: list[str],
+    requests: int,
+    concurrency: int,
+    warmup: int = 10,
+    seed: int = 42,
+) -> dict[str, dict]:
+    results = {}
+    tokens: dict[int, str] = {}
+    for name in scenarios:
+        ctx = Context(client=client, dataset=dataset, rng=random.Random(seed), tokens=tokens)
+        if warmup:
+            await run_scenario(ctx, SCENARIOS[name], warmup, min(concurrency, warmup))
+        results[name] = await run_scenario(ctx, SCENARIOS[name], requests, concurrency)
+    return results
+
+
+def metadata(**settings) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        **settings,
+    }
@@ -0,0 +1,63 @@
+"""
+Serialization and compression micro-benchmark.
+
+Times a post listing through the stdlib path (jsonable_encoder +
+json.dumps, what a custom response class forces), FastAPI's response_model
+path (pydantic's Rust serializer) and orjson, and reports the bytes on the
+wire with and without gzip. Wall-clock numbers like these vary with the
+machine, so they're reported rather than asserted.
+"""
+
+import gzip
+import json
+import time
+from datetime import date
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from compression import GZIP_COMPRESSLEVEL
+from schemas import PostOutWithUser
+
+
+def listing(n: int) -> list[PostOutWithUser]:
+    owner = {"id": 1, "username": "writer", "first_name": "Wren", "last_name": "Iter", "email": "w@example.com"}
+    return [
+        PostOutWithUser(
+            id=i,
+            content=f"Entry {i}. " + "Today I noticed how the light moved across the kitchen table. " * 12,
+            date_posted=date(2024, 1, 1 + i % 28),
+            mood="good",
+            privacy="private",
+            tags="gratitude,home",
+            owner_id=1,
+            owner=owner,
+            prompt={"id": 3, "content": "What brought you joy today?", "date_created": date(2024, 1, 1)},
+            prompt_id=3,
+        )
+        for i in range(n)
+    ]
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(posts: int = 1000, repeat: int = 5) -> dict:
+    items = listing(posts)
+    adapter = TypeAdapter(list[PostOutWithUser])
+    raw = adapter.dump_json(items)
+    return {
+        "posts": posts,
+        "stdlib_ms": best_of(lambda: json.dumps(jsonable_encoder(items)).encode(), repeat) * 1000,
+        "pydantic_ms": best_of(lambda: adapter.dump_json(items), repeat) * 1000,
+        "orjson_ms": best_of(lambda: orjson.dumps(adapter.dump_python(items, mode="json")), repeat) * 1000,
+        "raw_bytes": len(raw),
+        "gzip_bytes": len(gzip.compress(raw, compresslevel=GZIP_COMPRESSLEVEL)),
+    }
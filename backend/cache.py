@@ -0,0 +1,383 @@
+"""
+Caches with a common interface and pluggable storage.
+
+Every cache is bound to a namespace and has a default TTL; ``set`` may
+shorten an entry's lifetime but never extend it. Three implementations:
+
+- ``TTLCache``: an in-process LRU. Each worker keeps its own copy, so
+  only cache things here that are safe to serve slightly stale until their
+  TTL runs out, or that never change (e.g. a verified token's subject).
+- ``SQLiteCache``: a table in a SQLite file every worker on the host opens.
+  Works offline and is what the tests use for the shared behaviour.
+- ``RedisCache``: the same over Redis, for workers on several hosts.
+  Needs the optional ``redis`` package.
+
+The shared ones make a write in one worker visible to all of them:
+``delete`` drops one key everywhere, and ``invalidate`` bumps the
+namespace's version stamp. Entries are tagged with the version current when
+they were written and only read back while it still matches, so one
+increment retires a whole namespace without scanning it.
+
+Shared stores hold values as JSON, never pickles: anything that can write
+to the SQLite file or the Redis server could otherwise run code in every
+worker that reads it back. Values must therefore be JSON-serializable, and
+tuples come back as lists. Their I/O is blocking, so async code goes
+through ``aget``/``aset``/``adelete``, which run it in a worker thread.
+
+``make_cache`` picks the implementation from CACHE_BACKEND.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+try:
+    import redis
+except ImportError:  # optional: pip install redis
+    redis = None
+
+# local | sqlite | redis. CACHE_URL is the SQLite file path or the Redis URL.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local").lower()
+CACHE_URL = os.getenv("CACHE_URL", "")
+# Shared stores drop expired rows on roughly one write in this many.
+CACHE_PRUNE_EVERY = 256
+
+_MISSING = object()
+
+
+class Cache(ABC):
+    """Interface every cache implements."""
+
+    namespace: str
+    ttl: float
+
+    @abstractmethod
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None:
+        ...
+
+    @abstractmethod
+    def invalidate(self) -> None:
+        """Retire every entry in the namespace, in every worker that shares it."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Invalidate and also reset this process's hit/miss counters."""
+
+    @abstractmethod
+    def stats(self) -> dict[str, int]:
+        ...
+
+    async def aget(self, key: Hashable, default: Any = None) -> Any:
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def aset(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    async def adelete(self, key: Hashable) -> None:
+        await asyncio.to_thread(self.delete, key)
+
+    def _lifetime(self, ttl: float | None) -> float:
+        return self.ttl if ttl is None else min(ttl, self.ttl)
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def _loads(blob: bytes) -> Any:
+    return json.loads(blob)
+
+
+class TTLCache(Cache):
+    """Thread-safe LRU cache whose entries also expire after a TTL."""
+
+    def __init__(
+        self, maxsize: int, ttl: float, timer: Callable[[], float] = time.monotonic, namespace: str = ""
+    ):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._timer = timer
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > self._timer():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Store `value`; `ttl` may shorten (never extend) the default lifetime."""
+        lifetime = self._lifetime(ttl)
+        if lifetime <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self._timer() + lifetime, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    # In memory, so not worth a thread hop.
+    async def aget(self, key: Hashable, default: Any = None) -> Any:
+        return self.get(key, default)
+
+    async def aset(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        self.set(key, value, ttl)
+
+    async def adelete(self, key: Hashable) -> None:
+        self.delete(key)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+_SQLITE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        expires_at REAL NOT NULL,
+        value BLOB NOT NULL,
+        PRIMARY KEY (namespace, key)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (namespace, expires_at)",
+    """
+    CREATE TABLE IF NOT EXISTS cache_versions (
+        namespace TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+    """,
+]
+
+_CURRENT_VERSION = "coalesce((SELECT version FROM cache_versions WHERE namespace = :ns), 0)"
+
+
+class SQLiteCache(Cache):
+    """
+    Cache kept in a SQLite file shared by every worker on the host. Keys are
+    stored by repr() so 1 and "1" stay distinct; values are JSON.
+    """
+
+    def __init__(
+        self, path: str, namespace: str, maxsize: int, ttl: float, timer: Callable[[], float] = time.time
+    ):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Expiry times are compared across processes, so this must be wall-clock time.
+        self._timer = timer
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SQLITE_DDL:
+            self._db.execute(statement)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            row = self._db.execute(
+                f"""
+                SELECT value FROM cache_entries
+                WHERE namespace = :ns AND key = :key AND expires_at > :now
+                  AND version = {_CURRENT_VERSION}
+                """,
+                {"ns": self.namespace, "key": repr(key), "now": self._timer()},
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return _loads(row[0])
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        lifetime = self._lifetime(ttl)
+        if lifetime <= 0 or self.maxsize <= 0:
+            return
+        blob = _dumps(value)
+        with self._lock:
+            now = self._timer()
+            self._db.execute(
+                f"""
+                INSERT OR REPLACE INTO cache_entries (namespace, key, version, expires_at, value)
+                VALUES (:ns, :key, {_CURRENT_VERSION}, :expires_at, :value)
+                """,
+                {"ns": self.namespace, "key": repr(key), "expires_at": now + lifetime, "value": blob},
+            )
+            self._writes += 1
+            if self._writes % CACHE_PRUNE_EVERY == 0:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        """Drop expired and retired rows, then the soonest-expiring beyond maxsize."""
+        params = {"ns": self.namespace, "now": now, "maxsize": self.maxsize}
+        self._db.execute(
+            f"""
+            DELETE FROM cache_entries
+            WHERE namespace = :ns AND (expires_at <= :now OR version != {_CURRENT_VERSION})
+            """,
+            params,
+        )
+        self._db.execute(
+            """
+            DELETE FROM cache_entries WHERE namespace = :ns AND key IN (
+                SELECT key FROM cache_entries WHERE namespace = :ns
+                ORDER BY expires_at DESC LIMIT -1 OFFSET :maxsize
+            )
+            """,
+            params,
+        )
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, repr(key))
+            )
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO cache_versions (namespace, version) VALUES (?, 1)
+                ON CONFLICT (namespace) DO UPDATE SET version = version + 1
+                """,
+                (self.namespace,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            size = self._db.execute(
+                f"SELECT count(*) FROM cache_entries WHERE namespace = :ns AND version = {_CURRENT_VERSION}",
+                {"ns": self.namespace},
+            ).fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+# Resolve the namespace version and the entry in one round trip.
+_REDIS_GET = """
+local version = redis.call('GET', KEYS[1]) or '0'
+return redis.call('GET', KEYS[2] .. version .. ':' .. ARGV[1])
+"""
+_REDIS_SET = """
+local version = redis.call('GET', KEYS[1]) or '0'
+return redis.call('SET', KEYS[2] .. version .. ':' .. ARGV[1], ARGV[2], 'PX', ARGV[3])
+"""
+_REDIS_DELETE = """
+local version = redis.call('GET', KEYS[1]) or '0'
+return redis.call('DEL', KEYS[2] .. version .. ':' .. ARGV[1])
+"""
+
+
+class RedisCache(Cache):
+    """
+    Cache kept in Redis, shared by every worker that points at the same
+    server. Redis evicts by TTL and its own maxmemory policy, so there is
+    no maxsize here.
+    """
+
+    def __init__(self, url: str, namespace: str, ttl: float, prefix: str = "luma"):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis needs the redis package: pip install redis")
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._client = redis.Redis.from_url(url)
+        self._version_key = f"{prefix}:{namespace}:version"
+        self._entry_prefix = f"{prefix}:{namespace}:v"
+        self._get = self._client.register_script(_REDIS_GET)
+        self._set = self._client.register_script(_REDIS_SET)
+        self._delete = self._client.register_script(_REDIS_DELETE)
+
+    def _keys(self) -> list[str]:
+        return [self._version_key, self._entry_prefix]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        blob = self._get(keys=self._keys(), args=[repr(key)])
+        if blob is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return _loads(blob)
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        lifetime = self._lifetime(ttl)
+        if lifetime <= 0:
+            return
+        blob = _dumps(value)
+        self._set(keys=self._keys(), args=[repr(key), blob, max(int(lifetime * 1000), 1)])
+
+    def delete(self, key: Hashable) -> None:
+        self._delete(keys=self._keys(), args=[repr(key)])
+
+    def invalidate(self) -> None:
+        # Entries under the old version are never read again and age out by TTL.
+        self._client.incr(self._version_key)
+
+    def clear(self) -> None:
+        self.invalidate()
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def make_cache(
+    namespace: str, maxsize: int, ttl: float, backend: str = CACHE_BACKEND, url: str = CACHE_URL
+) -> Cache:
+    """Build the configured cache for `namespace`."""
+    if backend == "local":
+        return TTLCache(maxsize=maxsize, ttl=ttl, namespace=namespace)
+    if backend == "sqlite":
+        return SQLiteCache(url or "luma-cache.sqlite3", namespace, maxsize=maxsize, ttl=ttl)
+    if backend == "redis":
+        return RedisCache(url or "redis://localhost:6379/0", namespace, ttl=ttl)
+    raise RuntimeError(f"Unknown CACHE_BACKEND {backend!r}; expected local, sqlite or redis.")
@@ -0,0 +1,145 @@
+"""
+Response compression.
+
+Journal listings are mostly long free text and compress several-fold.
+Starlette's GZipMiddleware handles gzip; when the optional ``brotli``
+package is installed, clients that accept ``br`` get Brotli instead, which
+is smaller again at a similar CPU cost. BrotliResponder is our own rather
+than built on Starlette's private gzip responders. Responses that already
+set a Content-Encoding (e.g. ``/api/posts/export?gzip=true``) are passed
+through untouched.
+"""
+
+import os
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+GZIP_COMPRESSLEVEL = int(os.getenv("GZIP_COMPRESSLEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+# Bodies at least this large are compressed in a worker thread.
+THREAD_MINIMUM_SIZE = 128 * 1024
+# Already compressed, or streamed in a way compression would break.
+EXCLUDED_CONTENT_TYPES = frozenset({
+    "application/gzip", "application/x-gzip", "application/zip", "text/event-stream",
+    "audio/*", "font/woff", "font/woff2", "image/*", "video/*",
+})
+
+
+def accepts_encoding(accept_encoding: str, coding: str) -> bool:
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        if name.strip().lower() != coding:
+            continue
+        q = params.strip().removeprefix("q=")
+        try:
+            return not params.strip() or float(q) > 0
+        except ValueError:
+            return True
+    return False
+
+
+class BrotliResponder:
+    """
+    Wraps one request's ASGI send, Brotli-compressing the response body
+    unless it's small, partial, already encoded or of an excluded type.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.quality = quality
+        self.send: Send
+        self.start_message: Message = {}
+        self.passthrough = False
+        self.started = False
+        self._compressor = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk decides the headers.
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] == 206
+                or media_type in EXCLUDED_CONTENT_TYPES
+                or media_type.partition("/")[0] + "/*" in EXCLUDED_CONTENT_TYPES
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if len(body) < self.minimum_size and not more_body:
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            headers["Content-Encoding"] = "br"
+            del headers["Content-Length"]
+            body = await self.compress(body, more_body)
+            if not more_body:
+                headers["Content-Length"] = str(len(body))
+            await self.send(self.start_message)
+        else:
+            body = await self.compress(body, more_body)
+        await self.send({**message, "body": body})
+
+    async def compress(self, body: bytes, more_body: bool) -> bytes:
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            # Compressing large chunks inline would block the event loop.
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+        compressed = self._compressor.process(body)
+        return compressed + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware that prefers Brotli when it's available and accepted."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        compresslevel: int = GZIP_COMPRESSLEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+    ) -> None:
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            brotli is not None
+            and scope["type"] == "http"
+            and accepts_encoding(Headers(scope=scope).get("Accept-Encoding", ""), "br")
+        ):
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+            await responder(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
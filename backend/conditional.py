@@ -0,0 +1,59 @@
+"""
+Conditional GET helpers.
+
+Responses carry weak ETags built from whatever cheaply identifies their
+content (usually a per-user change counter), so a client re-requesting an
+unchanged resource gets a bodyless 304 and the handler never has to load
+or serialize the body.
+"""
+
+import hashlib
+from datetime import UTC, datetime, time, timedelta
+from email.utils import format_datetime
+
+from fastapi import Request, Response
+
+# Browsers keep the response but must revalidate it before every reuse.
+REVALIDATE = "private, no-cache"
+
+
+def weak_etag(*parts: object) -> str:
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of `etag` against the request's If-None-Match list."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def not_modified(etag: str, cache_control: str = REVALIDATE) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def set_validators(response: Response, etag: str, cache_control: str = REVALIDATE) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+
+
+def until_midnight(now: datetime | None = None) -> tuple[int, str]:
+    """
+    Seconds left until the next midnight, and that instant as an HTTP date.
+    Midnight is in `now`'s timezone if it has one, else the server's.
+    """
+    now = now or datetime.now()
+    tomorrow = now.date() + timedelta(days=1)
+    if now.tzinfo is None:
+        now = now.astimezone()
+        # Combining naive and then localizing picks the right offset across DST.
+        midnight = datetime.combine(tomorrow, time()).astimezone()
+    else:
+        midnight = datetime.combine(tomorrow, time(), tzinfo=now.tzinfo)
+    seconds = max(int((midnight - now).total_seconds()), 0)
+    return seconds, format_datetime(midnight.astimezone(UTC), usegmt=True)
@@ -1,12 +1,142 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from uuid import uuid4
+
+from sqlalchemy import Table, create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import NullPool
+
+from metrics import METRICS_ENABLED, instrument_engine
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set. Check your .env file or environment variables.")
 
-engine = create_engine(DATABASE_URL)
+# Pool tuning. Neon drops idle connections after ~5 minutes, so connections
+# are recycled before that and pinged on checkout.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "280"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Set to "pgbouncer" when DATABASE_URL points at a transaction-mode pooler.
+DB_POOLER = os.getenv("DB_POOLER", "").lower()
+# Set to false to run migrations as a release step (python -m migrations) instead.
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+
+def engine_options(url: str) -> dict:
+    """create_engine() keyword arguments for `url` based on the DB_* settings."""
+    if url.startswith("sqlite"):
+        return {}
+
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if DB_POOLER == "pgbouncer":
+        # The external pooler owns the pooling; holding our own connections
+        # open on top of it would just pin server slots.
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+        if DB_STATEMENT_TIMEOUT_MS:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def sync_engine_options(url: str) -> dict:
+    """
+    engine_options() for the sync engine, which only startup migrations and
+    the command-line tools use: unpooled, so once they finish a worker holds
+    no connections beyond the async pool's.
+    """
+    options = engine_options(url)
+    if url.startswith("sqlite"):
+        return options
+    for name in ("pool_size", "max_overflow", "pool_timeout", "pool_recycle"):
+        options.pop(name, None)
+    options["poolclass"] = NullPool
+    return options
+
+
+def _set_local_statement_timeout(conn) -> None:
+    # Transaction-mode poolers reject startup options and would leak a
+    # session-level SET to other clients, so scope it to each transaction.
+    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+
+
+def async_database_url(url: str) -> tuple[str, dict]:
+    """
+    Translate a sync DATABASE_URL into its async-driver equivalent plus any
+    connect_args the driver needs. asyncpg doesn't understand libpq's
+    sslmode/channel_binding query parameters, so those are moved into
+    connect_args instead.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False), {}
+    if backend != "postgresql":
+        raise RuntimeError(f"No async driver configured for {backend}; set ASYNC_DATABASE_URL.")
+
+    connect_args = {}
+    sslmode = parsed.query.get("sslmode")
+    if sslmode and sslmode != "disable":
+        connect_args["ssl"] = "require" if sslmode in ("allow", "prefer") else sslmode
+    parsed = parsed.difference_update_query(["sslmode", "channel_binding"])
+    return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False), connect_args
+
+
+def async_engine_options(url: str, connect_args: dict | None = None) -> dict:
+    """create_async_engine() keyword arguments, mirroring engine_options()."""
+    connect_args = dict(connect_args or {})
+    options = engine_options(url)
+    # libpq's "options" startup string means nothing to asyncpg.
+    options.pop("connect_args", None)
+    if url.startswith("sqlite"):
+        pass
+    elif DB_POOLER == "pgbouncer":
+        # Transaction-mode poolers can hand each statement to a different
+        # server connection, so asyncpg's named prepared statements must go.
+        connect_args.update(
+            statement_cache_size=0,
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__",
+        )
+    elif DB_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+# Connection budget per worker: DB_POOL_SIZE + DB_MAX_OVERFLOW on the async
+# engine, which serves every request and background job, plus two short-lived
+# connections from this one (the migration lock and the work) while
+# migrations run at startup.
+engine = create_engine(DATABASE_URL, **sync_engine_options(DATABASE_URL))
+
+# The routers run on the async engine. It defaults to DATABASE_URL with the
+# driver swapped (asyncpg / aiosqlite); ASYNC_DATABASE_URL overrides it.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+if ASYNC_DATABASE_URL:
+    _async_url, _async_connect_args = ASYNC_DATABASE_URL, {}
+else:
+    _async_url, _async_connect_args = async_database_url(DATABASE_URL)
+async_engine = create_async_engine(_async_url, **async_engine_options(_async_url, _async_connect_args))
+
+if DB_POOLER == "pgbouncer" and DB_STATEMENT_TIMEOUT_MS and not DATABASE_URL.startswith("sqlite"):
+    event.listen(engine, "begin", _set_local_statement_timeout)
+    event.listen(async_engine.sync_engine, "begin", _set_local_statement_timeout)
+
+if METRICS_ENABLED:
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -14,6 +144,13 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -23,6 +160,28 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def dialect_insert(db, table: Table):
+    """INSERT for the session's dialect, so upserts can use on_conflict_do_update on either database."""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(table)
+
+def pool_status(bind: Engine) -> dict:
+    """Checked-in/checked-out/overflow counts for `bind`'s pool, where the pool tracks them."""
+    pool = bind.pool
+    status = {"pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        counter = getattr(pool, name, None)
+        if callable(counter):
+            status[name] = counter()
+    return status
+
 def init_db():
+    from migrations import migration_lock, run_migrations
     from models import Base
-    Base.metadata.create_all(bind=engine)
+    with migration_lock(engine):
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine, Base.metadata)
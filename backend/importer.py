@@ -0,0 +1,237 @@
+"""
+Bulk journal import.
+
+Entries arrive as NDJSON or as a JSON array and are parsed while the body
+is still streaming in. Each entry is validated against PostImport on its
+own, so one bad row is reported back instead of failing the import, and
+valid rows are inserted in batches with executemany-style INSERTs. The
+analytics rollups are rebuilt once at the end with a handful of set-based
+statements, rather than adjusted entry by entry, which would cost a streak
+update for every distinct day imported.
+"""
+
+import codecs
+import json
+import os
+from collections.abc import AsyncIterator
+from datetime import date
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Post, Prompt
+from schemas import PostImport
+from similarity import index_posts
+from stats import rebuild_stats
+from tags import link_tags
+from utils import parse_tags
+
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", "10000"))
+BULK_IMPORT_MAX_BYTES = int(os.getenv("BULK_IMPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+BULK_IMPORT_BATCH_SIZE = 500
+
+
+class ImportTooLarge(Exception):
+    """The body has more rows or bytes than one request may import."""
+
+
+class MalformedImport(Exception):
+    """The body isn't NDJSON or a well-formed JSON array."""
+
+
+async def _decode(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > BULK_IMPORT_MAX_BYTES:
+            raise ImportTooLarge()
+        try:
+            text = decoder.decode(chunk)
+        except UnicodeDecodeError:
+            raise MalformedImport("Body is not valid UTF-8")
+        if text:
+            yield text
+
+
+async def _iter_ndjson(text: AsyncIterator[str]) -> AsyncIterator[object]:
+    buffer = ""
+    async for chunk in text:
+        buffer += chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield _loads(line)
+    if buffer.strip():
+        yield _loads(buffer)
+
+
+def _loads(line: str) -> object:
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError as exc:
+        return exc
+
+
+async def _iter_json_array(text: AsyncIterator[str]) -> AsyncIterator[object]:
+    """Yield the elements of a top-level JSON array as soon as each one is complete."""
+    decoder = json.JSONDecoder()
+    chunks = text.__aiter__()
+    buffer = ""
+    eof = False
+    expect = "["
+
+    async def read_more() -> bool:
+        nonlocal buffer, eof
+        more = None if eof else await anext(chunks, None)
+        if more is None:
+            eof = True
+            return False
+        buffer += more
+        return True
+
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            if await read_more():
+                continue
+            if expect == "done":
+                return
+            raise MalformedImport("Unexpected end of JSON array")
+
+        if expect == "[":
+            if buffer[0] != "[":
+                raise MalformedImport("Expected a JSON array")
+            buffer, expect = buffer[1:], "value_or_end"
+        elif expect == "value_or_end":
+            if buffer[0] == "]":
+                buffer, expect = buffer[1:], "done"
+            else:
+                expect = "value"
+        elif expect == "value":
+            try:
+                value, end = decoder.raw_decode(buffer)
+            except ValueError:
+                if await read_more():
+                    continue
+                raise MalformedImport("Malformed JSON array element")
+            # A scalar ending exactly at the buffer edge may continue in the next chunk.
+            if end == len(buffer) and await read_more():
+                continue
+            yield value
+            buffer, expect = buffer[end:], "comma_or_end"
+        elif expect == "comma_or_end":
+            if buffer[0] == ",":
+                buffer, expect = buffer[1:], "value"
+            elif buffer[0] == "]":
+                buffer, expect = buffer[1:], "done"
+            else:
+                raise MalformedImport("Expected ',' or ']' in JSON array")
+        else:
+            raise MalformedImport("Unexpected data after JSON array")
+
+
+async def iter_entries(chunks: AsyncIterator[bytes]) -> AsyncIterator[object]:
+    """
+    Parse a streamed body into entries. A body starting with '[' is read as
+    a JSON array, anything else as NDJSON. Unparseable NDJSON lines come
+    through as the exception so the caller can report them per row.
+    """
+    text = _decode(chunks)
+    head = ""
+    async for chunk in text:
+        head += chunk
+        if head.strip():
+            break
+
+    async def rest() -> AsyncIterator[str]:
+        yield head
+        async for chunk in text:
+            yield chunk
+
+    parse = _iter_json_array if head.lstrip().startswith("[") else _iter_ndjson
+    async for entry in parse(rest()):
+        yield entry
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'entry'}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+async def _insert_batch(
+    db: AsyncSession, owner_id: int, batch: list[tuple[int, PostImport]], errors: list[dict]
+) -> int:
+    prompt_ids = {entry.prompt_id for _, entry in batch if entry.prompt_id is not None}
+    known_prompts = set()
+    if prompt_ids:
+        known_prompts = set(await db.scalars(select(Prompt.id).where(Prompt.id.in_(prompt_ids))))
+
+    rows, names = [], []
+    for index, entry in batch:
+        if entry.prompt_id is not None and entry.prompt_id not in known_prompts:
+            errors.append({"index": index, "error": f"prompt_id: unknown prompt {entry.prompt_id}"})
+            continue
+        tag_names = parse_tags(entry.tags)
+        names.append(tag_names)
+        rows.append({
+            "content": entry.content,
+            "mood": entry.mood,
+            "privacy": entry.privacy or "private",
+            "tags": ",".join(tag_names) or None,
+            "prompt_id": entry.prompt_id,
+            "date_posted": entry.date_posted or date.today(),
+            "owner_id": owner_id,
+        })
+    if not rows:
+        return 0
+
+    result = await db.execute(insert(Post).returning(Post.id, sort_by_parameter_order=True), rows)
+    post_ids = result.scalars().all()
+    post_names = list(zip(post_ids, names))
+
+    def link(session):
+        link_tags(session, owner_id, post_names)
+        index_posts(session, owner_id, zip(post_ids, (row["content"] for row in rows)))
+
+    await db.run_sync(link)
+    return len(rows)
+
+
+async def import_posts(db: AsyncSession, owner_id: int, chunks: AsyncIterator[bytes]) -> dict:
+    """
+    Import every valid entry in the body for `owner_id` inside the caller's
+    transaction; the caller commits. Raises ImportTooLarge past
+    BULK_IMPORT_MAX_ROWS so the whole request can be rolled back.
+    """
+    inserted = 0
+    errors: list[dict] = []
+    batch: list[tuple[int, PostImport]] = []
+    index = 0
+
+    async for entry in iter_entries(chunks):
+        if index >= BULK_IMPORT_MAX_ROWS:
+            raise ImportTooLarge()
+        if isinstance(entry, Exception):
+            errors.append({"index": index, "error": f"invalid JSON: {entry}"})
+        else:
+            try:
+                batch.append((index, PostImport.model_validate(entry)))
+            except ValidationError as exc:
+                errors.append({"index": index, "error": _describe(exc)})
+        index += 1
+
+        if len(batch) >= BULK_IMPORT_BATCH_SIZE:
+            inserted += await _insert_batch(db, owner_id, batch, errors)
+            batch = []
+
+    if batch:
+        inserted += await _insert_batch(db, owner_id, batch, errors)
+    if inserted:
+        await db.run_sync(rebuild_stats, owner_id)
+    errors.sort(key=lambda error: error["index"])
+    return {"inserted": inserted, "errors": errors}
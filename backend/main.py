@@ -1,17 +1,50 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from database import init_db
-from routers import users, posts, auth, prompts
+from compression import CompressionMiddleware
+from database import MIGRATE_ON_STARTUP, AsyncSessionLocal, async_engine, init_db
+from metrics import METRICS_ENABLED, MetricsMiddleware
+from prompt_catalog import catalog_worker, load_catalog
+from purge import purge_worker
+from recommender import recommendation_worker
+from reminders import reminder_worker
+from routers import (
+    analytics,
+    auth,
+    health,
+    metrics,
+    notifications,
+    posts,
+    prompts,
+    users,
+)
+from utils import password_hasher
 
 load_dotenv()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    init_db()
+    if MIGRATE_ON_STARTUP:
+        init_db()
+    await load_catalog(AsyncSessionLocal)
+    workers = [
+        asyncio.create_task(catalog_worker(AsyncSessionLocal)),
+        asyncio.create_task(purge_worker(AsyncSessionLocal)),
+        asyncio.create_task(reminder_worker(AsyncSessionLocal)),
+        asyncio.create_task(recommendation_worker(AsyncSessionLocal)),
+    ]
     yield
+    for worker in workers:
+        worker.cancel()
+    for worker in workers:
+        with suppress(asyncio.CancelledError):
+            await worker
+    password_hasher.shutdown()
+    await async_engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -27,12 +60,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(CompressionMiddleware)
+if METRICS_ENABLED:
+    # Outermost, so `total` in Server-Timing covers compression too.
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(prompts.router, prefix="/api/prompts", tags=["Prompts"])
 app.include_router(posts.router, prefix="/api/posts", tags=["Posts"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
 app.include_router(auth.router, prefix="/api/auth", tags=["Auth"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
+app.include_router(notifications.router, prefix="/api/notifications", tags=["Notifications"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
+if METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 @app.get("/test-token")
 def test_token():
@@ -0,0 +1,251 @@
+"""
+Request and database instrumentation.
+
+When METRICS_ENABLED is set, MetricsMiddleware times every request and
+SQLAlchemy cursor events count the queries each request runs. Per-route
+latency histograms and query totals are served in Prometheus text format
+at /metrics, and every response gets a Server-Timing header breaking its
+time down into JWT verification, user lookup, bcrypt and database work;
+the rest of `total` is handler code and serialization. Background jobs
+report how much they handled per tick and how late it was through
+``registry.record_job``.
+
+Nothing is installed when it's disabled, so it costs nothing.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Seconds; roughly Prometheus' defaults, which suit request latencies.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds a background job item ran past its due time.
+LAG_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 900.0, 3600.0)
+
+
+@dataclass
+class RequestTimings:
+    """What one request has spent so far, filled in as it runs."""
+
+    queries: int = 0
+    db_seconds: float = 0.0
+    phases: dict[str, float] = field(default_factory=dict)
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Add the time spent in the block to `phase` of the current request's Server-Timing."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.phases[phase] = timings.phases.get(phase, 0.0) + time.perf_counter() - start
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+@dataclass
+class RouteStats:
+    latency: Histogram = field(default_factory=Histogram)
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+@dataclass
+class JobStats:
+    lag: Histogram = field(default_factory=lambda: Histogram(LAG_BUCKETS))
+    ticks: int = 0
+    items: int = 0
+    seconds: float = 0.0
+
+
+class Registry:
+    """Process-wide metrics, keyed by (method, route template, status), plus background jobs by name."""
+
+    def __init__(self):
+        self._routes: dict[tuple[str, str, int], RouteStats] = {}
+        self._jobs: dict[str, JobStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, route: str, status: int, seconds: float, timings: RequestTimings) -> None:
+        with self._lock:
+            stats = self._routes.get((method, route, status))
+            if stats is None:
+                stats = self._routes[(method, route, status)] = RouteStats()
+            stats.latency.observe(seconds)
+            stats.queries += timings.queries
+            stats.db_seconds += timings.db_seconds
+
+    def record_job(self, job: str, items: int, seconds: float, lags: Iterable[float] = ()) -> None:
+        """One tick of a background job: items handled, time taken, and how late each item was."""
+        with self._lock:
+            stats = self._jobs.get(job)
+            if stats is None:
+                stats = self._jobs[job] = JobStats()
+            stats.ticks += 1
+            stats.items += items
+            stats.seconds += seconds
+            for lag in lags:
+                stats.lag.observe(lag)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+            self._jobs.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format, version 0.0.4."""
+        lines = [
+            "# HELP luma_request_duration_seconds Request latency by route.",
+            "# TYPE luma_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            routes = sorted(self._routes.items())
+            for (method, route, status), stats in routes:
+                labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+                cumulative = 0
+                for bound, count in zip(stats.latency.buckets, stats.latency.counts):
+                    cumulative += count
+                    lines.append(f'luma_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                count = cumulative + stats.latency.counts[-1]
+                lines.append(f'luma_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f"luma_request_duration_seconds_sum{{{labels}}} {stats.latency.total}")
+                lines.append(f"luma_request_duration_seconds_count{{{labels}}} {count}")
+
+            for name, help_text, value in (
+                ("luma_db_queries_total", "SQL statements executed while serving the route.", "queries"),
+                ("luma_db_query_seconds_total", "Time spent in SQL statements for the route.", "db_seconds"),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for (method, route, status), stats in routes:
+                    labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+                    lines.append(f"{name}{{{labels}}} {getattr(stats, value)}")
+
+            jobs = sorted(self._jobs.items())
+            if jobs:
+                lines.extend(_job_lines(jobs))
+        return "\n".join(lines) + "\n"
+
+
+def _job_lines(jobs: list[tuple[str, JobStats]]) -> list[str]:
+    lines = [
+        "# HELP luma_job_lag_seconds How long after its due time a job item ran.",
+        "# TYPE luma_job_lag_seconds histogram",
+    ]
+    for job, stats in jobs:
+        labels = f'job="{_escape(job)}"'
+        cumulative = 0
+        for bound, count in zip(stats.lag.buckets, stats.lag.counts):
+            cumulative += count
+            lines.append(f'luma_job_lag_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        count = cumulative + stats.lag.counts[-1]
+        lines.append(f'luma_job_lag_seconds_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f"luma_job_lag_seconds_sum{{{labels}}} {stats.lag.total}")
+        lines.append(f"luma_job_lag_seconds_count{{{labels}}} {count}")
+
+    for name, help_text, value in (
+        ("luma_job_ticks_total", "Background job runs.", "ticks"),
+        ("luma_job_items_total", "Items background jobs handled; rate() of it is throughput.", "items"),
+        ("luma_job_seconds_total", "Time spent running background jobs.", "seconds"),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for job, stats in jobs:
+            lines.append(f'{name}{{job="{_escape(job)}"}} {getattr(stats, value)}')
+    return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = Registry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current.get()
+    starts = conn.info.get("query_start")
+    if timings is None or not starts:
+        return
+    timings.queries += 1
+    timings.db_seconds += time.perf_counter() - starts.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count queries and query time on `engine` (use `.sync_engine` for an AsyncEngine)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def server_timing(timings: RequestTimings, total: float) -> str:
+    entries = [f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in timings.phases.items()]
+    entries.append(f'db;dur={timings.db_seconds * 1000:.2f};desc="{timings.queries} queries"')
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, registry: Registry = registry) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(timings, time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            # Label by route template so /api/posts/1 and /api/posts/2 share a series.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            self.registry.record(scope["method"], route, status, time.perf_counter() - start, timings)
@@ -0,0 +1,176 @@
+"""
+Idempotent schema upgrades applied on startup.
+
+``Base.metadata.create_all`` only creates tables that don't exist yet, so
+anything added to an existing table (indexes, columns) has to be brought
+in here. Every step must be safe to run on every boot.
+
+Backfills bring rows written before a feature existed up to date; new
+writes keep themselves current. Each is recorded in
+``completed_backfills`` once it finishes, so later boots skip it instead
+of scanning the tables again.
+
+Every worker runs them as it starts, so on PostgreSQL they're serialized
+with an advisory lock: the first worker migrates while the rest wait, then
+find nothing left to do. Session-level advisory locks don't survive a
+transaction-mode pooler, so behind pgbouncer either point DATABASE_URL at
+the database directly for startup or set MIGRATE_ON_STARTUP=false and run
+``python -m migrations`` once per deploy instead.
+"""
+
+import warnings
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from sqlalchemy import exc, insert, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+# Indexes the models no longer declare, dropped once their replacement exists.
+OBSOLETE_INDEXES = {
+    "posts": ["ix_posts_owner_date_id"],
+}
+# Identifies the migration lock among the database's advisory locks ("LUMA").
+MIGRATION_LOCK_KEY = 0x4C554D41
+
+
+@contextmanager
+def migration_lock(engine: Engine) -> Iterator[None]:
+    """Hold the migration advisory lock for the block (PostgreSQL only)."""
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        # The lock is held by the session, so don't sit idle in a transaction.
+        connection.commit()
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
+
+
+def _index_names(inspector, table: str) -> set[str]:
+    # SQLite reflection skips expression indexes with a warning, so names
+    # read here can miss some; _ensure_indexes copes with that.
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", "Skipped unsupported reflection", exc.SAWarning)
+        return {ix["name"] for ix in inspector.get_indexes(table)}
+
+
+def _ensure_columns(engine: Engine, metadata) -> None:
+    """
+    Add columns declared on the models that existing tables are missing.
+    New columns must be nullable or carry a server_default so the ALTER
+    works on tables that already have rows.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+def _ensure_indexes(engine: Engine, metadata) -> None:
+    """Create any index declared on the models that the database is missing."""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = _index_names(inspector, table.name)
+        for index in table.indexes:
+            if index.name not in present:
+                with engine.begin() as connection:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+def _drop_obsolete_indexes(engine: Engine) -> None:
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table, names in OBSOLETE_INDEXES.items():
+        if table not in existing_tables:
+            continue
+        present = _index_names(inspector, table)
+        for name in names:
+            if name in present:
+                with engine.begin() as connection:
+                    connection.execute(text(f"DROP INDEX {name}"))
+
+
+def _run_backfill(engine: Engine, name: str, backfill: Callable[[Session], object]) -> None:
+    """Run `backfill` unless it has completed before, then record that it has."""
+    from models import completed_backfills
+
+    with Session(engine) as db:
+        done = select(completed_backfills.c.name).where(completed_backfills.c.name == name)
+        if db.scalar(done) is not None:
+            return
+        backfill(db)
+        db.execute(insert(completed_backfills).values(name=name))
+        db.commit()
+
+
+def _backfill_tags(db: Session) -> None:
+    from tags import backfill_tags
+
+    backfill_tags(db)
+
+
+def _backfill_stats(db: Session) -> None:
+    from stats import rebuild_all_stats
+
+    rebuild_all_stats(db, only_missing=True)
+
+
+def _backfill_signatures(db: Session) -> None:
+    from similarity import backfill_signatures
+
+    backfill_signatures(db)
+
+
+# Run in this order, each at most once per database.
+BACKFILLS = {
+    "tags": _backfill_tags,
+    "stats": _backfill_stats,
+    "signatures": _backfill_signatures,
+}
+
+
+def _ensure_search_index(engine: Engine) -> None:
+    from search import install_search_index
+
+    with engine.begin() as connection:
+        install_search_index(connection)
+
+
+def _seed_prompts(engine: Engine) -> None:
+    from prompt_catalog import seed_prompts
+
+    seed_prompts(engine)
+
+
+def run_migrations(engine: Engine, metadata) -> None:
+    _ensure_columns(engine, metadata)
+    _ensure_indexes(engine, metadata)
+    _drop_obsolete_indexes(engine)
+    _ensure_search_index(engine)
+    for name, backfill in BACKFILLS.items():
+        _run_backfill(engine, name, backfill)
+    _seed_prompts(engine)
+
+
+if __name__ == "__main__":
+    from database import init_db
+
+    init_db()
+    print("Migrations applied")
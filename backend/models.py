@@ -1,7 +1,26 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Date
+from datetime import date, datetime
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Table,
+    Text,
+    false,
+    func,
+)
 from sqlalchemy.orm import relationship
+
 from database import Base
-from datetime import date
+from search import register_search_index
 
 
 class User(Base):
@@ -13,6 +32,9 @@ class User(Base):
     last_name = Column(String)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
+    # Bumped whenever the user's posts change; conditional GETs derive their
+    # ETags from it instead of re-reading the posts.
+    posts_version = Column(Integer, nullable=False, default=0, server_default="0")
     posts = relationship("Post", back_populates="owner")
 
 
@@ -27,9 +49,136 @@ class Post(Base):
     tags = Column(String, nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     prompt_id = Column(Integer, ForeignKey("prompts.id"), nullable=True)
+    # Set by DELETE /api/posts/{id}; the row is purged after POST_RETENTION_DAYS.
+    deleted_at = Column(DateTime, nullable=True)
+
+    # Loads must be chosen explicitly per query (joinedload, or filled in from
+    # the current user) so a listing can never fall into one SELECT per row.
+    owner = relationship("User", back_populates="posts", lazy="raise_on_sql")
+    prompt = relationship("Prompt", back_populates="posts", lazy="raise_on_sql")
+    tag_list = relationship("Tag", secondary="post_tags", back_populates="posts")
+
+    # Backs the keyset pagination in GET /api/posts/ — (owner, date, id) lets
+    # the planner seek straight to a cursor instead of scanning the journal.
+    # Both indexes are partial so live-row queries never wade through trash
+    # and the purge job only scans what's actually deleted.
+    __table_args__ = (
+        Index(
+            "ix_posts_live_owner_date_id", "owner_id", "date_posted", "id",
+            postgresql_where=deleted_at.is_(None), sqlite_where=deleted_at.is_(None),
+        ),
+        Index(
+            "ix_posts_deleted_at", "deleted_at",
+            postgresql_where=deleted_at.isnot(None), sqlite_where=deleted_at.isnot(None),
+        ),
+        # GET /api/posts/on-this-day filters on exactly these expressions;
+        # the trailing date_posted serves its year range and ordering.
+        Index(
+            "ix_posts_live_owner_month_day", "owner_id",
+            func.extract("month", date_posted), func.extract("day", date_posted), "date_posted",
+            postgresql_where=deleted_at.is_(None), sqlite_where=deleted_at.is_(None),
+        ),
+    )
+
+
+post_tags = Table(
+    "post_tags",
+    Base.metadata,
+    Column("post_id", Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_post_tags_tag_id", "tag_id"),
+)
+
+
+class Tag(Base):
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String, nullable=False)
+
+    posts = relationship("Post", secondary=post_tags, back_populates="tag_list")
+
+    __table_args__ = (
+        Index("ix_tags_owner_name", "owner_id", "name", unique=True),
+    )
+
+
+register_search_index(Post.__table__)
+
+
+# Per-user analytics rollups, kept in step with posts by stats.py.
+user_stats = Table(
+    "user_stats",
+    Base.metadata,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("total_entries", Integer, nullable=False, default=0),
+    Column("longest_streak", Integer, nullable=False, default=0),
+)
+
+user_day_counts = Table(
+    "user_day_counts",
+    Base.metadata,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("entries", Integer, nullable=False),
+)
+
+user_mood_counts = Table(
+    "user_mood_counts",
+    Base.metadata,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("mood", String, primary_key=True),
+    Column("entries", Integer, nullable=False),
+)
 
-    owner = relationship("User", back_populates="posts")
-    prompt = relationship("Prompt", back_populates="posts")
+user_tag_counts = Table(
+    "user_tag_counts",
+    Base.metadata,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("name", String, primary_key=True),
+    Column("entries", Integer, nullable=False),
+)
+
+# One row per run of consecutive writing days.
+streak_runs = Table(
+    "streak_runs",
+    Base.metadata,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("start_day", Date, primary_key=True),
+    Column("end_day", Date, nullable=False),
+    Index("ix_streak_runs_user_end", "user_id", "end_day", unique=True),
+)
+
+
+# MinHash signatures of post content and their LSH band buckets, kept by
+# similarity.py for GET /api/posts/{id}/similar.
+post_signatures = Table(
+    "post_signatures",
+    Base.metadata,
+    Column("post_id", Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True),
+    Column("signature", LargeBinary, nullable=False),
+)
+
+post_lsh_buckets = Table(
+    "post_lsh_buckets",
+    Base.metadata,
+    Column("post_id", Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True),
+    Column("band", Integer, primary_key=True),
+    Column("owner_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("bucket", BigInteger, nullable=False),
+    Index("ix_post_lsh_buckets_owner_bucket", "owner_id", "bucket"),
+)
+
+
+# Startup backfills that have run to completion; migrations.py skips these.
+completed_backfills = Table(
+    "completed_backfills",
+    Base.metadata,
+    Column("name", String, primary_key=True),
+    Column("completed_at", DateTime, nullable=False, server_default=func.now()),
+)
 
 
 class Prompt(Base):
@@ -40,3 +189,72 @@ class Prompt(Base):
     date_created = Column(Date, default=date.today)
 
     posts = relationship("Post", back_populates="prompt")
+
+
+class PromptProfile(Base):
+    __tablename__ = "prompt_profiles"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    # Decayed term weights of the user's entries, maintained by recommender.py.
+    terms = Column(JSON, nullable=False, default=dict)
+    # Prompt ids the user's latest entries answered, oldest first.
+    answered = Column(JSON, nullable=False, default=list)
+    # Newest post folded into `terms`; the batch resumes after the highest one.
+    last_post_id = Column(Integer, nullable=False, default=0, index=True)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class Notification(Base):
+    __tablename__ = "notifications"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    type = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    message = Column(Text, nullable=False)
+    # The column is "metadata", which declarative classes reserve for the table metadata.
+    meta = Column("metadata", JSON, nullable=True)
+    read = Column(Boolean, nullable=False, default=False, server_default=false())
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=True, onupdate=datetime.utcnow)
+
+    # Serves both the newest-first listing and the unread-only one as seeks.
+    __table_args__ = (
+        Index("ix_notifications_user_read_created", "user_id", "read", "created_at"),
+    )
+
+
+# Unread notifications per user, kept in step by notifications.py so the
+# badge poll is one primary-key lookup.
+notification_counts = Table(
+    "notification_counts",
+    Base.metadata,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("unread", Integer, nullable=False, default=0),
+)
+
+
+class NotificationPreference(Base):
+    __tablename__ = "notification_preferences"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    email_new_follower = Column(Boolean, nullable=False, default=True)
+    email_journal_reminder = Column(Boolean, nullable=False, default=True)
+    email_weekly_digest = Column(Boolean, nullable=False, default=True)
+    push_new_follower = Column(Boolean, nullable=False, default=True)
+    push_journal_reminder = Column(Boolean, nullable=False, default=True)
+    push_milestones = Column(Boolean, nullable=False, default=True)
+    reminder_enabled = Column(Boolean, nullable=False, default=False)
+    reminder_time = Column(String, nullable=True)  # "HH:MM", in `timezone`
+    reminder_days = Column(String, nullable=True)  # comma-separated: "mon,wed,fri"; empty means daily
+    timezone = Column(String, nullable=False, default="UTC", server_default="UTC")
+    # When the next reminder is due (UTC), maintained by reminders.py; NULL
+    # when reminders are off, so the scheduler's index only holds live ones.
+    next_fire_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_notification_preferences_next_fire_at", "next_fire_at",
+            postgresql_where=next_fire_at.isnot(None), sqlite_where=next_fire_at.isnot(None),
+        ),
+    )
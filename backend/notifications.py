@@ -0,0 +1,91 @@
+"""
+Notification storage.
+
+Notifications are written in batches: one INSERT for the rows and one
+upsert for the per-user unread counters, so fanning a message out to
+thousands of users costs a couple of statements rather than a couple per
+user. Every change to a notification's read state adjusts
+``notification_counts`` in the same transaction, which keeps the unread
+badge a primary-key lookup however many notifications a user has.
+"""
+
+from collections import Counter
+from collections.abc import Iterable
+
+from sqlalchemy import false, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import dialect_insert
+from models import Notification, notification_counts
+from utils import utcnow
+
+NOTIFY_BATCH_SIZE = 1000
+# How reminder_days are stored, in datetime.weekday() order.
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+_DAY_NAMES = {
+    **{day: day for day in WEEKDAYS},
+    **dict(zip(("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"), WEEKDAYS)),
+}
+
+
+def parse_weekdays(days: Iterable[str]) -> list[str]:
+    """Normalize day names ("Monday", "mon", "MON") to WEEKDAYS order; raise ValueError on anything else."""
+    picked = set()
+    for day in days:
+        short = _DAY_NAMES.get(day.strip().lower())
+        if short is None:
+            raise ValueError(f"Unknown weekday {day!r}")
+        picked.add(short)
+    return [day for day in WEEKDAYS if day in picked]
+
+
+async def _add_unread(db: AsyncSession, deltas: Counter) -> None:
+    changes = [{"user_id": user_id, "unread": delta} for user_id, delta in deltas.items() if delta]
+    if not changes:
+        return
+    stmt = dialect_insert(db, notification_counts)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[notification_counts.c.user_id],
+            set_={"unread": notification_counts.c.unread + stmt.excluded.unread},
+        ),
+        changes,
+    )
+
+
+async def notify_many(db: AsyncSession, rows: list[dict]) -> list[int]:
+    """
+    Insert unread notifications, each a dict of Notification attributes
+    (user_id, type, title, message and optionally meta), and bump their
+    recipients' unread counts. Returns the new ids (in no particular order,
+    which lets every dialect insert a batch in one statement). Runs in the
+    caller's transaction.
+    """
+    now = utcnow()
+    ids: list[int] = []
+    for start in range(0, len(rows), NOTIFY_BATCH_SIZE):
+        batch = [{"read": False, "created_at": now, **row} for row in rows[start:start + NOTIFY_BATCH_SIZE]]
+        ids.extend(await db.scalars(
+            insert(Notification).returning(Notification.id), batch
+        ))
+    await _add_unread(db, Counter(row["user_id"] for row in rows))
+    return ids
+
+
+async def mark_read(db: AsyncSession, user_id: int, ids: Iterable[int] | None = None) -> int:
+    """Mark the user's unread notifications read (only `ids`, if given); return how many changed."""
+    stmt = update(Notification).where(Notification.user_id == user_id, Notification.read == false())
+    if ids is not None:
+        stmt = stmt.where(Notification.id.in_(list(ids)))
+    result = await db.execute(
+        stmt.values(read=True, updated_at=utcnow()).execution_options(synchronize_session=False)
+    )
+    await _add_unread(db, Counter({user_id: -result.rowcount}))
+    return result.rowcount
+
+
+async def unread_count(db: AsyncSession, user_id: int) -> int:
+    count = await db.scalar(
+        select(notification_counts.c.unread).where(notification_counts.c.user_id == user_id)
+    )
+    return count or 0
@@ -0,0 +1,195 @@
+"""
+Prompt catalog.
+
+Prompts live in the ``prompts`` table, seeded from PROMPTS, so
+``Post.prompt_id`` points at a real row. Choosing one never touches the
+database, though: each worker holds the catalog as an immutable ``Catalog``
+snapshot, loaded at startup and replaced by ``catalog_worker`` when the
+table changes. Replacing it is one reference assignment, so requests always
+see a complete catalog without taking a lock.
+
+Every user walks the catalog in their own shuffled order. Days are numbered
+in the caller's timezone and grouped into cycles of ``len(catalog)`` days;
+each cycle is a permutation seeded by the user id and the cycle number, so
+no prompt comes back until all the others have been shown and the whole
+schedule is a pure function of (user, date, catalog). Anonymous callers
+share user 0's rotation.
+"""
+
+import hashlib
+import logging
+import os
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import NamedTuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from models import Prompt
+from utils import run_periodically
+
+logger = logging.getLogger(__name__)
+
+PROMPT_REFRESH_SECONDS = float(os.getenv("PROMPT_REFRESH_SECONDS", "300"))
+
+# Seed catalog, written to an empty prompts table in this order so ids run
+# 1..len(PROMPTS) like the rotation that predates the table.
+PROMPTS = [
+    "What brought you joy today, even in a small way?",
+    "How are you really feeling right now, beneath the surface?",
+    "What's one thing you're proud of yourself for this week?",
+    "Describe a moment today when you felt most like yourself.",
+    "What would you tell your past self from one year ago?",
+    "What challenged you today and what did it teach you?",
+    "What's something you've been avoiding thinking about?",
+    "What does your body need right now — rest, movement, nourishment?",
+    "Write about a person who made a positive impact on your life.",
+    "What are three things you're grateful for in this moment?",
+    "What emotion has been showing up most for you lately?",
+    "If today had a color, what would it be and why?",
+    "What's a belief you hold that you've never questioned?",
+    "When did you last feel truly at peace? What were you doing?",
+    "What's one small act of kindness you could do for yourself today?",
+    "What does 'home' feel like to you right now?",
+    "What fear has been quietly holding you back?",
+    "Describe your ideal day from start to finish.",
+    "What boundaries do you need to set or reinforce in your life?",
+    "What are you currently learning — about the world or about yourself?",
+    "Write a letter of forgiveness — to yourself or someone else.",
+    "What does success look like to you today (not someday, today)?",
+    "What habit or pattern are you ready to leave behind?",
+    "When did you last laugh until it hurt? What happened?",
+    "What's something that feels heavy right now? Name it.",
+    "What would you do if you knew you couldn't fail?",
+    "How have you grown in the past six months?",
+    "What's a dream you've quietly given up on — and is it really gone?",
+    "What does your inner critic say most often? Is it true?",
+    "Who in your life feels safe to be fully yourself around?",
+    "What's one thing you wish others understood about you?",
+    "What song captures how you feel today?",
+    "Write about a time you showed real courage.",
+    "What are you pretending not to notice in your life?",
+    "What does your future self wish you were doing right now?",
+    "What's a memory you return to when you need comfort?",
+    "What would a perfect morning look like for you?",
+    "What's something you keep saying 'someday' about?",
+    "How do you handle difficult emotions — and is it working?",
+    "What does your creativity look like right now?",
+    "What relationship in your life needs more attention?",
+    "Write about something that recently surprised you.",
+    "What values are most important to you and are you living by them?",
+    "What's one thing you've accomplished that you don't celebrate enough?",
+    "What does your gut tell you about something you've been unsure of?",
+    "What would you do with an entire free day for just yourself?",
+    "How do you want to feel by the end of this month?",
+    "What's something you're still healing from?",
+    "Write about a time someone showed up for you when you needed it.",
+    "What does rest truly feel like for you — not sleep, but real rest?",
+    "What's one conversation you've been putting off?",
+    "What are you most curious about right now?",
+    "Describe your relationship with change.",
+    "What does loneliness feel like to you, and when does it visit?",
+    "What's something you've recently changed your mind about?",
+    "What is your body telling you that your mind keeps ignoring?",
+    "Write about a version of yourself you've outgrown.",
+    "What does love look like in your day-to-day life?",
+    "What's the kindest thing anyone has said to you recently?",
+    "What story are you telling yourself that may not be true?",
+    "Where do you find meaning on ordinary days?",
+]
+
+
+class CatalogPrompt(NamedTuple):
+    id: int
+    content: str
+
+
+@lru_cache(maxsize=4096)
+def _shuffled(user_id: int, cycle: int, size: int) -> tuple[int, ...]:
+    # String seeds hash with SHA-512, so every worker derives the same order.
+    order = list(range(size))
+    random.Random(f"{user_id}:{cycle}:{size}").shuffle(order)
+    return tuple(order)
+
+
+def rotation(user_id: int, cycle: int, size: int) -> tuple[int, ...]:
+    """Catalog positions in the order `user_id` sees them during `cycle`."""
+    order = _shuffled(user_id, cycle, size)
+    # Don't repeat yesterday's prompt across a cycle boundary. Swapping the
+    # first two leaves the last position alone, so this only needs the raw
+    # previous order.
+    if size > 2 and order[0] == _shuffled(user_id, cycle - 1, size)[-1]:
+        order = (order[1], order[0], *order[2:])
+    return order
+
+
+@dataclass(frozen=True)
+class Catalog:
+    prompts: tuple[CatalogPrompt, ...]
+    version: str = field(init=False)
+
+    def __post_init__(self):
+        digest = hashlib.blake2b(digest_size=8)
+        for prompt in self.prompts:
+            digest.update(f"{prompt.id}\0{prompt.content}\0".encode())
+        object.__setattr__(self, "version", digest.hexdigest())
+
+    def __len__(self) -> int:
+        return len(self.prompts)
+
+    def for_day(self, user_id: int, day: date) -> CatalogPrompt:
+        cycle, position = divmod(day.toordinal(), len(self.prompts))
+        return self.prompts[rotation(user_id, cycle, len(self.prompts))[position]]
+
+    def upcoming(self, user_id: int, start: date, count: int) -> list[tuple[date, CatalogPrompt]]:
+        """`user_id`'s prompts for `count` days from `start`."""
+        days = (start + timedelta(days=offset) for offset in range(count))
+        return [(day, self.for_day(user_id, day)) for day in days]
+
+
+# Until load_catalog() runs (and in tests without a database) the seed list
+# stands in, with the ids seeding gives it.
+_catalog = Catalog(tuple(CatalogPrompt(index + 1, content) for index, content in enumerate(PROMPTS)))
+
+
+def current() -> Catalog:
+    return _catalog
+
+
+def seed_prompts(engine: Engine) -> None:
+    """Fill an empty prompts table from PROMPTS; a non-empty one is left as curated."""
+    with engine.begin() as connection:
+        if connection.scalar(select(Prompt.id).limit(1)) is None:
+            connection.execute(insert(Prompt), [{"content": content} for content in PROMPTS])
+
+
+async def load_catalog(session_factory: async_sessionmaker[AsyncSession]) -> bool:
+    """Swap in a snapshot of the prompts table if it differs from the current one; return whether it did."""
+    global _catalog
+    async with session_factory() as db:
+        rows = (await db.execute(select(Prompt.id, Prompt.content).order_by(Prompt.id))).all()
+    if not rows:
+        logger.warning("prompts table is empty; keeping the current catalog")
+        return False
+    catalog = Catalog(tuple(CatalogPrompt(row.id, row.content) for row in rows))
+    if catalog.version == _catalog.version:
+        return False
+    _catalog = catalog
+    return True
+
+
+async def catalog_worker(
+    session_factory: async_sessionmaker[AsyncSession],
+    interval: float = PROMPT_REFRESH_SECONDS,
+) -> None:
+    """Reload the catalog every `interval` seconds until cancelled."""
+    async def reload() -> None:
+        if await load_catalog(session_factory):
+            logger.info("Prompt catalog reloaded: %d prompts", len(_catalog))
+
+    # The catalog is loaded at startup, so the first reload waits a full interval.
+    await run_periodically("Reloading the prompt catalog", reload, interval, wait_first=True)
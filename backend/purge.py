@@ -0,0 +1,71 @@
+"""
+Hard-deletes soft-deleted posts once they've sat in the trash for
+POST_RETENTION_DAYS.
+
+Deleting a post only stamps ``deleted_at`` (its rollups are adjusted at
+that moment), so the expensive cleanup — the row, its post_tags links, its
+similarity index rows and its search index entry — happens here, off the
+request path. Rows are removed in batches of PURGE_BATCH_SIZE, each in its
+own short transaction, and batches are claimed with ``FOR UPDATE SKIP
+LOCKED`` so several app instances can run the worker side by side without
+waiting on each other.
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from models import Post, post_lsh_buckets, post_signatures, post_tags
+from utils import run_periodically, utcnow
+
+logger = logging.getLogger(__name__)
+
+POST_RETENTION_DAYS = int(os.getenv("POST_RETENTION_DAYS", "30"))
+PURGE_INTERVAL_SECONDS = int(os.getenv("PURGE_INTERVAL_SECONDS", "3600"))
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+
+
+async def purge_deleted_posts(
+    session_factory: async_sessionmaker[AsyncSession],
+    now: datetime | None = None,
+    batch_size: int = PURGE_BATCH_SIZE,
+) -> int:
+    """Remove every post deleted more than POST_RETENTION_DAYS before `now`; return how many."""
+    cutoff = (now or utcnow()) - timedelta(days=POST_RETENTION_DAYS)
+    expired = (
+        select(Post.id)
+        .where(Post.deleted_at.isnot(None), Post.deleted_at < cutoff)
+        .order_by(Post.deleted_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    purged = 0
+    while True:
+        async with session_factory() as db:
+            ids = (await db.scalars(expired)).all()
+            if not ids:
+                return purged
+            # SQLite doesn't enforce the foreign keys, so unlink tags and
+            # similarity index rows explicitly.
+            for table in (post_tags, post_signatures, post_lsh_buckets):
+                await db.execute(delete(table).where(table.c.post_id.in_(ids)))
+            await db.execute(delete(Post).where(Post.id.in_(ids)))
+            await db.commit()
+        purged += len(ids)
+        if len(ids) < batch_size:
+            return purged
+
+
+async def purge_worker(
+    session_factory: async_sessionmaker[AsyncSession], interval: float = PURGE_INTERVAL_SECONDS
+) -> None:
+    """Run purge_deleted_posts every `interval` seconds until cancelled."""
+    async def purge() -> None:
+        purged = await purge_deleted_posts(session_factory)
+        if purged:
+            logger.info("Purged %d deleted posts", purged)
+
+    await run_periodically("Purging deleted posts", purge, interval)
@@ -0,0 +1,234 @@
+"""
+Rate limiting and admission control.
+
+Login and register run bcrypt on every call, which makes them the cheapest
+way to tie up every worker. Two guards run before any of that work:
+
+- Token buckets per client IP and per account (email or user id). A
+  bucket holds up to `capacity` requests and refills continuously over
+  `per_seconds`, so short bursts pass and sustained abuse gets 429 with
+  Retry-After. Buckets live in memory by default; RATE_LIMIT_BACKEND=sqlite
+  shares them between every worker on the host, with the file I/O run in
+  a worker thread so a busy lock never stalls the event loop.
+- ConcurrencyLimiter caps how many requests of one kind run at once across
+  the worker and answers the rest with 503 straight away, instead of
+  queueing them behind work the client will have given up on.
+
+The client IP comes from X-Forwarded-For only when TRUSTED_PROXY_HOPS says
+how many proxies sit in front of the app, and then it is the entry the
+outermost of them appended. Everything to its left was written by the
+client and could be anything.
+"""
+
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request, status
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# memory | sqlite. RATE_LIMIT_URL is the SQLite file the workers share.
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL", "luma-ratelimit.sqlite3")
+# Idle buckets beyond this are forgotten (which only ever lets a client through early).
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Proxies in front of the app that append to X-Forwarded-For (1 on Render);
+# 0 uses the socket's peer address and ignores the header.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+
+@dataclass(frozen=True)
+class Rate:
+    capacity: int
+    per_seconds: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "Rate":
+        """Read "N/SECONDS", e.g. "10/60" for ten requests a minute."""
+        capacity, _, seconds = spec.partition("/")
+        return cls(int(capacity), float(seconds or 1))
+
+    @property
+    def refill(self) -> float:
+        return self.capacity / self.per_seconds
+
+
+AUTH_IP_RATE = Rate.parse(os.getenv("AUTH_IP_RATE", "20/60"))
+AUTH_ACCOUNT_RATE = Rate.parse(os.getenv("AUTH_ACCOUNT_RATE", "5/60"))
+AUTH_ACCOUNT_FAILURE_RATE = Rate.parse(os.getenv("AUTH_ACCOUNT_FAILURE_RATE", "10/300"))
+WRITE_RATE = Rate.parse(os.getenv("WRITE_RATE", "120/60"))
+AUTH_MAX_CONCURRENT = int(os.getenv("AUTH_MAX_CONCURRENT", "16"))
+BULK_MAX_CONCURRENT = int(os.getenv("BULK_MAX_CONCURRENT", "2"))
+OVERLOAD_RETRY_AFTER_SECONDS = int(os.getenv("OVERLOAD_RETRY_AFTER_SECONDS", "2"))
+
+
+def _drain(tokens: float, updated: float, now: float, rate: Rate, cost: float) -> tuple[float, float]:
+    """
+    Refill a bucket up to `now` and try to take `cost`; return (tokens left,
+    seconds to wait). A negative cost puts tokens back.
+    """
+    tokens = min(rate.capacity, tokens + (now - updated) * rate.refill)
+    if tokens >= cost:
+        return min(rate.capacity, tokens - cost), 0.0
+    return tokens, (cost - tokens) / rate.refill
+
+
+class MemoryBuckets:
+    """Token buckets held by this worker."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, timer: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._timer = timer
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: Rate, cost: float = 1) -> float:
+        """Spend `cost` from `key`'s bucket; return 0 if allowed, else seconds until it would be."""
+        with self._lock:
+            now = self._timer()
+            tokens, updated = self._buckets.get(key, (rate.capacity, now))
+            tokens, wait = _drain(tokens, updated, now, rate, cost)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    async def atake(self, key: str, rate: Rate, cost: float = 1) -> float:
+        return self.take(key, rate, cost)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBuckets:
+    """Token buckets in a SQLite file shared by every worker on the host."""
+
+    def __init__(self, path: str, timer: Callable[[], float] = time.time):
+        # Bucket timestamps are compared across processes, so this must be wall-clock time.
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def take(self, key: str, rate: Rate, cost: float = 1) -> float:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so two workers can't
+            # both read the same balance and each spend it.
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = self._timer()
+                row = self._db.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+                tokens, wait = _drain(*(row or (rate.capacity, now)), now, rate, cost)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens, now),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            return wait
+
+    async def atake(self, key: str, rate: Rate, cost: float = 1) -> float:
+        # May wait up to the busy timeout for another worker's lock.
+        return await asyncio.to_thread(self.take, key, rate, cost)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM rate_buckets")
+
+
+def make_buckets(backend: str = RATE_LIMIT_BACKEND, url: str = RATE_LIMIT_URL):
+    if backend == "memory":
+        return MemoryBuckets()
+    if backend == "sqlite":
+        return SQLiteBuckets(url)
+    raise RuntimeError(f"Unknown RATE_LIMIT_BACKEND {backend!r}; expected memory or sqlite.")
+
+
+buckets = make_buckets()
+
+
+def client_ip(request: Request, hops: int | None = None) -> str:
+    """
+    The caller's address: the X-Forwarded-For entry the outermost of `hops`
+    trusted proxies appended, or the socket's peer without any.
+    """
+    hops = TRUSTED_PROXY_HOPS if hops is None else hops
+    if hops > 0:
+        forwarded = [
+            host.strip()
+            for header in request.headers.getlist("x-forwarded-for")
+            for host in header.split(",")
+            if host.strip()
+        ]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.client.host if request.client else "unknown"
+
+
+async def enforce(key: str, rate: Rate) -> None:
+    """Charge one request to `key`, raising 429 once its bucket is empty."""
+    if not RATE_LIMIT_ENABLED:
+        return
+    wait = await buckets.atake(key, rate)
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please slow down",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+
+async def refund(key: str, rate: Rate) -> None:
+    """Give back the request last charged to `key` by enforce()."""
+    if RATE_LIMIT_ENABLED:
+        await buckets.atake(key, rate, cost=-1)
+
+
+def limit_ip(scope: str, rate: Rate) -> Callable[[Request], Awaitable[None]]:
+    """Dependency charging each request to the caller's IP under `scope`."""
+    async def dependency(request: Request) -> None:
+        await enforce(f"{scope}:ip:{client_ip(request)}", rate)
+
+    return dependency
+
+
+class ConcurrencyLimiter:
+    """
+    Dependency admitting at most `limit` requests at once in this worker;
+    the rest get 503 before their handler runs.
+    """
+
+    def __init__(self, limit: int, retry_after: int = OVERLOAD_RETRY_AFTER_SECONDS):
+        self.limit = limit
+        self.retry_after = retry_after
+        self.in_flight = 0
+
+    async def __call__(self) -> AsyncIterator[None]:
+        if self.in_flight >= self.limit:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+
+auth_admission = ConcurrencyLimiter(AUTH_MAX_CONCURRENT)
+bulk_admission = ConcurrencyLimiter(BULK_MAX_CONCURRENT)
@@ -0,0 +1,302 @@
+"""
+Prompt recommendations.
+
+Signed-in users are steered towards prompts about things they haven't been
+writing about. Prompts and entries are compared as TF-IDF vectors over the
+catalog's vocabulary, and the prompts least like a user's recent writing
+are the ones worth suggesting.
+
+All of it runs in ``recommendation_worker``, off the request path:
+
+1. Entries newer than the highest ``prompt_profiles.last_post_id`` are
+   folded into their author's profile. Each entry decays the existing
+   weights by PROFILE_DECAY before adding its own term counts, so a profile
+   follows recent writing without old posts ever being reread. Updates are
+   conditional on the profile's ``last_post_id``, so two workers folding
+   the same batch can't count an entry twice.
+2. Every profile is scored against the catalog, and the prompts ordered
+   least similar first (skipping ones the user answered lately) go into
+   the ``prompt_recommendations`` cache with the day the order starts on.
+   Each following day serves the next prompt in the order, so nothing
+   repeats until the whole list has been walked. Re-ranking keeps the
+   prompts already served and only reorders the rest.
+
+Serving a prompt is then one cache read. A user with no cached picks (no
+entries yet, or nothing in common with the catalog's vocabulary) gets their
+plain rotation from prompt_catalog.
+
+Vectors are sparse dicts rather than NumPy arrays: the catalog is a few
+dozen prompts over a few hundred terms, and scoring a profile against all
+of them is a few hundred multiplications.
+"""
+
+import math
+import os
+import re
+import time as clock
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from cache import make_cache
+from database import dialect_insert
+from metrics import registry
+from models import Post, PromptProfile
+from prompt_catalog import Catalog, CatalogPrompt, current, rotation
+from utils import run_periodically, utcnow
+
+RECOMMEND_INTERVAL_SECONDS = float(os.getenv("RECOMMEND_INTERVAL_SECONDS", "900"))
+RECOMMEND_BATCH_SIZE = int(os.getenv("RECOMMEND_BATCH_SIZE", "1000"))
+RECOMMEND_CACHE_SIZE = int(os.getenv("RECOMMEND_CACHE_SIZE", "100000"))
+# Weight each older entry keeps when a new one is folded in.
+PROFILE_DECAY = 0.85
+PROFILE_MAX_TERMS = 200
+# Answered prompts aren't suggested again until this many newer entries answered others.
+RECENT_ANSWERED = 30
+
+_WORD = re.compile(r"[a-z]+")
+_STOPWORD_TEXT = """
+    about after again all also and any are around because been before being both but can could did
+    does doing don down each even ever every few for from get got had has have having her here hers
+    him his how into its just like made make many more most much must never not now off once one
+    only other our ours out over own really same she should since some someone something still such
+    than that the their them then there these they thing things this those through today too under
+    until very was way well were what when where which while who whom why will with would yet you
+    your yours yourself
+"""
+STOPWORDS = frozenset(_STOPWORD_TEXT.split())
+_SUFFIXES = ("ing", "ed", "ly", "es", "s")
+
+# Entries expire after a few missed runs, so a stopped worker degrades to plain rotation.
+recommendations = make_cache(
+    "prompt_recommendations", maxsize=RECOMMEND_CACHE_SIZE, ttl=3 * RECOMMEND_INTERVAL_SECONDS
+)
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased, crudely stemmed content words of `text`."""
+    return [
+        _stem(word) for word in _WORD.findall(text.lower())
+        if len(word) > 2 and word not in STOPWORDS
+    ]
+
+
+def _normalize(vector: dict[str, float]) -> dict[str, float]:
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+
+def _dot(a: dict[str, float], b: dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(term, 0.0) for term, weight in a.items())
+
+
+@dataclass(frozen=True)
+class PromptVectors:
+    """TF-IDF vectors for one catalog snapshot, aligned with its prompts."""
+
+    catalog: Catalog
+    idf: dict[str, float]
+    vectors: tuple[dict[str, float], ...]
+
+    @classmethod
+    def build(cls, catalog: Catalog) -> "PromptVectors":
+        counts = [Counter(tokenize(prompt.content)) for prompt in catalog.prompts]
+        df = Counter(term for terms in counts for term in terms)
+        idf = {term: math.log((1 + len(counts)) / (1 + n)) + 1 for term, n in df.items()}
+        vectors = tuple(
+            _normalize({term: (1 + math.log(n)) * idf[term] for term, n in terms.items()})
+            for terms in counts
+        )
+        return cls(catalog, idf, vectors)
+
+    def rank(
+        self,
+        user_id: int,
+        profile: dict[str, float],
+        answered: Iterable[int],
+        day: date,
+        exclude: Iterable[int] = (),
+    ) -> tuple[int, ...]:
+        """
+        Catalog positions other than `exclude`, least similar to `profile`
+        first, or () if the profile shares no terms with the catalog.
+        Recently answered prompts are left out unless nothing else remains.
+        Ties (most prompts, usually) keep the user's rotation order for `day`.
+        """
+        query = _normalize({term: weight * self.idf[term] for term, weight in profile.items() if term in self.idf})
+        if not query:
+            return ()
+        size = len(self.catalog)
+        order = rotation(user_id, day.toordinal() // size, size)
+        excluded, answered = set(exclude), set(answered)
+        remaining = [i for i in order if i not in excluded]
+        candidates = [i for i in remaining if self.catalog.prompts[i].id not in answered] or remaining
+        candidates.sort(key=lambda i: _dot(query, self.vectors[i]))
+        return tuple(candidates)
+
+
+def fold(profile: dict[str, float], content: str) -> dict[str, float]:
+    """`profile` with one more (newest) entry folded in."""
+    folded = {term: weight * PROFILE_DECAY for term, weight in profile.items()}
+    for term, n in Counter(tokenize(content)).items():
+        folded[term] = folded.get(term, 0.0) + 1 + math.log(n)
+    if len(folded) > PROFILE_MAX_TERMS:
+        kept = sorted(folded.items(), key=lambda item: item[1], reverse=True)[:PROFILE_MAX_TERMS]
+        folded = dict(kept)
+    return folded
+
+
+def recommended_prompt(catalog: Catalog, user_id: int, day: date) -> CatalogPrompt | None:
+    """`user_id`'s cached pick for `day`, or None to fall back to their rotation."""
+    entry = recommendations.get(user_id)
+    # Entries cached by an older release had no start day.
+    if entry is None or len(entry) != 3:
+        return None
+    version, start, picks = entry
+    offset = day.toordinal() - start
+    if version != catalog.version or not 0 <= offset < len(picks):
+        return None
+    return catalog.prompts[picks[offset]]
+
+
+async def fold_new_posts(
+    session_factory: async_sessionmaker[AsyncSession], batch_size: int = RECOMMEND_BATCH_SIZE
+) -> int:
+    """Fold every entry written since the last run into its author's profile; return how many."""
+    async with session_factory() as db:
+        watermark = await db.scalar(select(func.max(PromptProfile.last_post_id))) or 0
+    folded = 0
+    while True:
+        async with session_factory() as db:
+            posts = (await db.execute(
+                select(Post.id, Post.owner_id, Post.content, Post.prompt_id)
+                .where(Post.id > watermark, Post.deleted_at.is_(None))
+                .order_by(Post.id)
+                .limit(batch_size)
+            )).all()
+            if not posts:
+                break
+            by_owner = defaultdict(list)
+            for post in posts:
+                by_owner[post.owner_id].append(post)
+            profiles = {
+                profile.user_id: profile
+                for profile in await db.scalars(select(PromptProfile).where(PromptProfile.user_id.in_(by_owner)))
+            }
+            now = utcnow()
+            new_profiles = []
+            for owner_id, owner_posts in by_owner.items():
+                profile = profiles.get(owner_id)
+                terms = dict(profile.terms) if profile else {}
+                answered = list(profile.answered) if profile else []
+                last_post_id = profile.last_post_id if profile else 0
+                fresh = [post for post in owner_posts if post.id > last_post_id]
+                if not fresh:
+                    continue
+                for post in fresh:
+                    terms = fold(terms, post.content)
+                    if post.prompt_id is not None:
+                        answered.append(post.prompt_id)
+                values = {
+                    "terms": terms, "answered": answered[-RECENT_ANSWERED:],
+                    "last_post_id": fresh[-1].id, "updated_at": now,
+                }
+                if profile is None:
+                    new_profiles.append({"user_id": owner_id, **values})
+                else:
+                    # Only if nobody else folded these entries since we read the profile.
+                    await db.execute(
+                        update(PromptProfile)
+                        .where(PromptProfile.user_id == owner_id, PromptProfile.last_post_id == last_post_id)
+                        .values(**values)
+                        .execution_options(synchronize_session=False)
+                    )
+                folded += len(fresh)
+            if new_profiles:
+                await db.execute(
+                    dialect_insert(db, PromptProfile.__table__).on_conflict_do_nothing(
+                        index_elements=[PromptProfile.user_id]
+                    ),
+                    new_profiles,
+                )
+            await db.commit()
+        watermark = posts[-1].id
+        if len(posts) < batch_size:
+            break
+    return folded
+
+
+async def _served(user_id: int, catalog: Catalog, day: date) -> tuple[int, tuple[int, ...]]:
+    """
+    The start day of `user_id`'s current order and the picks it has served
+    up to and including `day`, or a fresh order starting on `day` once the
+    old one is used up or was ranked against another catalog.
+    """
+    entry = await recommendations.aget(user_id)
+    if entry is not None and len(entry) == 3:
+        version, start, picks = entry
+        offset = day.toordinal() - start
+        if version == catalog.version and 0 <= offset < len(picks):
+            return start, tuple(picks[:offset + 1])
+    return day.toordinal(), ()
+
+
+async def refresh_recommendations(
+    session_factory: async_sessionmaker[AsyncSession],
+    day: date | None = None,
+    batch_size: int = RECOMMEND_BATCH_SIZE,
+) -> int:
+    """Re-rank the catalog for every profile and cache the picks; return how many users have some."""
+    model = PromptVectors.build(current())
+    day = day or utcnow().date()
+    after, cached = 0, 0
+    while True:
+        async with session_factory() as db:
+            rows = (await db.execute(
+                select(PromptProfile.user_id, PromptProfile.terms, PromptProfile.answered)
+                .where(PromptProfile.user_id > after)
+                .order_by(PromptProfile.user_id)
+                .limit(batch_size)
+            )).all()
+        for row in rows:
+            start, served = await _served(row.user_id, model.catalog, day)
+            picks = served + model.rank(row.user_id, row.terms, row.answered, day, exclude=served)
+            if picks:
+                await recommendations.aset(row.user_id, (model.catalog.version, start, picks))
+                cached += 1
+            else:
+                await recommendations.adelete(row.user_id)
+        if len(rows) < batch_size:
+            return cached
+        after = rows[-1].user_id
+
+
+async def run_recommendations(session_factory: async_sessionmaker[AsyncSession]) -> int:
+    started = clock.perf_counter()
+    await fold_new_posts(session_factory)
+    cached = await refresh_recommendations(session_factory)
+    registry.record_job("recommendations", cached, clock.perf_counter() - started)
+    return cached
+
+
+async def recommendation_worker(
+    session_factory: async_sessionmaker[AsyncSession],
+    interval: float = RECOMMEND_INTERVAL_SECONDS,
+) -> None:
+    """Run run_recommendations every `interval` seconds until cancelled."""
+    await run_periodically(
+        "Refreshing prompt recommendations", lambda: run_recommendations(session_factory), interval
+    )
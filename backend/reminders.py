@@ -0,0 +1,179 @@
+"""
+Journal reminders.
+
+Each user's notification preferences carry ``next_fire_at``, the UTC time
+their next reminder is due. It's recomputed whenever the preferences change
+and after every reminder, and is NULL while reminders are off. A scheduler
+tick is therefore a range scan over the partial ``next_fire_at`` index that
+only touches users who are due, so its cost depends on how many reminders
+are due rather than on how many users there are. Due rows are claimed in
+batches with ``FOR UPDATE SKIP LOCKED``, so every worker process can run
+the scheduler and they split the work instead of sending duplicates.
+
+For each due user a ``journal_reminder`` notification is written and
+``next_fire_at`` advanced in one transaction. Once that commits, the batch
+goes to the sender for delivery outside the app (push, email, ...).
+REMINDER_SENDER picks the sender: ``local`` (the default) only logs, and
+``package.module:Class`` loads any ``Sender`` subclass.
+"""
+
+import importlib
+import logging
+import os
+import time as clock
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import UTC, datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from metrics import registry
+from models import NotificationPreference
+from notifications import WEEKDAYS, notify_many
+from utils import run_periodically, utcnow
+
+logger = logging.getLogger(__name__)
+
+REMINDER_TICK_SECONDS = float(os.getenv("REMINDER_TICK_SECONDS", "30"))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+REMINDER_SENDER = os.getenv("REMINDER_SENDER", "local")
+
+# Same copy the frontend's notifyJournalReminder uses.
+REMINDER_TITLE = "Time to journal! ✍️"
+REMINDER_MESSAGE = (
+    "Don't forget to write in your journal today. "
+    "Take a moment to reflect on your thoughts and experiences."
+)
+
+
+def zone(name: str) -> ZoneInfo:
+    """ZoneInfo for an IANA name; raises ValueError for unknown ones."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone {name!r}")
+
+
+def next_fire_time(reminder_time: str, days: Iterable[str], tz: str, after: datetime) -> datetime:
+    """
+    First `reminder_time` (HH:MM, local to `tz`) on one of `days` (all
+    week if empty) strictly after `after`. Both datetimes are naive UTC.
+    """
+    local_zone = zone(tz)
+    hour, minute = (int(part) for part in reminder_time.split(":"))
+    allowed = {WEEKDAYS.index(day) for day in days} or set(range(7))
+    local_after = after.replace(tzinfo=UTC).astimezone(local_zone)
+    for offset in range(8):
+        day = local_after.date() + timedelta(days=offset)
+        if day.weekday() not in allowed:
+            continue
+        candidate = datetime.combine(day, time(hour, minute), tzinfo=local_zone)
+        if candidate > local_after:
+            return candidate.astimezone(UTC).replace(tzinfo=None)
+    raise AssertionError("a week always contains an allowed day")
+
+
+def schedule(prefs: NotificationPreference, now: datetime) -> None:
+    """Point `prefs.next_fire_at` at the next reminder after `now`, or clear it if reminders are off."""
+    if prefs.reminder_enabled and prefs.reminder_time:
+        days = prefs.reminder_days.split(",") if prefs.reminder_days else []
+        prefs.next_fire_at = next_fire_time(prefs.reminder_time, days, prefs.timezone or "UTC", now)
+    else:
+        prefs.next_fire_at = None
+
+
+@dataclass
+class Reminder:
+    user_id: int
+    due_at: datetime
+
+
+class Sender(ABC):
+    """Delivers fired reminders outside the app. Point REMINDER_SENDER at a subclass."""
+
+    @abstractmethod
+    async def send(self, reminders: list[Reminder]) -> None:
+        ...
+
+
+class LocalSender(Sender):
+    """Stand-in for development and tests: remembers and logs what it was given."""
+
+    def __init__(self):
+        self.sent: list[Reminder] = []
+
+    async def send(self, reminders: list[Reminder]) -> None:
+        self.sent.extend(reminders)
+        logger.info("Reminders due for users %s", [reminder.user_id for reminder in reminders])
+
+
+def load_sender(spec: str = REMINDER_SENDER) -> Sender:
+    if spec == "local":
+        return LocalSender()
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)()
+
+
+async def fire_due_reminders(
+    session_factory: async_sessionmaker[AsyncSession],
+    sender: Sender,
+    now: datetime | None = None,
+    batch_size: int = REMINDER_BATCH_SIZE,
+) -> int:
+    """Send every reminder due at `now`; return how many."""
+    now = now or utcnow()
+    started = clock.perf_counter()
+    due = (
+        select(NotificationPreference)
+        .where(NotificationPreference.next_fire_at <= now)
+        .order_by(NotificationPreference.next_fire_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    fired: list[Reminder] = []
+    while True:
+        async with session_factory() as db:
+            batch = (await db.scalars(due)).all()
+            if not batch:
+                break
+            reminders = [Reminder(prefs.user_id, prefs.next_fire_at) for prefs in batch]
+            await notify_many(db, [
+                {
+                    "user_id": reminder.user_id,
+                    "type": "journal_reminder",
+                    "title": REMINDER_TITLE,
+                    "message": REMINDER_MESSAGE,
+                    "meta": {"source": "daily_reminder"},
+                }
+                for reminder in reminders
+            ])
+            # Advancing past `now` (not past the missed time) means a user who
+            # was due several times while the app was down gets one reminder.
+            for prefs in batch:
+                schedule(prefs, now)
+            await db.commit()
+        fired.extend(reminders)
+        await sender.send(reminders)
+        if len(batch) < batch_size:
+            break
+
+    registry.record_job(
+        "reminders", len(fired), clock.perf_counter() - started,
+        [(now - reminder.due_at).total_seconds() for reminder in fired],
+    )
+    return len(fired)
+
+
+async def reminder_worker(
+    session_factory: async_sessionmaker[AsyncSession],
+    sender: Sender | None = None,
+    interval: float = REMINDER_TICK_SECONDS,
+) -> None:
+    """Run fire_due_reminders every `interval` seconds until cancelled."""
+    sender = sender or load_sender()
+    await run_periodically(
+        "Firing reminders", lambda: fire_due_reminders(session_factory, sender), interval
+    )
@@ -0,0 +1,147 @@
+import math
+from datetime import date
+from itertools import pairwise
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from models import (
+    Post,
+    Tag,
+    User,
+    post_tags,
+    streak_runs,
+    user_day_counts,
+    user_mood_counts,
+    user_stats,
+    user_tag_counts,
+)
+from routers.auth import get_current_user
+from schemas import AnalyticsSummary
+
+router = APIRouter()
+
+
+def compute_streaks(days: list[date], today: date) -> tuple[int, int]:
+    """
+    Return (current, longest) runs of consecutive days from a sorted list of
+    distinct entry dates. The current streak only counts if the latest entry
+    is today or yesterday, matching the dashboard's definition.
+    """
+    if not days:
+        return 0, 0
+
+    longest = run = 1
+    for prev, curr in pairwise(days):
+        run = run + 1 if (curr - prev).days == 1 else 1
+        longest = max(longest, run)
+
+    current = 0
+    if (today - days[-1]).days <= 1:
+        current = 1
+        for i in range(len(days) - 1, 0, -1):
+            if (days[i] - days[i - 1]).days != 1:
+                break
+            current += 1
+
+    return current, longest
+
+
+def weekly_average(days: list[date]) -> float:
+    if not days:
+        return 0
+    weeks = max(1, math.ceil((days[-1] - days[0]).days / 7))
+    return round(len(days) / weeks, 2)
+
+
+@router.get("/summary", response_model=AnalyticsSummary)
+async def get_summary(
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Dashboard analytics for the current user, read from the rollups that
+    stats.py maintains on every post write.
+
+    Result size is bounded by the number of distinct days/moods/tags in the
+    window, not by the entry count. Totals and streaks for the whole
+    journal are stored outright; only a `from`/`to` window needs them
+    derived from the per-day rows, and tag counts for a window still come
+    from post_tags.
+    """
+    windowed = date_from is not None or date_to is not None
+
+    def in_window(column):
+        bounds = []
+        if date_from:
+            bounds.append(column >= date_from)
+        if date_to:
+            bounds.append(column <= date_to)
+        return bounds
+
+    per_day = (await db.execute(
+        select(user_day_counts.c.day, user_day_counts.c.entries)
+        .where(user_day_counts.c.user_id == current_user.id, *in_window(user_day_counts.c.day))
+        .order_by(user_day_counts.c.day)
+    )).all()
+    days = [day for day, _ in per_day]
+
+    moods = (await db.execute(
+        select(user_mood_counts.c.day, user_mood_counts.c.mood, user_mood_counts.c.entries)
+        .where(user_mood_counts.c.user_id == current_user.id, *in_window(user_mood_counts.c.day))
+        .order_by(user_mood_counts.c.day, user_mood_counts.c.mood)
+    )).all()
+
+    if windowed:
+        tag_count = func.count(post_tags.c.post_id)
+        tags = (await db.execute(
+            select(Tag.name, tag_count)
+            .join(post_tags, post_tags.c.tag_id == Tag.id)
+            .join(Post, Post.id == post_tags.c.post_id)
+            .where(Tag.owner_id == current_user.id, Post.owner_id == current_user.id,
+                   Post.deleted_at.is_(None),
+                   *in_window(Post.date_posted))
+            .group_by(Tag.name)
+            .order_by(tag_count.desc(), Tag.name)
+        )).all()
+        total = sum(count for _, count in per_day)
+        current, longest = compute_streaks(days, date.today())
+    else:
+        tags = (await db.execute(
+            select(user_tag_counts.c.name, user_tag_counts.c.entries)
+            .where(user_tag_counts.c.user_id == current_user.id)
+            .order_by(user_tag_counts.c.entries.desc(), user_tag_counts.c.name)
+        )).all()
+        stats = (await db.execute(
+            select(user_stats.c.total_entries, user_stats.c.longest_streak)
+            .where(user_stats.c.user_id == current_user.id)
+        )).first()
+        latest_run = (await db.execute(
+            select(streak_runs.c.start_day, streak_runs.c.end_day)
+            .where(streak_runs.c.user_id == current_user.id)
+            .order_by(streak_runs.c.end_day.desc())
+            .limit(1)
+        )).first()
+        total, longest = stats or (0, 0)
+        current = 0
+        # Same rule as compute_streaks: the latest run counts while it ends today or yesterday.
+        if latest_run and (date.today() - latest_run.end_day).days <= 1:
+            current = (latest_run.end_day - latest_run.start_day).days + 1
+
+    return {
+        "moodOverTime": [
+            {"date": day, "mood": mood, "count": count} for day, mood, count in moods
+        ],
+        "entryDates": days,
+        "tagCounts": [
+            {"name": name, "count": count} for name, count in tags
+        ],
+        "totalEntries": total,
+        "currentStreak": current,
+        "longestStreak": longest,
+        "averageEntriesPerWeek": weekly_average(days),
+    }
@@ -1,40 +1,150 @@
 import os
-from datetime import datetime, timedelta
+import time
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta
+from itertools import count
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
-from database import get_db
+from cache import TTLCache, make_cache
+from conditional import etag_matches, not_modified, set_validators, weak_etag
+from database import get_async_db
+from metrics import timed
 from models import User
-from schemas import UserOut, UserLogin, UserRegister, Token, UserUpdate, PasswordChange
+from ratelimit import (
+    AUTH_ACCOUNT_FAILURE_RATE,
+    AUTH_ACCOUNT_RATE,
+    AUTH_IP_RATE,
+    WRITE_RATE,
+    auth_admission,
+    client_ip,
+    enforce,
+    limit_ip,
+    refund,
+)
+from schemas import PasswordChange, Token, UserLogin, UserOut, UserRegister, UserUpdate
+from utils import PASSWORD_HASH_RETRY_AFTER_SECONDS, HashingBusy, password_hasher
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+# Times register re-scans for a username after losing a race for one.
+USERNAME_ATTEMPTS = 5
 
 if not SECRET_KEY:
     raise RuntimeError("SECRET_KEY is not set. Add it to your .env and Render environment variables.")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Resolved users and verified token claims are cached so an authenticated
+# request doesn't cost a JWT verify plus a users SELECT. A token's subject
+# never changes, so verifications stay in each worker; users go through the
+# configured CACHE_BACKEND so invalidate_user() reaches every worker.
+# Writes to a user must call invalidate_user().
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "2048"))
+
+token_cache = TTLCache(maxsize=AUTH_CACHE_MAX_SIZE, ttl=AUTH_CACHE_TTL_SECONDS, namespace="tokens")
+user_cache = make_cache("users", maxsize=AUTH_CACHE_MAX_SIZE, ttl=AUTH_CACHE_TTL_SECONDS)
 
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire = datetime.now(UTC) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(
+async def hash_password(password: str) -> str:
+    try:
+        with timed("bcrypt"):
+            return await password_hasher.hash(password)
+    except HashingBusy:
+        raise _busy_exception()
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        with timed("bcrypt"):
+            return await password_hasher.verify(plain_password, hashed_password)
+    except HashingBusy:
+        raise _busy_exception()
+
+
+def _busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please try again shortly",
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
+
+async def invalidate_user(user_id: int) -> None:
+    await user_cache.adelete(user_id)
+
+
+def auth_cache_stats() -> dict[str, dict[str, int]]:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+
+def _decode_user_id(token: str) -> int | None:
+    """Verify `token` and return its subject, reusing earlier verifications."""
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user_id = int(payload["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
+
+    # Never serve a cached claim past the token's own expiry.
+    token_cache.set(token, user_id, ttl=payload.get("exp", 0) - time.time())
+    return user_id
+
+
+# Never copied into the shared user cache; handlers that need them load them.
+_UNCACHED_COLUMNS = frozenset({"hashed_password"})
+
+
+def _snapshot(user: User) -> dict:
+    return {
+        column.key: getattr(user, column.key)
+        for column in User.__table__.columns
+        if column.key not in _UNCACHED_COLUMNS
+    }
+
+
+def optional_user_id(token: str | None = Depends(optional_oauth2_scheme)) -> int | None:
+    """
+    The caller's user id from their token alone, or None if they sent none.
+    No database lookup, so endpoints that only need the id stay off it.
+    """
+    if token is None:
+        return None
+    user_id = _decode_user_id(token)
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_id
+
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -42,98 +152,165 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str | None = payload.get("sub")
-        if not user_id:
-            raise credentials_exception
-    except JWTError:
+    with timed("jwt"):
+        user_id = _decode_user_id(token)
+    if user_id is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    with timed("user"):
+        cached = await user_cache.aget(user_id)
+        if cached is not None:
+            # Rebuild the row and attach it to this request's session as if it
+            # had just been loaded, so handlers can still modify and commit it.
+            # Uncached columns are left expired and aren't loaded implicitly.
+            user = User(**cached)
+            make_transient_to_detached(user)
+            db.add(user)
+            return user
+
+        user = await db.get(User, user_id)
     if user is None:
         raise credentials_exception
 
+    await user_cache.aset(user_id, _snapshot(user))
     return user
 
 
-@router.post("/register", response_model=Token)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == user_data.email).first()
+async def write_quota(current_user: User = Depends(get_current_user)) -> None:
+    """Dependency charging each write to the current user's WRITE_RATE bucket."""
+    await enforce(f"writes:user:{current_user.id}", WRITE_RATE)
+
+
+# Everything that runs bcrypt is rate limited per IP and admitted only while
+# the worker has room, so a flood is turned away before it costs CPU.
+AUTH_GUARDS = [Depends(limit_ip("auth", AUTH_IP_RATE)), Depends(auth_admission)]
+
+
+def _free_username(base: str, taken: Iterable[str]) -> str:
+    """`base` if it's free, otherwise `base` plus the smallest unused number."""
+    suffixes = set()
+    for name in taken:
+        if name == base:
+            suffixes.add(0)
+        elif name.startswith(base) and name[len(base):].isdigit():
+            suffixes.add(int(name[len(base):]))
+    if 0 not in suffixes:
+        return base
+    return f"{base}{next(n for n in count(1) if n not in suffixes)}"
+
+
+async def _allocate_username(db: AsyncSession, base: str) -> str:
+    """Pick a free username derived from `base` with a single prefix scan."""
+    escaped = base.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    taken = await db.scalars(select(User.username).where(User.username.like(f"{escaped}%", escape="\\")))
+    return _free_username(base, taken)
+
+
+@router.post("/register", response_model=Token, dependencies=AUTH_GUARDS)
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
+    existing = await db.scalar(select(User).where(User.email == user_data.email))
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    # Derive username from email (make unique by appending a counter if needed)
-    base_username = user_data.email.split("@")[0]
-    username = base_username
-    counter = 1
-    while db.query(User).filter(User.username == username).first():
-        username = f"{base_username}{counter}"
-        counter += 1
-
     # Split name into first and last
     parts = user_data.name.strip().split(" ", 1)
     first_name = parts[0]
     last_name = parts[1] if len(parts) > 1 else ""
+    hashed_password = await hash_password(user_data.password)
 
-    new_user = User(
-        username=username,
-        first_name=first_name,
-        last_name=last_name,
-        email=user_data.email,
-        hashed_password=pwd_context.hash(user_data.password),
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    # Derive username from email. A concurrent signup can claim the same
+    # free name between the scan and the INSERT; the UNIQUE constraint
+    # catches that and the scan is simply repeated.
+    base_username = user_data.email.split("@")[0]
+    for attempt in range(USERNAME_ATTEMPTS):
+        new_user = User(
+            username=await _allocate_username(db, base_username),
+            first_name=first_name,
+            last_name=last_name,
+            email=user_data.email,
+            hashed_password=hashed_password,
+        )
+        db.add(new_user)
+        try:
+            await db.commit()
+            break
+        except IntegrityError:
+            await db.rollback()
+            if await db.scalar(select(User.id).where(User.email == user_data.email)):
+                raise HTTPException(status_code=400, detail="Email already registered")
+            if attempt == USERNAME_ATTEMPTS - 1:
+                raise
 
     token = create_access_token({"sub": str(new_user.id)})
     return {"access_token": token, "token_type": "bearer"}
 
 
-@router.post("/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_data.email).first()
-    if not user or not pwd_context.verify(user_data.password, user.hashed_password):
+@router.post("/login", response_model=Token, dependencies=AUTH_GUARDS)
+async def login(request: Request, user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    # A tight bucket per account from each IP slows guessing one password
+    # from one place. The account's own bucket caps guesses spread across
+    # many IPs; it only keeps failed attempts, so a stranger has to keep
+    # failing to lock the owner out, and the owner's logins don't count.
+    account = user_data.email.lower()
+    await enforce(f"login:account:{account}:ip:{client_ip(request)}", AUTH_ACCOUNT_RATE)
+    await enforce(f"login:account:{account}", AUTH_ACCOUNT_FAILURE_RATE)
+    user = await db.scalar(select(User).where(User.email == user_data.email))
+    if not user or not await verify_password(user_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
+    await refund(f"login:account:{account}", AUTH_ACCOUNT_FAILURE_RATE)
 
     token = create_access_token({"sub": str(user.id)})
     return {"access_token": token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=UserOut)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+):
+    # The profile is already in hand (usually from the user cache), so the
+    # ETag is just a digest of the fields UserOut exposes.
+    etag = weak_etag("me", *(getattr(current_user, field) for field in UserOut.model_fields))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_validators(response, etag)
     return current_user
 
 
 @router.patch("/me", response_model=UserOut)
-def update_me(
+async def update_me(
     updates: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     for field, value in updates.model_dump(exclude_unset=True).items():
         setattr(current_user, field, value)
-    db.commit()
-    db.refresh(current_user)
+    # Post listings embed the owner's profile, so their ETags must change too.
+    current_user.posts_version = User.posts_version + 1
+    await db.commit()
+    await invalidate_user(current_user.id)
     return current_user
 
 
-@router.post("/change-password")
-def change_password(
+@router.post("/change-password", dependencies=AUTH_GUARDS)
+async def change_password(
     body: PasswordChange,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    if not pwd_context.verify(body.current_password, current_user.hashed_password):
+    await enforce(f"password:account:{current_user.id}", AUTH_ACCOUNT_RATE)
+    hashed_password = await db.scalar(select(User.hashed_password).where(User.id == current_user.id))
+    if not await verify_password(body.current_password, hashed_password):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     if len(body.new_password) < 6:
         raise HTTPException(status_code=400, detail="New password must be at least 6 characters")
-    current_user.hashed_password = pwd_context.hash(body.new_password)
-    db.commit()
+    current_user.hashed_password = await hash_password(body.new_password)
+    await db.commit()
+    await invalidate_user(current_user.id)
     return {"message": "Password updated successfully"}
 
 
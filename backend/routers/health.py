@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Response, status
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db, pool_status
+
+router = APIRouter()
+
+
+@router.get("/db")
+async def db_health(response: Response, db: AsyncSession = Depends(get_async_db)):
+    """Round-trips a SELECT 1 and reports the connection pool's counters."""
+    try:
+        await db.execute(text("SELECT 1"))
+        db_status = "ok"
+    except SQLAlchemyError:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        db_status = "unavailable"
+    return {"status": db_status, **pool_status(db.get_bind())}
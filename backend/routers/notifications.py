@@ -0,0 +1,206 @@
+import base64
+import binascii
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import false, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from models import Notification, NotificationPreference, User
+from notifications import mark_read, notify_many, parse_weekdays, unread_count
+from reminders import schedule, zone
+from routers.auth import get_current_user, write_quota
+from schemas import (
+    NotificationCreate,
+    NotificationIds,
+    NotificationOut,
+    NotificationPreferences,
+    NotificationPreferencesUpdate,
+    NotificationsInserted,
+    NotificationsUpdated,
+    UnreadCount,
+)
+from utils import utcnow
+
+router = APIRouter()
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+NOTIFICATION_BULK_MAX = 500
+
+
+def encode_cursor(notification: Notification) -> str:
+    raw = f"{notification.created_at.isoformat()}|{notification.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, notification_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(notification_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _row(item: NotificationCreate, current_user: User) -> dict:
+    if item.user_id is not None and item.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="You can only create notifications for yourself")
+    return {
+        "user_id": current_user.id,
+        "type": item.type,
+        "title": item.title,
+        "message": item.message,
+        "meta": item.metadata or {},
+    }
+
+
+@router.get("/", response_model=list[NotificationOut])
+async def read_notifications(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    unread: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Newest-first page of the current user's notifications, optionally only
+    unread ones. Keyed on (created_at, id) like the posts listing; the next
+    page's cursor comes back in X-Next-Cursor.
+    """
+    query = select(Notification).where(Notification.user_id == current_user.id)
+    if unread:
+        query = query.where(Notification.read == false())
+    if cursor:
+        query = query.where(
+            tuple_(Notification.created_at, Notification.id) < tuple_(*decode_cursor(cursor))
+        )
+    rows = (await db.scalars(
+        query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit + 1)
+    )).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1])
+    return rows
+
+@router.post("/", response_model=NotificationOut, dependencies=[Depends(write_quota)])
+async def create_notification(
+    item: NotificationCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    [notification_id] = await notify_many(db, [_row(item, current_user)])
+    await db.commit()
+    return await db.get(Notification, notification_id)
+
+@router.post("/bulk", response_model=NotificationsInserted, dependencies=[Depends(write_quota)])
+async def create_notifications(
+    items: list[NotificationCreate],
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Insert many notifications in one statement."""
+    if len(items) > NOTIFICATION_BULK_MAX:
+        raise HTTPException(
+            status_code=413, detail=f"At most {NOTIFICATION_BULK_MAX} notifications can be created per request"
+        )
+    ids = await notify_many(db, [_row(item, current_user) for item in items])
+    await db.commit()
+    return {"inserted": len(ids)}
+
+@router.get("/unread-count", response_model=UnreadCount)
+async def get_unread_count(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Read from the maintained counter, so polling it costs one primary-key lookup."""
+    return {"count": await unread_count(db, current_user.id)}
+
+@router.put("/read-all", response_model=NotificationsUpdated)
+async def mark_all_read(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    updated = await mark_read(db, current_user.id)
+    await db.commit()
+    return {"updated": updated}
+
+@router.put("/read", response_model=NotificationsUpdated)
+async def mark_many_read(
+    body: NotificationIds,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Mark the listed notifications read; ids that aren't the user's are ignored."""
+    if len(body.ids) > NOTIFICATION_BULK_MAX:
+        raise HTTPException(
+            status_code=413, detail=f"At most {NOTIFICATION_BULK_MAX} notifications can be updated per request"
+        )
+    updated = await mark_read(db, current_user.id, body.ids)
+    await db.commit()
+    return {"updated": updated}
+
+@router.get("/preferences", response_model=NotificationPreferences)
+async def get_preferences(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    prefs = await db.get(NotificationPreference, current_user.id)
+    return _preferences_out(prefs)
+
+@router.put("/preferences", response_model=NotificationPreferences)
+async def update_preferences(
+    updates: NotificationPreferencesUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    prefs = await db.get(NotificationPreference, current_user.id)
+    if prefs is None:
+        prefs = NotificationPreference(user_id=current_user.id, **_defaults())
+        db.add(prefs)
+    values = updates.model_dump(exclude_unset=True)
+    try:
+        if "reminder_days" in values:
+            values["reminder_days"] = ",".join(parse_weekdays(values["reminder_days"] or [])) or None
+        if values.get("timezone") is not None:
+            zone(values["timezone"])
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    for field, value in values.items():
+        if value is not None or field in ("reminder_time", "reminder_days"):
+            setattr(prefs, field, value)
+    # Keeps the reminder scheduler's next_fire_at index in step.
+    schedule(prefs, utcnow())
+    await db.commit()
+    return _preferences_out(prefs)
+
+@router.put("/{notification_id}/read", response_model=NotificationOut)
+async def mark_one_read(
+    notification_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    notification = await db.scalar(
+        select(Notification).where(Notification.id == notification_id, Notification.user_id == current_user.id)
+    )
+    if notification is None:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    if not notification.read:
+        await mark_read(db, current_user.id, [notification_id])
+        await db.commit()
+        await db.refresh(notification)
+    return notification
+
+
+def _defaults() -> dict:
+    return NotificationPreferences().model_dump(exclude={"reminder_days"})
+
+
+def _preferences_out(prefs: NotificationPreference | None) -> dict:
+    if prefs is None:
+        return NotificationPreferences().model_dump()
+    out = {field: getattr(prefs, field) for field in NotificationPreferences.model_fields}
+    out["reminder_days"] = prefs.reminder_days.split(",") if prefs.reminder_days else []
+    return out
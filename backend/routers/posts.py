@@ -1,87 +1,420 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import NoResultFound
+import base64
+import binascii
+import calendar
+import zlib
+from collections.abc import AsyncIterator
+from datetime import date
+from typing import Literal
 
-from database import get_db
-from models import Post, User
-from routers.auth import get_current_user
-from schemas import PostCreate, PostOut, PostOutWithUser, PostUpdate, PostIn
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from conditional import etag_matches, not_modified, set_validators, weak_etag
+from database import get_async_db
+from importer import BULK_IMPORT_MAX_ROWS, ImportTooLarge, MalformedImport, import_posts
+from models import Post, Tag, User, post_signatures, post_tags
+from ratelimit import bulk_admission
+from routers.auth import get_current_user, write_quota
+from schemas import (
+    BulkImportResult,
+    PostCreate,
+    PostIn,
+    PostOut,
+    PostOutWithUser,
+    PostSearchHit,
+    PostUpdate,
+    SimilarPost,
+)
+from search import search_posts
+from similarity import index_posts, similar_posts
+from stats import post_stat_row, update_stats
+from tags import apply_tags
+from utils import utcnow
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXPORT_BATCH_SIZE = 500
+# Soft-deleted posts stay in the table until purge.py removes them; every
+# read here goes through this so they never surface.
+LIVE = Post.deleted_at.is_(None)
+EXPORT_COLUMNS = (
+    Post.id, Post.content, Post.date_posted, Post.mood,
+    Post.privacy, Post.tags, Post.owner_id, Post.prompt_id,
+)
+
+
+def encode_cursor(post: Post) -> str:
+    raw = f"{post.date_posted.isoformat()}:{post.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        day, post_id = base64.urlsafe_b64decode(padded).decode().split(":")
+        return date.fromisoformat(day), int(post_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _with_owner(posts: list[Post], owner: User) -> list[Post]:
+    # Every post in these responses belongs to the current user, so fill in
+    # the relationship from the object we already hold instead of loading it.
+    for post in posts:
+        set_committed_value(post, "owner", owner)
+    return posts
+
+
+async def _bump_version(db: AsyncSession, owner_id: int) -> None:
+    """Invalidate the owner's post ETags; runs in the caller's transaction."""
+    await db.execute(
+        update(User)
+        .where(User.id == owner_id)
+        .values(posts_version=User.posts_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def _get_owned_post(db: AsyncSession, post_id: int, owner: User, deleted: bool = False) -> Post | None:
+    """
+    Load one of the owner's posts with everything PostOutWithUser serializes.
+    With `deleted`, only a soft-deleted post matches instead of a live one.
+    """
+    result = await db.execute(
+        select(Post)
+        .where(Post.id == post_id, Post.owner_id == owner.id, ~LIVE if deleted else LIVE)
+        .options(joinedload(Post.prompt))
+    )
+    post = result.scalar_one_or_none()
+    if post is not None:
+        _with_owner([post], owner)
+    return post
+
+
 @router.get("/", response_model=list[PostOutWithUser])
-def read_posts(
-    db: Session = Depends(get_db),
+async def read_posts(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    tag: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    return (
-        db.query(Post)
-        .filter(Post.owner_id == current_user.id)
-        .all()
+    """
+    Newest-first page of the current user's posts, optionally limited to
+    those carrying `tag`.
+
+    Pages are keyed on (date_posted, id) so each one is an index seek no
+    matter how deep the client has scrolled. When more rows remain, the
+    cursor for the next page is returned in the X-Next-Cursor header.
+
+    The ETag covers the user's posts version and the query string, so an
+    unchanged page is answered with 304 before any post is read.
+    """
+    version = await db.scalar(select(User.posts_version).where(User.id == current_user.id))
+    etag = weak_etag("posts", current_user.id, version, request.url.query)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_validators(response, etag)
+
+    query = select(Post).where(Post.owner_id == current_user.id, LIVE)
+    if date_from:
+        query = query.where(Post.date_posted >= date_from)
+    if date_to:
+        query = query.where(Post.date_posted <= date_to)
+    if tag:
+        query = (
+            query.join(post_tags, post_tags.c.post_id == Post.id)
+            .join(Tag, Tag.id == post_tags.c.tag_id)
+            .where(Tag.owner_id == current_user.id, Tag.name == tag.strip())
+        )
+    if cursor:
+        query = query.where(
+            tuple_(Post.date_posted, Post.id) < tuple_(*decode_cursor(cursor))
+        )
+
+    result = await db.execute(
+        query.options(joinedload(Post.prompt))
+        .order_by(Post.date_posted.desc(), Post.id.desc())
+        .limit(limit + 1)
     )
+    rows = result.scalars().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1])
+    return _with_owner(rows, current_user)
 
-@router.post("/", response_model=PostOut)
-def create_post(
+@router.post("/", response_model=PostOut, dependencies=[Depends(write_quota)])
+async def create_post(
     post: PostCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     db_post = Post(
         content=post.content,
         mood=post.mood,
         privacy=post.privacy,
-        tags=post.tags,
         prompt_id=post.prompt_id,
-        owner_id=current_user.id
+        owner_id=current_user.id,
+        date_posted=date.today(),
     )
-    db.add(db_post)
-    db.commit()
-    db.refresh(db_post)
+
+    def write(session):
+        apply_tags(session, db_post, post.tags)
+        session.add(db_post)
+        session.flush()
+        index_posts(session, current_user.id, [(db_post.id, db_post.content)])
+        update_stats(session, current_user.id, added=[post_stat_row(db_post)])
+
+    await db.run_sync(write)
+    await _bump_version(db, current_user.id)
+    await db.commit()
+    await db.refresh(db_post)
     return db_post
 
+@router.post(
+    "/bulk", response_model=BulkImportResult, dependencies=[Depends(write_quota), Depends(bulk_admission)]
+)
+async def bulk_create_posts(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Import many entries in one request, e.g. when migrating from another
+    journaling app. The body is NDJSON or a JSON array of PostImport
+    objects. Invalid rows are skipped and listed in `errors` by their
+    position in the body; everything else is inserted in one transaction.
+    """
+    try:
+        result = await import_posts(db, current_user.id, request.stream())
+    except ImportTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {BULK_IMPORT_MAX_ROWS} entries can be imported per request",
+        )
+    except MalformedImport as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if result["inserted"]:
+        await _bump_version(db, current_user.id)
+    await db.commit()
+    return result
+
+async def _export_lines(db: AsyncSession, owner_id: int, fmt: str) -> AsyncIterator[bytes]:
+    """
+    Stream the owner's posts oldest-first, one batch at a time from a
+    server-side cursor, so memory use doesn't grow with the journal.
+    """
+    result = await db.stream(
+        select(*EXPORT_COLUMNS)
+        .where(Post.owner_id == owner_id, LIVE)
+        .order_by(Post.date_posted, Post.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    separator = b"\n" if fmt == "ndjson" else b",\n"
+    first = True
+    if fmt == "json":
+        yield b"["
+    async for batch in result.mappings().partitions():
+        chunk = separator.join(orjson.dumps(dict(row)) for row in batch)
+        if fmt == "ndjson":
+            yield chunk + separator
+        else:
+            yield chunk if first else separator + chunk
+        first = False
+    if fmt == "json":
+        yield b"]"
+
+
+async def _gzipped(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+@router.get("/export")
+async def export_posts(
+    fmt: Literal["ndjson", "json"] = Query("ndjson", alias="format"),
+    gzip: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Download the current user's whole journal as NDJSON (one post per line)
+    or a JSON array, streamed as it's read. `gzip=true` compresses the
+    stream on the fly.
+    """
+    body = _export_lines(db, current_user.id, fmt)
+    headers = {"Content-Disposition": f'attachment; filename="luma-journal-export.{fmt}"'}
+    if gzip:
+        body = _gzipped(body)
+        headers["Content-Encoding"] = "gzip"
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+@router.get("/search", response_model=list[PostSearchHit])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Ranked full-text search over the current user's posts. Snippets are
+    HTML-escaped, with matched terms wrapped in <mark> tags.
+    """
+    return await search_posts(db, current_user.id, q, limit)
+
+@router.get("/on-this-day", response_model=list[PostOutWithUser])
+async def on_this_day(
+    day: date | None = Query(None, alias="date"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    The current user's entries from this calendar day (or `date`'s) in
+    earlier years, newest first. Filters on the same month/day expressions
+    as ix_posts_live_owner_month_day, so it's one index range scan.
+    """
+    day = day or date.today()
+    month, day_of_month = func.extract("month", Post.date_posted), func.extract("day", Post.date_posted)
+    same_day = (month == day.month) & (day_of_month == day.day)
+    if (day.month, day.day) == (2, 28) and not calendar.isleap(day.year):
+        # Leap-day entries come up on the 28th in the years without one.
+        same_day = or_(same_day, (month == 2) & (day_of_month == 29))
+    result = await db.execute(
+        select(Post)
+        .where(Post.owner_id == current_user.id, LIVE, same_day, Post.date_posted < day)
+        .options(joinedload(Post.prompt))
+        .order_by(Post.date_posted.desc(), Post.id.desc())
+        .limit(limit)
+    )
+    return _with_owner(result.scalars().all(), current_user)
+
+@router.get("/{post_id}/similar", response_model=list[SimilarPost])
+async def similar(
+    post_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    The current user's entries most like this one, by estimated word
+    overlap. Answered from the MinHash/LSH index in similarity.py.
+    """
+    row = (await db.execute(
+        select(Post.id, post_signatures.c.signature)
+        .outerjoin(post_signatures, post_signatures.c.post_id == Post.id)
+        .where(Post.id == post_id, Post.owner_id == current_user.id, LIVE)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if row.signature is None:
+        return []
+    return await similar_posts(db, current_user.id, row.signature, post_id, limit)
+
 @router.get("/{post_id}", response_model=PostIn)
-def get_post(
+async def get_post(
     post_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+    row = (await db.execute(
+        select(Post, User.posts_version)
+        .join(User, User.id == Post.owner_id)
+        .where(Post.id == post_id, LIVE)
+    )).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Post not found")
+    post, version = row
 
     if post.privacy == "private" and post.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="You do not have permission to view this post")
 
+    etag = weak_etag("post", post.id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_validators(response, etag)
     return post
 
-@router.put("/{post_id}", response_model=PostOutWithUser)
-def update_post(
+@router.put("/{post_id}", response_model=PostOutWithUser, dependencies=[Depends(write_quota)])
+async def update_post(
     post_id: int,
     updated_post: PostUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    post = db.query(Post).filter(Post.id == post_id, Post.owner_id == current_user.id).first()
+    post = await _get_owned_post(db, post_id, current_user)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    for field, value in updated_post.model_dump(exclude_unset=True).items():
+    before = post_stat_row(post)
+    updates = updated_post.model_dump(exclude_unset=True)
+    if "tags" in updates:
+        tags = updates.pop("tags")
+        await db.run_sync(lambda session: apply_tags(session, post, tags))
+    for field, value in updates.items():
         setattr(post, field, value)
+    if "content" in updates:
+        await db.run_sync(lambda session: index_posts(session, current_user.id, [(post.id, post.content)]))
+    after = post_stat_row(post)
+    if after != before:
+        await db.run_sync(lambda session: update_stats(session, current_user.id, [before], [after]))
 
-    db.commit()
-    db.refresh(post)
+    await _bump_version(db, current_user.id)
+    await db.commit()
     return post
 
-@router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_post(
+@router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(write_quota)])
+async def delete_post(
     post_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    try:
-        post = db.query(Post).filter(Post.id == post_id, Post.owner_id == current_user.id).one()
-        db.delete(post)
-        db.commit()
-        return
-    except NoResultFound:
+    """
+    Move a post to the trash. It disappears from every listing straight
+    away and can be brought back with POST /{post_id}/restore until the
+    purge job removes it for good after POST_RETENTION_DAYS.
+    """
+    result = await db.execute(
+        select(Post).where(Post.id == post_id, Post.owner_id == current_user.id, LIVE)
+    )
+    post = result.scalar_one_or_none()
+    if post is None:
         raise HTTPException(status_code=403, detail="Post not found or you do not have permission to delete it")
+    post.deleted_at = utcnow()
+    await db.run_sync(lambda session: update_stats(session, current_user.id, removed=[post_stat_row(post)]))
+    await _bump_version(db, current_user.id)
+    await db.commit()
+
+@router.post("/{post_id}/restore", response_model=PostOutWithUser, dependencies=[Depends(write_quota)])
+async def restore_post(
+    post_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Bring a deleted post back, as long as it hasn't been purged yet."""
+    post = await _get_owned_post(db, post_id, current_user, deleted=True)
+    if not post:
+        raise HTTPException(status_code=404, detail="Deleted post not found")
+    post.deleted_at = None
+    await db.run_sync(lambda session: update_stats(session, current_user.id, added=[post_stat_row(post)]))
+    await _bump_version(db, current_user.id)
+    await db.commit()
+    return post
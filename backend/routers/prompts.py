@@ -1,72 +1,23 @@
-from datetime import date
-from fastapi import APIRouter
+from datetime import date, datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
+from conditional import (
+    etag_matches,
+    not_modified,
+    set_validators,
+    until_midnight,
+    weak_etag,
+)
+from prompt_catalog import PROMPTS, CatalogPrompt, current  # noqa: F401 - PROMPTS re-exported
+from recommender import recommended_prompt
+from reminders import zone
+from routers.auth import optional_user_id
+
 router = APIRouter()
 
-PROMPTS = [
-    "What brought you joy today, even in a small way?",
-    "How are you really feeling right now, beneath the surface?",
-    "What's one thing you're proud of yourself for this week?",
-    "Describe a moment today when you felt most like yourself.",
-    "What would you tell your past self from one year ago?",
-    "What challenged you today and what did it teach you?",
-    "What's something you've been avoiding thinking about?",
-    "What does your body need right now — rest, movement, nourishment?",
-    "Write about a person who made a positive impact on your life.",
-    "What are three things you're grateful for in this moment?",
-    "What emotion has been showing up most for you lately?",
-    "If today had a color, what would it be and why?",
-    "What's a belief you hold that you've never questioned?",
-    "When did you last feel truly at peace? What were you doing?",
-    "What's one small act of kindness you could do for yourself today?",
-    "What does 'home' feel like to you right now?",
-    "What fear has been quietly holding you back?",
-    "Describe your ideal day from start to finish.",
-    "What boundaries do you need to set or reinforce in your life?",
-    "What are you currently learning — about the world or about yourself?",
-    "Write a letter of forgiveness — to yourself or someone else.",
-    "What does success look like to you today (not someday, today)?",
-    "What habit or pattern are you ready to leave behind?",
-    "When did you last laugh until it hurt? What happened?",
-    "What's something that feels heavy right now? Name it.",
-    "What would you do if you knew you couldn't fail?",
-    "How have you grown in the past six months?",
-    "What's a dream you've quietly given up on — and is it really gone?",
-    "What does your inner critic say most often? Is it true?",
-    "Who in your life feels safe to be fully yourself around?",
-    "What's one thing you wish others understood about you?",
-    "What song captures how you feel today?",
-    "Write about a time you showed real courage.",
-    "What are you pretending not to notice in your life?",
-    "What does your future self wish you were doing right now?",
-    "What's a memory you return to when you need comfort?",
-    "What would a perfect morning look like for you?",
-    "What's something you keep saying 'someday' about?",
-    "How do you handle difficult emotions — and is it working?",
-    "What does your creativity look like right now?",
-    "What relationship in your life needs more attention?",
-    "Write about something that recently surprised you.",
-    "What values are most important to you and are you living by them?",
-    "What's one thing you've accomplished that you don't celebrate enough?",
-    "What does your gut tell you about something you've been unsure of?",
-    "What would you do with an entire free day for just yourself?",
-    "How do you want to feel by the end of this month?",
-    "What's something you're still healing from?",
-    "Write about a time someone showed up for you when you needed it.",
-    "What does rest truly feel like for you — not sleep, but real rest?",
-    "What's one conversation you've been putting off?",
-    "What are you most curious about right now?",
-    "Describe your relationship with change.",
-    "What does loneliness feel like to you, and when does it visit?",
-    "What's something you've recently changed your mind about?",
-    "What is your body telling you that your mind keeps ignoring?",
-    "Write about a version of yourself you've outgrown.",
-    "What does love look like in your day-to-day life?",
-    "What's the kindest thing anyone has said to you recently?",
-    "What story are you telling yourself that may not be true?",
-    "Where do you find meaning on ordinary days?",
-]
+MAX_UPCOMING_DAYS = 31
 
 
 class PromptResponse(BaseModel):
@@ -75,12 +26,83 @@ class PromptResponse(BaseModel):
     date_created: date
 
 
+def _local_now(tz: str | None) -> datetime:
+    """Now in `tz`, or in the server's timezone when the caller didn't say."""
+    if tz is None:
+        return datetime.now()
+    try:
+        return datetime.now(zone(tz))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+def _schedule(user_id: int | None, start: date, days: int) -> list[tuple[date, CatalogPrompt]]:
+    """
+    Prompts for `days` days from `start`: the recommender's cached picks
+    for signed-in users who have some, otherwise their rotation.
+    """
+    catalog = current()
+    schedule = catalog.upcoming(user_id or 0, start, days)
+    if user_id is None:
+        return schedule
+    return [(day, recommended_prompt(catalog, user_id, day) or prompt) for day, prompt in schedule]
+
+
+def _cached_until_midnight(
+    request: Request, response: Response, now: datetime, user_id: int | None, *etag_parts
+) -> Response | None:
+    """
+    Mark the response cacheable until the caller's midnight, or return the
+    304 to send instead. Rotations are per user, so signed-in responses are
+    only cacheable by the browser.
+    """
+    max_age, expires = until_midnight(now)
+    scope = "public" if user_id is None else "private"
+    cache_control = f"{scope}, max-age={max_age}"
+    etag = weak_etag("prompt", user_id or 0, now.date().isoformat(), current().version, *etag_parts)
+    response.headers["Vary"] = "Authorization"
+    if etag_matches(request, etag):
+        not_modified_response = not_modified(etag, cache_control)
+        not_modified_response.headers["Expires"] = expires
+        not_modified_response.headers["Vary"] = "Authorization"
+        return not_modified_response
+    set_validators(response, etag, cache_control)
+    response.headers["Expires"] = expires
+    return None
+
+
 @router.get("/prompt-of-the-day", response_model=PromptResponse)
-def get_prompt_of_the_day():
-    today = date.today()
-    index = today.toordinal() % len(PROMPTS)
-    return PromptResponse(
-        id=index + 1,
-        content=PROMPTS[index],
-        date_created=today,
-    )
+def get_prompt_of_the_day(
+    request: Request,
+    response: Response,
+    tz: str | None = None,
+    user_id: int | None = Depends(optional_user_id),
+):
+    """
+    Today's prompt in `tz` (an IANA name; the server's zone if omitted).
+    Signed-in users get their own rotation, or their recommendations once
+    the recommender has some; either way it comes from memory (and the
+    cache) with no database query.
+    """
+    now = _local_now(tz)
+    [(today, prompt)] = _schedule(user_id, now.date(), 1)
+    cached = _cached_until_midnight(request, response, now, user_id, prompt.id)
+    if cached is not None:
+        return cached
+    return PromptResponse(id=prompt.id, content=prompt.content, date_created=today)
+
+@router.get("/upcoming", response_model=list[PromptResponse])
+def get_upcoming_prompts(
+    request: Request,
+    response: Response,
+    days: int = Query(7, ge=1, le=MAX_UPCOMING_DAYS),
+    tz: str | None = None,
+    user_id: int | None = Depends(optional_user_id),
+):
+    """The next `days` prompts starting today, each dated with the day it's for."""
+    now = _local_now(tz)
+    schedule = _schedule(user_id, now.date(), days)
+    cached = _cached_until_midnight(request, response, now, user_id, *(prompt.id for _, prompt in schedule))
+    if cached is not None:
+        return cached
+    return [PromptResponse(id=prompt.id, content=prompt.content, date_created=day) for day, prompt in schedule]
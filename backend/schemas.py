@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
-from datetime import date
+from datetime import date, datetime
+
+from pydantic import BaseModel, EmailStr, Field
+
 
 # ========== Auth ==========
 class Token(BaseModel):
@@ -8,7 +9,7 @@ class Token(BaseModel):
     token_type: str
 
 class TokenData(BaseModel):
-    email: Optional[str] = None
+    email: str | None = None
 
 class UserLogin(BaseModel):
     email: str
@@ -28,9 +29,9 @@ class UserCreate(BaseModel):
     password: str
 
 class UserUpdate(BaseModel):
-    first_name: Optional[str] = None
-    last_name: Optional[str] = None
-    email: Optional[str] = None
+    first_name: str | None = None
+    last_name: str | None = None
+    email: str | None = None
 
 class PasswordChange(BaseModel):
     current_password: str
@@ -58,23 +59,35 @@ class PromptOut(BaseModel):
 # ========== Posts ==========
 class PostIn(BaseModel):
     content: str
-    mood: Optional[str] = None
-    privacy: Optional[str] = "private"
-    tags: Optional[str] = None
-    prompt_id: Optional[int] = None
+    mood: str | None = None
+    privacy: str | None = "private"
+    tags: str | None = None
+    prompt_id: int | None = None
 
 class PostCreate(PostIn):
     pass
 
+# Imported entries keep their original date; it defaults to today.
+class PostImport(PostCreate):
+    date_posted: date | None = None
+
+class BulkImportError(BaseModel):
+    index: int
+    error: str
+
+class BulkImportResult(BaseModel):
+    inserted: int
+    errors: list[BulkImportError]
+
 class PostOut(BaseModel):
     id: int
     content: str
     date_posted: date
-    mood: Optional[str] = None
+    mood: str | None = None
     privacy: str
-    tags: Optional[str] = None
+    tags: str | None = None
     owner_id: int
-    prompt_id: Optional[int] = None
+    prompt_id: int | None = None
 
     class Config:
         from_attributes = True
@@ -83,19 +96,116 @@ class PostOutWithUser(BaseModel):
     id: int
     content: str
     date_posted: date
-    mood: Optional[str] = None
+    mood: str | None = None
     privacy: str
-    tags: Optional[str] = None
+    tags: str | None = None
     owner_id: int
-    prompt_id: Optional[int] = None
+    prompt_id: int | None = None
     owner: UserOut
-    prompt: Optional[PromptOut] = None
+    prompt: PromptOut | None = None
 
     class Config:
         from_attributes = True
 
+class PostSearchHit(BaseModel):
+    id: int
+    date_posted: date
+    mood: str | None = None
+    tags: str | None = None
+    rank: float
+    snippet: str
+
+class SimilarPost(BaseModel):
+    id: int
+    date_posted: date
+    mood: str | None = None
+    tags: str | None = None
+    excerpt: str
+    # Estimated share of distinct words the two entries have in common.
+    score: float
+
 class PostUpdate(BaseModel):
-    content: Optional[str] = None
-    mood: Optional[str] = None
-    privacy: Optional[str] = None
-    tags: Optional[str] = None
+    content: str | None = None
+    mood: str | None = None
+    privacy: str | None = None
+    tags: str | None = None
+
+# ========== Analytics ==========
+# Field names are camelCase to match the frontend's AnalyticsData type.
+class MoodDataPoint(BaseModel):
+    date: date
+    mood: str
+    count: int
+
+class TagCount(BaseModel):
+    name: str
+    count: int
+
+class AnalyticsSummary(BaseModel):
+    moodOverTime: list[MoodDataPoint]
+    entryDates: list[date]
+    tagCounts: list[TagCount]
+    totalEntries: int
+    currentStreak: int
+    longestStreak: int
+    averageEntriesPerWeek: float
+
+# ========== Notifications ==========
+class NotificationCreate(BaseModel):
+    # Optional, and only ever the caller's own id: users notify themselves.
+    user_id: int | None = None
+    type: str
+    title: str
+    message: str
+    metadata: dict | None = None
+
+class NotificationOut(BaseModel):
+    id: int
+    user_id: int
+    type: str
+    title: str
+    message: str
+    # Stored on the model as `meta`; see models.Notification.
+    metadata: dict | None = Field(None, validation_alias="meta")
+    read: bool
+    created_at: datetime
+    updated_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+class NotificationIds(BaseModel):
+    ids: list[int]
+
+class NotificationsInserted(BaseModel):
+    inserted: int
+
+class NotificationsUpdated(BaseModel):
+    updated: int
+
+class UnreadCount(BaseModel):
+    count: int
+
+class NotificationPreferences(BaseModel):
+    email_new_follower: bool = True
+    email_journal_reminder: bool = True
+    email_weekly_digest: bool = True
+    push_new_follower: bool = True
+    push_journal_reminder: bool = True
+    push_milestones: bool = True
+    reminder_enabled: bool = False
+    reminder_time: str | None = Field(None, pattern=r"^([01]\d|2[0-3]):[0-5]\d$")
+    reminder_days: list[str] = []
+    timezone: str = "UTC"
+
+class NotificationPreferencesUpdate(BaseModel):
+    email_new_follower: bool | None = None
+    email_journal_reminder: bool | None = None
+    email_weekly_digest: bool | None = None
+    push_new_follower: bool | None = None
+    push_journal_reminder: bool | None = None
+    push_milestones: bool | None = None
+    reminder_enabled: bool | None = None
+    reminder_time: str | None = Field(None, pattern=r"^([01]\d|2[0-3]):[0-5]\d$")
+    reminder_days: list[str] | None = None
+    timezone: str | None = None
@@ -0,0 +1,201 @@
+"""
+Full-text search over post content.
+
+PostgreSQL keeps a generated ``tsvector`` column with a GIN index; SQLite
+(used by the test suite) keeps an external-content FTS5 table in sync with
+triggers. Both are created alongside the posts table and queried with raw
+SQL since neither is mapped on the model. Any other database falls back to
+an unranked ILIKE scan, newest first, so search still works there, just
+slowly.
+"""
+
+import html
+import re
+
+from sqlalchemy import and_, event, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+# The database marks matches with these control characters instead of the
+# tags above; the snippet is HTML-escaped first and they're swapped for the
+# tags afterwards, so markup in a post can't reach the page as HTML.
+_MATCH_START = "\x02"
+_MATCH_END = "\x03"
+# Characters of context either side of the first match in a fallback snippet.
+FALLBACK_SNIPPET_CONTEXT = 60
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        content, content='posts', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF content ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO posts_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+]
+
+_POSTGRES_DDL = [
+    """
+    ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(content, ''))) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING GIN (search_vector)",
+]
+
+_SQLITE_QUERY = text("""
+    SELECT p.id, p.date_posted, p.mood, p.tags,
+           -bm25(posts_fts) AS rank,
+           snippet(posts_fts, 0, :match_start, :match_end, '…', 16) AS snippet
+    FROM posts_fts JOIN posts p ON p.id = posts_fts.rowid
+    WHERE posts_fts MATCH :q AND p.owner_id = :owner_id AND p.deleted_at IS NULL
+    ORDER BY rank DESC, p.id DESC
+    LIMIT :limit
+""")
+
+# Rank in the inner query and only build headlines for the page that is
+# returned — ts_headline re-parses the document and is the expensive part.
+_POSTGRES_QUERY = text("""
+    SELECT p.id, p.date_posted, p.mood, p.tags, hits.rank,
+           ts_headline('english', p.content, hits.query, :headline_options) AS snippet
+    FROM (
+        SELECT p.id, ts_rank(p.search_vector, q) AS rank, q AS query
+        FROM posts p, websearch_to_tsquery('english', :q) q
+        WHERE p.owner_id = :owner_id AND p.deleted_at IS NULL AND p.search_vector @@ q
+        ORDER BY rank DESC, p.id DESC
+        LIMIT :limit
+    ) hits
+    JOIN posts p ON p.id = hits.id
+    ORDER BY hits.rank DESC, p.id DESC
+""")
+
+
+_HEADLINE_OPTIONS = (
+    f'StartSel="{_MATCH_START}", StopSel="{_MATCH_END}", MaxFragments=2, MaxWords=16, MinWords=6'
+)
+
+
+def install_search_index(connection: Connection) -> None:
+    """Create the dialect's search structures. Safe to call repeatedly."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        fresh = not connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'posts_fts'")
+        ).first()
+        for statement in _SQLITE_DDL:
+            connection.execute(text(statement))
+        if fresh:
+            connection.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+    elif dialect == "postgresql":
+        for statement in _POSTGRES_DDL:
+            connection.execute(text(statement))
+
+
+def _create_search_index(target, connection: Connection, **kw) -> None:
+    install_search_index(connection)
+
+
+def _drop_search_index(target, connection: Connection, **kw) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DROP TABLE IF EXISTS posts_fts"))
+
+
+def register_search_index(posts_table) -> None:
+    """Tie the search structures to the posts table's create/drop."""
+    event.listen(posts_table, "after_create", _create_search_index)
+    event.listen(posts_table, "before_drop", _drop_search_index)
+
+
+def _fts5_query(q: str) -> str:
+    # Quote every term so user input can't be parsed as FTS5 syntax
+    # (AND/OR/NEAR, column filters, unbalanced quotes).
+    terms = re.findall(r"\w+", q)
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def _highlight(snippet: str) -> str:
+    """HTML-escape `snippet`, then turn its match markers into <mark> tags."""
+    return (
+        html.escape(snippet)
+        .replace(_MATCH_START, SNIPPET_START)
+        .replace(_MATCH_END, SNIPPET_END)
+    )
+
+
+async def search_posts(db: AsyncSession, owner_id: int, q: str, limit: int) -> list[dict]:
+    """Return the owner's best matches for `q`, best first, with snippets."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        match = _fts5_query(q)
+        if not match:
+            return []
+        result = await db.execute(_SQLITE_QUERY, {
+            "q": match, "owner_id": owner_id, "limit": limit,
+            "match_start": _MATCH_START, "match_end": _MATCH_END,
+        })
+    elif dialect == "postgresql":
+        result = await db.execute(_POSTGRES_QUERY, {
+            "q": q, "owner_id": owner_id, "limit": limit, "headline_options": _HEADLINE_OPTIONS,
+        })
+    else:
+        return await _search_ilike(db, owner_id, q, limit)
+    return [{**row._mapping, "snippet": _highlight(row.snippet or "")} for row in result]
+
+
+def _fallback_snippet(content: str, terms: list[str]) -> str:
+    content = content.replace(_MATCH_START, "").replace(_MATCH_END, "")
+    lowered = content.lower()
+    start = min((lowered.find(term.lower()) for term in terms), key=lambda i: (i < 0, i))
+    if start < 0:
+        return html.escape(content[:2 * FALLBACK_SNIPPET_CONTEXT])
+    term = next(term for term in terms if lowered.find(term.lower()) == start)
+    end = start + len(term)
+    before = max(0, start - FALLBACK_SNIPPET_CONTEXT)
+    return _highlight(
+        ("…" if before else "") + content[before:start]
+        + _MATCH_START + content[start:end] + _MATCH_END
+        + content[end:end + FALLBACK_SNIPPET_CONTEXT]
+        + ("…" if end + FALLBACK_SNIPPET_CONTEXT < len(content) else "")
+    )
+
+
+async def _search_ilike(db: AsyncSession, owner_id: int, q: str, limit: int) -> list[dict]:
+    """Posts containing every term of `q`, newest first, for databases without a search index."""
+    from models import Post  # models imports this module
+
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return []
+    escaped = [term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") for term in terms]
+    rows = (await db.execute(
+        select(Post.id, Post.date_posted, Post.mood, Post.tags, Post.content)
+        .where(
+            Post.owner_id == owner_id,
+            Post.deleted_at.is_(None),
+            and_(*(Post.content.ilike(f"%{term}%", escape="\\") for term in escaped)),
+        )
+        .order_by(Post.date_posted.desc(), Post.id.desc())
+        .limit(limit)
+    )).all()
+    return [
+        {
+            "id": row.id, "date_posted": row.date_posted, "mood": row.mood, "tags": row.tags,
+            "rank": 0.0, "snippet": _fallback_snippet(row.content, terms),
+        }
+        for row in rows
+    ]
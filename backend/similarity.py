@@ -0,0 +1,155 @@
+"""
+"Similar entries" via MinHash and locality-sensitive hashing.
+
+Each post's content is reduced to its set of content words (the same
+tokenizer the prompt recommender uses) and summarised by a MinHash
+signature of SIGNATURE_SIZE values: for any two posts, the fraction of
+positions where their signatures agree estimates the Jaccard similarity of
+their word sets. Signatures are cut into LSH_BANDS bands of LSH_ROWS values
+and each band becomes a bucket key, so posts that share a bucket agree on a
+whole band and likely neighbours share several.
+
+``post_lsh_buckets`` holds one (owner_id, bucket) row per band, which makes
+finding candidates a single indexed ``bucket IN (...)`` lookup scoped to the
+owner, however large their journal is. Only those candidates' signatures
+are compared. Rows are written in the same transaction as the post
+(create, update and bulk import); deleted posts drop out by joining live
+posts, and the purge job removes the rows along with the post.
+
+One SHAKE-128 digest per word supplies all 64 16-bit hash values, so
+signing an entry costs a hash per distinct word and an element-wise min.
+"""
+
+import hashlib
+import struct
+from collections.abc import Iterable
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import Post, post_lsh_buckets, post_signatures
+from recommender import tokenize
+
+SIGNATURE_SIZE = 64
+# Two rows per band: entries whose word sets overlap by a quarter share a
+# band ~87% of the time, unrelated ones (a twentieth) ~8%.
+LSH_BANDS = 32
+LSH_ROWS = SIGNATURE_SIZE // LSH_BANDS
+# Candidates scored per lookup, those sharing the most bands first.
+SIMILAR_CANDIDATES = 200
+SIMILAR_EXCERPT_LENGTH = 200
+BACKFILL_BATCH_SIZE = 500
+
+_HASHES = struct.Struct(f"<{SIGNATURE_SIZE}H")
+
+
+def signature(content: str) -> bytes | None:
+    """MinHash of `content`'s word set, or None if it has no content words."""
+    words = set(tokenize(content))
+    if not words:
+        return None
+    hashes = (_HASHES.unpack(hashlib.shake_128(word.encode()).digest(_HASHES.size)) for word in words)
+    return _HASHES.pack(*map(min, zip(*hashes)))
+
+
+def buckets(sig: bytes) -> list[int]:
+    """One bucket key per band: the band number followed by its hash values."""
+    values = _HASHES.unpack(sig)
+    keys = []
+    for band in range(LSH_BANDS):
+        key = band
+        for value in values[band * LSH_ROWS:(band + 1) * LSH_ROWS]:
+            key = key << 16 | value
+        keys.append(key)
+    return keys
+
+
+def estimate(a: bytes, b: bytes) -> float:
+    """Estimated Jaccard similarity of the word sets behind two signatures."""
+    return sum(x == y for x, y in zip(_HASHES.unpack(a), _HASHES.unpack(b))) / SIGNATURE_SIZE
+
+
+def index_posts(db: Session, owner_id: int, posts: Iterable[tuple[int, str]]) -> None:
+    """
+    (Re)index `posts`, (id, content) pairs belonging to `owner_id`.
+    Runs in the caller's transaction.
+    """
+    posts = list(posts)
+    if not posts:
+        return
+    ids = [post_id for post_id, _ in posts]
+    db.execute(delete(post_lsh_buckets).where(post_lsh_buckets.c.post_id.in_(ids)))
+    db.execute(delete(post_signatures).where(post_signatures.c.post_id.in_(ids)))
+    signatures, bucket_rows = [], []
+    for post_id, content in posts:
+        sig = signature(content)
+        if sig is None:
+            continue
+        signatures.append({"post_id": post_id, "signature": sig})
+        bucket_rows.extend(
+            {"post_id": post_id, "band": band, "owner_id": owner_id, "bucket": key}
+            for band, key in enumerate(buckets(sig))
+        )
+    if signatures:
+        db.execute(insert(post_signatures), signatures)
+        db.execute(insert(post_lsh_buckets), bucket_rows)
+
+
+def backfill_signatures(db: Session) -> int:
+    """Index posts written before similarity search existed; a no-op once all have been."""
+    pending = (
+        select(Post.id, Post.owner_id, Post.content)
+        .where(~select(post_signatures.c.post_id).where(post_signatures.c.post_id == Post.id).exists())
+        .order_by(Post.id)
+        .limit(BACKFILL_BATCH_SIZE)
+    )
+    indexed, after = 0, 0
+    while True:
+        rows = db.execute(pending.where(Post.id > after)).all()
+        if not rows:
+            return indexed
+        by_owner: dict[int, list[tuple[int, str]]] = {}
+        for row in rows:
+            by_owner.setdefault(row.owner_id, []).append((row.id, row.content))
+        for owner_id, posts in by_owner.items():
+            index_posts(db, owner_id, posts)
+        db.commit()
+        indexed += len(rows)
+        # Posts with no content words never get a signature, so move past them.
+        after = rows[-1].id
+
+
+async def similar_posts(db: AsyncSession, owner_id: int, sig: bytes, exclude: int, limit: int) -> list[dict]:
+    """The owner's live posts most similar to `sig` (other than `exclude`), best first."""
+    shared = (
+        select(post_lsh_buckets.c.post_id, func.count().label("shared"))
+        .where(
+            post_lsh_buckets.c.owner_id == owner_id,
+            post_lsh_buckets.c.bucket.in_(buckets(sig)),
+            post_lsh_buckets.c.post_id != exclude,
+        )
+        .group_by(post_lsh_buckets.c.post_id)
+        .order_by(func.count().desc())
+        .limit(SIMILAR_CANDIDATES)
+        .subquery()
+    )
+    rows = (await db.execute(
+        select(
+            Post.id, Post.date_posted, Post.mood, Post.tags,
+            func.substr(Post.content, 1, SIMILAR_EXCERPT_LENGTH).label("excerpt"),
+            post_signatures.c.signature,
+        )
+        .join(shared, shared.c.post_id == Post.id)
+        .join(post_signatures, post_signatures.c.post_id == Post.id)
+        .where(Post.deleted_at.is_(None))
+    )).all()
+    hits = [
+        {
+            "id": row.id, "date_posted": row.date_posted, "mood": row.mood, "tags": row.tags,
+            "excerpt": row.excerpt, "score": estimate(sig, row.signature),
+        }
+        for row in rows
+    ]
+    hits.sort(key=lambda hit: (hit["score"], hit["id"]), reverse=True)
+    return hits[:limit]
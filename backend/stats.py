@@ -0,0 +1,293 @@
+"""
+Incrementally maintained journal statistics.
+
+Rather than re-aggregating every post when analytics are viewed, each post
+write adjusts a few per-user rollups in the same transaction:
+
+- ``user_day_counts`` / ``user_mood_counts``: entries per day and per (day, mood)
+- ``user_tag_counts``: entries per tag
+- ``streak_runs``: every run of consecutive writing days as (start, end)
+- ``user_stats``: total entries and the longest run
+
+Reading stats is then a few index lookups however long the journal is.
+Anything that writes posts without going through these helpers (manual
+SQL, an interrupted deploy) can leave the rollups drifting; repair them
+with ``python -m stats rebuild [--user ID]``.
+"""
+
+import argparse
+from collections import Counter
+from collections.abc import Iterable
+from datetime import date, timedelta
+
+from sqlalchemy import Table, bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from database import dialect_insert
+from models import (
+    Post,
+    Tag,
+    User,
+    post_tags,
+    streak_runs,
+    user_day_counts,
+    user_mood_counts,
+    user_stats,
+    user_tag_counts,
+)
+
+# (date_posted, mood, tag names) — everything about a post the rollups count.
+StatRow = tuple[date, str | None, tuple[str, ...]]
+
+ONE_DAY = timedelta(days=1)
+
+
+def stat_row(date_posted: date, mood: str | None, tags: str | None) -> StatRow:
+    """Build a StatRow from a post's columns; `tags` is the canonical tags string."""
+    return date_posted, mood, tuple(name for name in (tags or "").split(",") if name)
+
+
+def post_stat_row(post: Post) -> StatRow:
+    return stat_row(post.date_posted, post.mood, post.tags)
+
+
+def _add_counts(
+    db: Session, owner_id: int, table: Table, keys: tuple[str, ...], deltas: Counter
+) -> dict[tuple, int]:
+    """
+    Add `deltas` ({key tuple: change}) to the entries column, dropping rows
+    that reach zero. Returns each touched key's new count.
+    """
+    changes = [
+        {"user_id": owner_id, **dict(zip(keys, key)), "entries": delta}
+        for key, delta in deltas.items() if delta
+    ]
+    if not changes:
+        return {}
+
+    stmt = dialect_insert(db, table)
+    # The upsert reports the count as it stands once this transaction holds
+    # the row, so concurrent writers never both see a day as new.
+    counts = {
+        tuple(row[:-1]): row[-1]
+        for row in db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.user_id, *(table.c[key] for key in keys)],
+                set_={"entries": table.c.entries + stmt.excluded.entries},
+            ).returning(*(table.c[key] for key in keys), table.c.entries),
+            changes,
+        )
+    }
+
+    emptied = [change for change in changes if change["entries"] < 0]
+    if emptied:
+        db.execute(
+            delete(table).where(
+                table.c.user_id == bindparam("owner"),
+                *(table.c[key] == bindparam(f"k_{key}") for key in keys),
+                table.c.entries <= 0,
+            ),
+            [
+                {"owner": owner_id, **{f"k_{key}": change[key] for key in keys}}
+                for change in emptied
+            ],
+        )
+    return counts
+
+
+def _run_length(start: date, end: date) -> int:
+    return (end - start).days + 1
+
+
+def _add_day(db: Session, owner_id: int, day: date) -> int:
+    """Join `day` onto its neighbouring runs; return the length of the run it ends up in."""
+    mine = streak_runs.c.user_id == owner_id
+    before = db.execute(
+        select(streak_runs.c.start_day).where(mine, streak_runs.c.end_day == day - ONE_DAY)
+    ).scalar()
+    after = db.execute(
+        select(streak_runs.c.end_day).where(mine, streak_runs.c.start_day == day + ONE_DAY)
+    ).scalar()
+
+    start = before or day
+    end = after or day
+    if after:
+        db.execute(delete(streak_runs).where(mine, streak_runs.c.start_day == day + ONE_DAY))
+    if before:
+        db.execute(update(streak_runs).where(mine, streak_runs.c.start_day == start).values(end_day=end))
+    else:
+        db.execute(insert(streak_runs).values(user_id=owner_id, start_day=start, end_day=end))
+    return _run_length(start, end)
+
+
+def _remove_day(db: Session, owner_id: int, day: date) -> int:
+    """Cut `day` out of its run; return the length the run had before."""
+    mine = streak_runs.c.user_id == owner_id
+    run = db.execute(
+        select(streak_runs.c.start_day, streak_runs.c.end_day)
+        .where(mine, streak_runs.c.end_day >= day)
+        .order_by(streak_runs.c.end_day)
+        .limit(1)
+    ).first()
+    if run is None or run.start_day > day:
+        return 0
+
+    db.execute(delete(streak_runs).where(mine, streak_runs.c.start_day == run.start_day))
+    pieces = [(run.start_day, day - ONE_DAY), (day + ONE_DAY, run.end_day)]
+    for start, end in pieces:
+        if start <= end:
+            db.execute(insert(streak_runs).values(user_id=owner_id, start_day=start, end_day=end))
+    return _run_length(run.start_day, run.end_day)
+
+
+def _longest_run(db: Session, owner_id: int) -> int:
+    runs = db.execute(
+        select(streak_runs.c.start_day, streak_runs.c.end_day).where(streak_runs.c.user_id == owner_id)
+    ).all()
+    return max((_run_length(start, end) for start, end in runs), default=0)
+
+
+def update_stats(
+    db: Session, owner_id: int, removed: Iterable[StatRow] = (), added: Iterable[StatRow] = ()
+) -> None:
+    """
+    Apply post writes to the owner's rollups: `removed` rows are what the
+    affected posts looked like before, `added` what they look like now.
+    Runs in the caller's transaction.
+    """
+    days, moods, tags = Counter(), Counter(), Counter()
+    for sign, rows in ((-1, removed), (1, added)):
+        for day, mood, names in rows:
+            days[(day,)] += sign
+            if mood is not None:
+                moods[(day, mood)] += sign
+            for name in names:
+                tags[(name,)] += sign
+    days = Counter({key: delta for key, delta in days.items() if delta})
+
+    # Upserting the user's row first also locks it, so concurrent writes for
+    # the same user apply their streak changes one after another.
+    stmt = dialect_insert(db, user_stats)
+    longest = db.execute(
+        stmt.values(user_id=owner_id, total_entries=sum(days.values()), longest_streak=0)
+        .on_conflict_do_update(
+            index_elements=[user_stats.c.user_id],
+            set_={"total_entries": user_stats.c.total_entries + stmt.excluded.total_entries},
+        )
+        .returning(user_stats.c.longest_streak)
+    ).scalar_one()
+
+    counts = _add_counts(db, owner_id, user_day_counts, ("day",), days)
+    _add_counts(db, owner_id, user_mood_counts, ("day", "mood"), moods)
+    _add_counts(db, owner_id, user_tag_counts, ("name",), tags)
+
+    record, recompute = longest, False
+    for (day,), delta in sorted(days.items()):
+        has = counts[(day,)] > 0
+        had = counts[(day,)] - delta > 0
+        if has and not had:
+            record = max(record, _add_day(db, owner_id, day))
+        # Only splitting the longest run can shorten the record.
+        elif had and not has and _remove_day(db, owner_id, day) >= record:
+            recompute = True
+    if recompute:
+        record = _longest_run(db, owner_id)
+    if record != longest:
+        db.execute(
+            update(user_stats).where(user_stats.c.user_id == owner_id).values(longest_streak=record)
+        )
+
+
+def rebuild_stats(db: Session, owner_id: int) -> None:
+    """Recompute the owner's rollups from their posts, replacing whatever is stored."""
+    # user_stats first: like update_stats, take the user's row lock before the
+    # other rollups so a concurrent post write waits instead of deadlocking.
+    for table in (user_stats, user_day_counts, user_mood_counts, user_tag_counts, streak_runs):
+        db.execute(delete(table).where(table.c.user_id == owner_id))
+
+    mine = (Post.owner_id == owner_id) & Post.deleted_at.is_(None)
+    per_day = db.execute(
+        select(Post.date_posted, func.count(Post.id)).where(mine)
+        .group_by(Post.date_posted).order_by(Post.date_posted)
+    ).all()
+    moods = db.execute(
+        select(Post.date_posted, Post.mood, func.count(Post.id)).where(mine, Post.mood.isnot(None))
+        .group_by(Post.date_posted, Post.mood)
+    ).all()
+    tags = db.execute(
+        select(Tag.name, func.count(post_tags.c.post_id))
+        .join(post_tags, post_tags.c.tag_id == Tag.id)
+        .join(Post, Post.id == post_tags.c.post_id)
+        .where(Tag.owner_id == owner_id, Post.deleted_at.is_(None))
+        .group_by(Tag.name)
+    ).all()
+
+    runs = []
+    for day, _ in per_day:
+        if runs and runs[-1][1] + ONE_DAY == day:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+
+    if per_day:
+        db.execute(insert(user_day_counts), [
+            {"user_id": owner_id, "day": day, "entries": count} for day, count in per_day
+        ])
+        db.execute(insert(streak_runs), [
+            {"user_id": owner_id, "start_day": start, "end_day": end} for start, end in runs
+        ])
+    if moods:
+        db.execute(insert(user_mood_counts), [
+            {"user_id": owner_id, "day": day, "mood": mood, "entries": count} for day, mood, count in moods
+        ])
+    if tags:
+        db.execute(insert(user_tag_counts), [
+            {"user_id": owner_id, "name": name, "entries": count} for name, count in tags
+        ])
+    db.execute(insert(user_stats).values(
+        user_id=owner_id,
+        total_entries=sum(count for _, count in per_day),
+        longest_streak=max((_run_length(start, end) for start, end in runs), default=0),
+    ))
+
+
+def rebuild_all_stats(db: Session, only_missing: bool = False) -> int:
+    """
+    Rebuild every user's rollups, committing per user. With `only_missing`,
+    only users who have posts but no user_stats row yet are rebuilt, which
+    makes it cheap to run on every startup.
+    """
+    query = select(User.id).order_by(User.id)
+    if only_missing:
+        query = query.where(
+            select(Post.id).where(Post.owner_id == User.id, Post.deleted_at.is_(None)).exists(),
+            ~select(user_stats.c.user_id).where(user_stats.c.user_id == User.id).exists(),
+        )
+    rebuilt = 0
+    for owner_id in db.scalars(query).all():
+        rebuild_stats(db, owner_id)
+        db.commit()
+        rebuilt += 1
+    return rebuilt
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m stats", description=__doc__.split("\n\n")[0].strip())
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild", help="recompute analytics rollups from posts")
+    rebuild.add_argument("--user", type=int, help="only rebuild this user id")
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        if args.user is not None:
+            rebuild_stats(db, args.user)
+            db.commit()
+            print(f"Rebuilt stats for user {args.user}")
+        else:
+            print(f"Rebuilt stats for {rebuild_all_stats(db)} users")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Normalized tag storage.
+
+Posts keep their ``tags`` string for API compatibility, but it's rewritten
+to a canonical comma-separated form on every write and mirrored into the
+``tags``/``post_tags`` tables, which are what filtering and counting use.
+"""
+
+from sqlalchemy import exists, insert, select
+from sqlalchemy.orm import Session
+
+from models import Post, Tag, post_tags
+from utils import parse_tags
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def apply_tags(db: Session, post: Post, raw: str | None) -> None:
+    """Parse `raw` once and point `post` at the owner's matching Tag rows."""
+    names = parse_tags(raw)
+    existing = {}
+    if names:
+        existing = {
+            tag.name: tag
+            for tag in db.query(Tag).filter(Tag.owner_id == post.owner_id, Tag.name.in_(names))
+        }
+    missing = [name for name in names if name not in existing]
+    if missing:
+        for name in missing:
+            existing[name] = Tag(owner_id=post.owner_id, name=name)
+            db.add(existing[name])
+        # Flush so later lookups in the same transaction see the new rows.
+        db.flush()
+
+    post.tag_list = [existing[name] for name in names]
+    post.tags = ",".join(names) or None
+
+
+def link_tags(db: Session, owner_id: int, post_names: list[tuple[int, list[str]]]) -> None:
+    """
+    Bulk counterpart of apply_tags for posts that were just inserted without
+    going through the ORM: `post_names` pairs each post id with its parsed
+    tag names. Costs one lookup and at most two batched INSERTs.
+    """
+    names = {name for _, post_tag_names in post_names for name in post_tag_names}
+    if not names:
+        return
+
+    ids = dict(db.execute(
+        select(Tag.name, Tag.id).where(Tag.owner_id == owner_id, Tag.name.in_(names))
+    ).all())
+    missing = sorted(names - ids.keys())
+    if missing:
+        ids.update(db.execute(
+            insert(Tag).returning(Tag.name, Tag.id),
+            [{"owner_id": owner_id, "name": name} for name in missing],
+        ).all())
+
+    db.execute(insert(post_tags), [
+        {"post_id": post_id, "tag_id": ids[name]}
+        for post_id, post_tag_names in post_names
+        for name in post_tag_names
+    ])
+
+
+def backfill_tags(db: Session) -> int:
+    """
+    Normalize posts written before tags had their own table. Only posts
+    with a tags string and no post_tags rows are touched, so this is a
+    no-op once everything has been migrated.
+    """
+    pending = (
+        select(Post.id)
+        .where(Post.tags.isnot(None))
+        .where(~exists().where(post_tags.c.post_id == Post.id))
+        .limit(BACKFILL_BATCH_SIZE)
+    )
+    migrated = 0
+    while True:
+        ids = db.scalars(pending).all()
+        if not ids:
+            return migrated
+        for post in db.query(Post).filter(Post.id.in_(ids)):
+            apply_tags(db, post, post.tags)
+        db.commit()
+        migrated += len(ids)
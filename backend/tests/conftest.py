@@ -3,11 +3,14 @@ Shared test fixtures.
 
 Sets DATABASE_URL and SECRET_KEY before any app modules are imported so
 the module-level guards in database.py and auth.py don't raise RuntimeError.
-Uses an in-memory SQLite database with StaticPool so all sessions in a test
-share the same connection.
+Uses a throwaway SQLite file so the routers' async (aiosqlite) sessions and
+the sync engine used for schema setup and seeding see the same database.
 """
 
 import os
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
 
 os.environ["DATABASE_URL"] = "sqlite:///:memory:"
 os.environ["SECRET_KEY"] = "test-secret-key-for-testing"
@@ -15,21 +18,32 @@ os.environ["SECRET_KEY"] = "test-secret-key-for-testing"
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
-from database import Base, get_db
-import models  # noqa: F401
-from routers import auth, posts
+import models
+import ratelimit
+import recommender
+from database import Base, get_async_db, get_db
+from routers import analytics, auth, health, notifications, posts, prompts
+from stats import post_stat_row, update_stats
+from tags import apply_tags
+
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
 
 engine = create_engine(
-    "sqlite:///:memory:",
+    f"sqlite:///{TEST_DB_PATH}",
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# NullPool: TestClient may run each request on a fresh event loop, so don't
+# keep aiosqlite connections around between them.
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def override_get_db():
     db = TestingSessionLocal()
@@ -39,10 +53,20 @@ def override_get_db():
         db.close()
 
 
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
 app = FastAPI()
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
 app.include_router(auth.router, prefix="/api/auth")
 app.include_router(posts.router, prefix="/api/posts")
+app.include_router(analytics.router, prefix="/api/analytics")
+app.include_router(notifications.router, prefix="/api/notifications")
+app.include_router(prompts.router, prefix="/api/prompts")
+app.include_router(health.router, prefix="/health")
 
 
 @pytest.fixture(autouse=True)
@@ -50,6 +74,11 @@ def reset_db():
     """Drop and recreate all tables before each test for isolation."""
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    # Ids restart with every fresh schema, so cached users would leak across tests.
+    auth.token_cache.clear()
+    auth.user_cache.clear()
+    ratelimit.buckets.clear()
+    recommender.recommendations.clear()
     yield
 
 
@@ -71,3 +100,56 @@ def registered_user(client):
 @pytest.fixture
 def auth_headers(registered_user):
     return {"Authorization": f"Bearer {registered_user['access_token']}"}
+
+
+@pytest.fixture
+def seed_posts(client):
+    """
+    Insert posts for a user directly, dated `n` days ago for each n in `days`.
+    The API always stamps today's date, so history has to be seeded here.
+    """
+    def _seed(headers, days, **fields):
+        owner_id = client.get("/api/auth/me", headers=headers).json()["id"]
+        db = TestingSessionLocal()
+        try:
+            for n in days:
+                post = models.Post(
+                    content=fields.get("content", f"{n} days ago"),
+                    owner_id=owner_id,
+                    date_posted=date.today() - timedelta(days=n),
+                    **{k: v for k, v in fields.items() if k not in ("content", "tags")},
+                )
+                apply_tags(db, post, fields.get("tags"))
+                db.add(post)
+                update_stats(db, owner_id, added=[post_stat_row(post)])
+                db.commit()
+        finally:
+            db.close()
+
+    return _seed
+
+
+@pytest.fixture
+def count_queries():
+    """
+    Context manager recording every SQL statement the app's async engine
+    runs inside the block, for asserting per-request query budgets:
+
+        with count_queries() as queries:
+            client.get(...)
+        assert len(queries) == 1
+    """
+    @contextmanager
+    def _count():
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    return _count
@@ -0,0 +1,81 @@
+"""Tests for the analytics router."""
+
+from datetime import date, timedelta
+
+from routers.analytics import compute_streaks, weekly_average
+
+
+def _days_ago(n):
+    return (date.today() - timedelta(days=n)).isoformat()
+
+
+def test_summary_empty(client, auth_headers):
+    r = client.get("/api/analytics/summary", headers=auth_headers)
+    assert r.status_code == 200
+    assert r.json() == {
+        "moodOverTime": [],
+        "entryDates": [],
+        "tagCounts": [],
+        "totalEntries": 0,
+        "currentStreak": 0,
+        "longestStreak": 0,
+        "averageEntriesPerWeek": 0,
+    }
+
+
+def test_summary_aggregates(client, auth_headers, seed_posts):
+    seed_posts(auth_headers, [0, 0], mood="great", tags="work, family")
+    seed_posts(auth_headers, [1], mood="low", tags="#work #sleep")
+    seed_posts(auth_headers, [5], tags='["family"]')
+
+    data = client.get("/api/analytics/summary", headers=auth_headers).json()
+    assert data["totalEntries"] == 4
+    assert data["entryDates"] == [_days_ago(5), _days_ago(1), _days_ago(0)]
+    assert data["moodOverTime"] == [
+        {"date": _days_ago(1), "mood": "low", "count": 1},
+        {"date": _days_ago(0), "mood": "great", "count": 2},
+    ]
+    assert {t["name"]: t["count"] for t in data["tagCounts"]} == {
+        "work": 3, "family": 3, "sleep": 1,
+    }
+    assert data["currentStreak"] == 2
+    assert data["longestStreak"] == 2
+
+
+def test_summary_date_window(client, auth_headers, seed_posts):
+    seed_posts(auth_headers, [1, 10, 30])
+    r = client.get(
+        "/api/analytics/summary",
+        params={"from": _days_ago(15), "to": _days_ago(5)},
+        headers=auth_headers,
+    )
+    assert r.json()["entryDates"] == [_days_ago(10)]
+    assert r.json()["totalEntries"] == 1
+
+
+def test_summary_is_user_scoped(client, auth_headers, seed_posts):
+    other = client.post(
+        "/api/auth/register",
+        json={"name": "Other", "email": "other@example.com", "password": "password123"},
+    ).json()
+    seed_posts({"Authorization": f"Bearer {other['access_token']}"}, [0, 1])
+    r = client.get("/api/analytics/summary", headers=auth_headers)
+    assert r.json()["totalEntries"] == 0
+
+
+def test_summary_requires_auth(client):
+    assert client.get("/api/analytics/summary").status_code == 401
+
+
+def test_compute_streaks():
+    today = date(2024, 3, 10)
+    days = [date(2024, 3, d) for d in (1, 2, 3, 6, 8, 9, 10)]
+    assert compute_streaks(days, today) == (3, 3)
+    assert compute_streaks(days, today + timedelta(days=2)) == (0, 3)
+    assert compute_streaks([], today) == (0, 0)
+
+
+def test_weekly_average():
+    days = [date(2024, 1, 1) + timedelta(days=n) for n in range(0, 14, 2)]
+    assert weekly_average(days) == 3.5
+    assert weekly_average([date(2024, 1, 1)]) == 1
@@ -29,6 +29,67 @@ def test_register_username_derived_from_email(client):
     assert r.status_code == 200
 
 
+def _register(client, email):
+    r = client.post("/api/auth/register", json={"name": "N", "email": email, "password": "pass1234"})
+    assert r.status_code == 200
+    return client.get(
+        "/api/auth/me", headers={"Authorization": f"Bearer {r.json()['access_token']}"}
+    ).json()["username"]
+
+
+def _seed_usernames(names):
+    from models import User
+    from tests.conftest import TestingSessionLocal
+
+    db = TestingSessionLocal()
+    try:
+        db.add_all(User(username=name, email=f"{name}@seed.example.com") for name in names)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_register_username_fills_first_gap(client):
+    _seed_usernames(["alice", "alice1", "alice3", "alice_x", "alicex2"])
+    assert _register(client, "alice@example.com") == "alice2"
+    assert _register(client, "alice@example.org") == "alice4"
+    assert _register(client, "bob@example.com") == "bob"
+
+
+def test_register_username_escapes_like_wildcards(client):
+    _seed_usernames(["a_b", "axb1"])
+    assert _register(client, "a_b@example.com") == "a_b1"
+    assert _register(client, "a%b@example.com") == "a%b"
+
+
+def test_register_query_count_ignores_collisions(client, count_queries):
+    with count_queries() as fresh:
+        _register(client, "unique@example.com")
+
+    _seed_usernames(["john"] + [f"john{n}" for n in range(1, 1000)])
+    with count_queries() as colliding:
+        assert _register(client, "john@example.com") == "john1000"
+
+    assert len(colliding) == len(fresh)
+
+
+def test_register_retries_when_username_is_taken_concurrently(client, monkeypatch):
+    from routers import auth
+
+    _seed_usernames(["race"])
+    allocate = auth._allocate_username
+    calls = []
+
+    async def stale_then_fresh(db, base):
+        calls.append(base)
+        # The first scan "missed" the row another signup just committed.
+        return base if len(calls) == 1 else await allocate(db, base)
+
+    monkeypatch.setattr(auth, "_allocate_username", stale_then_fresh)
+    assert _register(client, "race@example.com") == "race1"
+    assert len(calls) == 2
+
+
 def test_login_success(client, registered_user):
     r = client.post(
         "/api/auth/login",
@@ -63,6 +124,17 @@ def test_get_me(client, auth_headers):
     assert data["last_name"] == "User"
 
 
+def test_get_me_conditional_get(client, auth_headers):
+    etag = client.get("/api/auth/me", headers=auth_headers).headers["etag"]
+    r = client.get("/api/auth/me", headers={**auth_headers, "If-None-Match": etag})
+    assert r.status_code == 304
+
+    client.patch("/api/auth/me", json={"first_name": "Renamed"}, headers=auth_headers)
+    r = client.get("/api/auth/me", headers={**auth_headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()["first_name"] == "Renamed"
+
+
 def test_get_me_no_token(client):
     r = client.get("/api/auth/me")
     assert r.status_code == 401
@@ -116,3 +188,107 @@ def test_change_password_too_short(client, auth_headers):
 def test_logout(client):
     r = client.post("/api/auth/logout")
     assert r.status_code == 200
+
+
+def test_me_served_from_cache(client, auth_headers):
+    from routers.auth import auth_cache_stats
+
+    client.get("/api/auth/me", headers=auth_headers)
+    before = auth_cache_stats()
+    r = client.get("/api/auth/me", headers=auth_headers)
+    after = auth_cache_stats()
+
+    assert r.json()["email"] == "test@example.com"
+    assert after["users"]["hits"] == before["users"]["hits"] + 1
+    assert after["tokens"]["hits"] == before["tokens"]["hits"] + 1
+
+
+def test_update_me_invalidates_cached_user(client, auth_headers):
+    client.get("/api/auth/me", headers=auth_headers)
+    client.patch("/api/auth/me", json={"first_name": "Renamed"}, headers=auth_headers)
+    assert client.get("/api/auth/me", headers=auth_headers).json()["first_name"] == "Renamed"
+
+
+def test_update_me_invalidates_user_in_shared_cache(client, auth_headers, tmp_path, monkeypatch):
+    from cache import SQLiteCache
+    from routers import auth
+
+    path = str(tmp_path / "cache.sqlite3")
+    monkeypatch.setattr(auth, "user_cache", SQLiteCache(path, "users", maxsize=10, ttl=60))
+    other_worker = SQLiteCache(path, "users", maxsize=10, ttl=60)
+
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    assert other_worker.get(user_id)["first_name"] == "Test"
+    assert "hashed_password" not in other_worker.get(user_id)
+
+    client.patch("/api/auth/me", json={"first_name": "Renamed"}, headers=auth_headers)
+    assert other_worker.get(user_id) is None
+    assert client.get("/api/auth/me", headers=auth_headers).json()["first_name"] == "Renamed"
+
+
+def test_change_password_with_cached_user(client, auth_headers):
+    client.get("/api/auth/me", headers=auth_headers)
+    client.post(
+        "/api/auth/change-password",
+        json={"current_password": "password123", "new_password": "newpass456"},
+        headers=auth_headers,
+    )
+    r = client.post(
+        "/api/auth/change-password",
+        json={"current_password": "newpass456", "new_password": "password123"},
+        headers=auth_headers,
+    )
+    assert r.status_code == 200
+
+
+def test_change_password_with_user_from_shared_cache(client, auth_headers, tmp_path, monkeypatch):
+    from cache import SQLiteCache
+    from routers import auth
+
+    monkeypatch.setattr(auth, "user_cache", SQLiteCache(str(tmp_path / "cache.sqlite3"), "users", 10, 60))
+    client.get("/api/auth/me", headers=auth_headers)
+    wrong = client.post(
+        "/api/auth/change-password",
+        json={"current_password": "nope", "new_password": "newpass456"},
+        headers=auth_headers,
+    )
+    assert wrong.status_code == 400
+    r = client.post(
+        "/api/auth/change-password",
+        json={"current_password": "password123", "new_password": "newpass456"},
+        headers=auth_headers,
+    )
+    assert r.status_code == 200
+
+
+def test_login_sheds_load_when_hash_queue_full(client, registered_user, monkeypatch):
+    from utils import password_hasher
+
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    r = client.post(
+        "/api/auth/login",
+        json={"email": "test@example.com", "password": "password123"},
+    )
+    assert r.status_code == 503
+    assert int(r.headers["Retry-After"]) > 0
+
+
+def test_password_hasher_round_trip():
+    import asyncio
+
+    from utils import HashingBusy, PasswordHasher
+
+    async def run():
+        hasher = PasswordHasher(workers=0, max_pending=1)
+        hashed = await hasher.hash("s3cret")
+        assert await hasher.verify("s3cret", hashed)
+        assert not await hasher.verify("wrong", hashed)
+
+        hasher.max_pending = 0
+        try:
+            await hasher.hash("s3cret")
+        except HashingBusy:
+            return
+        raise AssertionError("expected HashingBusy")
+
+    asyncio.run(run())
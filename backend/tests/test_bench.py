@@ -0,0 +1,45 @@
+"""Smoke tests for the benchmark harness in bench/."""
+
+import asyncio
+
+import httpx
+
+from bench.datagen import seed
+from bench.report import compare
+from bench.runner import percentile, run
+from tests.conftest import app, engine
+
+
+def test_percentile_nearest_rank():
+    values = [float(n) for n in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([7.0], 95) == 7
+    assert percentile([], 50) == 0
+
+
+def test_seed_and_run_scenarios():
+    dataset = seed(engine, users=3, posts=40, seed=1)
+    assert len(dataset.user_ids) == 3
+    assert sum(len(ids) for ids in dataset.post_ids.values()) == 40
+
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run(
+                client, dataset, ["list", "me", "create", "update", "summary", "export"],
+                requests=6, concurrency=3, warmup=0,
+            )
+
+    results = asyncio.run(go())
+    for name, result in results.items():
+        assert result["requests"] == 6, name
+        assert result["errors"] == 0, (name, result["status_codes"])
+        assert 0 < result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+
+
+def test_compare_flags_regressions():
+    old = {"scenarios": {"list": {"p50_ms": 10, "p95_ms": 20, "p99_ms": 30, "throughput_rps": 100}}}
+    new = {"scenarios": {"list": {"p50_ms": 10.5, "p95_ms": 30, "p99_ms": 30, "throughput_rps": 80}}}
+    _, regressions = compare(old, new, threshold=0.1)
+    assert regressions == ["list p95_ms +50.0%", "list throughput_rps -20.0%"]
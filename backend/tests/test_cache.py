@@ -0,0 +1,174 @@
+"""Tests for the in-process and shared caches."""
+
+import pytest
+
+from cache import Cache, SQLiteCache, TTLCache, make_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_set_and_counters():
+    cache = TTLCache(maxsize=4, ttl=10)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_entries_expire():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=4, ttl=10, timer=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=2)
+    clock.now = 5
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    clock.now = 11
+    assert cache.get("a") is None
+
+
+def test_ttl_override_cannot_extend_default():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=4, ttl=10, timer=clock)
+    cache.set("a", 1, ttl=1000)
+    clock.now = 11
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_delete_and_clear():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.delete("a")
+    assert cache.get("a") is None
+    cache.set("b", 2)
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "size": 0}
+
+
+@pytest.fixture
+def shared_path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+
+def test_sqlite_cache_is_shared_between_workers(shared_path):
+    # Two instances on one file stand in for two worker processes.
+    first = SQLiteCache(shared_path, "users", maxsize=10, ttl=60)
+    second = SQLiteCache(shared_path, "users", maxsize=10, ttl=60)
+    first.set(1, {"name": "Ada"})
+    assert second.get(1) == {"name": "Ada"}
+    assert second.get("1") is None
+
+    first.delete(1)
+    assert second.get(1) is None
+    assert second.stats() == {"hits": 1, "misses": 2, "size": 0}
+
+
+def test_sqlite_cache_namespaces_are_isolated(shared_path):
+    users = SQLiteCache(shared_path, "users", maxsize=10, ttl=60)
+    prompts = SQLiteCache(shared_path, "prompts", maxsize=10, ttl=60)
+    users.set("k", 1)
+    prompts.set("k", 2)
+    assert users.get("k") == 1
+    assert prompts.get("k") == 2
+
+    prompts.invalidate()
+    assert prompts.get("k") is None
+    assert users.get("k") == 1
+
+
+def test_sqlite_cache_invalidate_reaches_every_worker(shared_path):
+    first = SQLiteCache(shared_path, "users", maxsize=10, ttl=60)
+    second = SQLiteCache(shared_path, "users", maxsize=10, ttl=60)
+    first.set("a", 1)
+    first.set("b", 2)
+    second.invalidate()
+    assert first.get("a") is None
+    assert first.get("b") is None
+
+    # Writes after the bump are tagged with the new version and readable again.
+    second.set("a", 3)
+    assert first.get("a") == 3
+
+
+def test_sqlite_cache_entries_expire(shared_path):
+    clock = FakeClock()
+    cache = SQLiteCache(shared_path, "users", maxsize=10, ttl=10, timer=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=2)
+    cache.set("c", 3, ttl=1000)
+    clock.now = 5
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.get("c") is None
+
+
+def test_sqlite_cache_prunes_to_maxsize(shared_path, monkeypatch):
+    monkeypatch.setattr("cache.CACHE_PRUNE_EVERY", 4)
+    cache = SQLiteCache(shared_path, "users", maxsize=2, ttl=60)
+    for i in range(4):
+        cache.set(i, i)
+    assert cache.stats()["size"] == 2
+
+
+def test_sqlite_cache_stores_json_not_pickles(shared_path):
+    import pickle
+    import sqlite3
+
+    cache = SQLiteCache(shared_path, "users", maxsize=10, ttl=60)
+    cache.set("k", {"id": 1, "picks": (2, 3)})
+    assert cache.get("k") == {"id": 1, "picks": [2, 3]}
+
+    # A pickle planted by anyone who can write to the file is never unpickled.
+    db = sqlite3.connect(shared_path)
+    db.execute("UPDATE cache_entries SET value = ?", (pickle.dumps(object()),))
+    db.commit()
+    with pytest.raises(ValueError):
+        cache.get("k")
+
+
+def test_async_methods_match_sync(shared_path):
+    import asyncio
+
+    async def roundtrip(cache):
+        await cache.aset("k", 1)
+        value = await cache.aget("k")
+        await cache.adelete("k")
+        return value, await cache.aget("k", "gone")
+
+    for cache in (TTLCache(maxsize=10, ttl=60), SQLiteCache(shared_path, "users", maxsize=10, ttl=60)):
+        assert asyncio.run(roundtrip(cache)) == (1, "gone")
+
+
+def test_make_cache_picks_backend(shared_path):
+    assert isinstance(make_cache("users", 10, 60, backend="local"), TTLCache)
+    assert isinstance(make_cache("users", 10, 60, backend="sqlite", url=shared_path), SQLiteCache)
+    with pytest.raises(RuntimeError):
+        make_cache("users", 10, 60, backend="memcached")
+
+
+def test_cache_backends_must_implement_the_interface():
+    class Partial(Cache):
+        def get(self, key, default=None):
+            return default
+
+    with pytest.raises(TypeError):
+        Partial()
@@ -0,0 +1,101 @@
+"""Tests for response compression."""
+
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware, accepts_encoding
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+
+@app.get("/big")
+def big():
+    return {"text": "journal " * 200}
+
+
+@app.get("/small")
+def small():
+    return {"text": "hi"}
+
+
+@app.get("/pre-encoded")
+def pre_encoded():
+    body = gzip.compress(b"x" * 1000)
+    return PlainTextResponse(body, headers={"Content-Encoding": "gzip"})
+
+
+client = TestClient(app)
+
+
+def test_large_responses_are_gzipped(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    r = client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert r.json()["text"].startswith("journal")
+
+
+def test_small_responses_are_left_alone():
+    r = client.get("/small", headers={"Accept-Encoding": "gzip, br"})
+    assert "content-encoding" not in r.headers
+
+
+def test_existing_content_encoding_is_not_recompressed():
+    r = client.get("/pre-encoded", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.content == b"x" * 1000
+
+
+def test_brotli_preferred_when_installed():
+    pytest.importorskip("brotli")
+    r = client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert r.headers["content-encoding"] == "br"
+    # httpx decodes br itself whenever brotli is installed.
+    assert r.json()["text"].startswith("journal")
+
+
+def test_accepts_encoding():
+    assert accepts_encoding("gzip, deflate, br", "br")
+    assert accepts_encoding("br;q=0.5", "br")
+    assert not accepts_encoding("br;q=0, gzip", "br")
+    assert not accepts_encoding("brotli", "br")
+
+
+class FakeBrotli:
+    """Stands in for the optional brotli package, tagging what it compressed."""
+
+    class Compressor:
+        def __init__(self, quality):
+            self.quality = quality
+
+        def process(self, body):
+            return body.upper()
+
+        def flush(self):
+            return b"|"
+
+        def finish(self):
+            return b"."
+
+
+def test_brotli_responder_headers(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", FakeBrotli)
+    r = client.get("/big", headers={"Accept-Encoding": "br"})
+    assert r.headers["content-encoding"] == "br"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert int(r.headers["content-length"]) == len(r.content)
+    assert r.content.startswith(b'{"TEXT":"JOURNAL') and r.content.endswith(b".")
+
+
+def test_brotli_responder_passes_through(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", FakeBrotli)
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "br"}).headers
+    r = client.get("/pre-encoded", headers={"Accept-Encoding": "br"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.content == b"x" * 1000
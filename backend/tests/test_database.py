@@ -0,0 +1,196 @@
+"""Tests for engine configuration and the database health endpoint."""
+
+import database
+from database import engine_options, pool_status
+
+
+def test_sqlite_gets_default_engine_options():
+    assert engine_options("sqlite:///:memory:") == {}
+
+
+def test_postgres_pool_options(monkeypatch):
+    monkeypatch.setattr(database, "DB_POOLER", "")
+    monkeypatch.setattr(database, "DB_POOL_SIZE", 7)
+    monkeypatch.setattr(database, "DB_STATEMENT_TIMEOUT_MS", 5000)
+    options = engine_options("postgresql://u:p@host/db")
+    assert options["pool_size"] == 7
+    assert options["pool_pre_ping"] is database.DB_POOL_PRE_PING
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+
+def test_pgbouncer_disables_local_pool(monkeypatch):
+    from sqlalchemy.pool import NullPool
+
+    monkeypatch.setattr(database, "DB_POOLER", "pgbouncer")
+    monkeypatch.setattr(database, "DB_STATEMENT_TIMEOUT_MS", 5000)
+    options = engine_options("postgresql://u:p@host/db")
+    assert options["poolclass"] is NullPool
+    assert "pool_size" not in options
+    assert "connect_args" not in options
+
+
+def test_sync_engine_holds_no_pool(monkeypatch):
+    from sqlalchemy.pool import NullPool
+
+    from database import sync_engine_options
+
+    monkeypatch.setattr(database, "DB_POOLER", "")
+    monkeypatch.setattr(database, "DB_STATEMENT_TIMEOUT_MS", 5000)
+    options = sync_engine_options("postgresql://u:p@host/db")
+    assert options["poolclass"] is NullPool
+    assert not {"pool_size", "max_overflow", "pool_timeout", "pool_recycle"} & options.keys()
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+    assert sync_engine_options("sqlite:///:memory:") == {}
+
+
+def test_pool_status_reports_queue_pool_counters():
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import QueuePool
+
+    engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=2)
+    with engine.connect():
+        status = pool_status(engine)
+    assert status["pool"] == "QueuePool"
+    assert status["checkedout"] == 1
+    assert {"size", "checkedin", "overflow"} <= status.keys()
+
+
+def test_db_health(client):
+    r = client.get("/health/db")
+    assert r.status_code == 200
+    assert r.json()["status"] == "ok"
+    assert r.json()["pool"] == "NullPool"
+
+
+def test_async_url_for_sqlite():
+    from database import async_database_url
+
+    assert async_database_url("sqlite:///./luma.db") == ("sqlite+aiosqlite:///./luma.db", {})
+
+
+def test_async_url_for_postgres_moves_ssl_into_connect_args():
+    from database import async_database_url
+
+    url, connect_args = async_database_url(
+        "postgresql://u:p@ep-x.neon.tech/luma?sslmode=require&channel_binding=require"
+    )
+    assert url == "postgresql+asyncpg://u:p@ep-x.neon.tech/luma"
+    assert connect_args == {"ssl": "require"}
+
+
+def test_async_pgbouncer_disables_prepared_statement_cache(monkeypatch):
+    from database import async_engine_options
+
+    monkeypatch.setattr(database, "DB_POOLER", "pgbouncer")
+    options = async_engine_options("postgresql+asyncpg://u:p@host/db", {"ssl": "require"})
+    assert options["connect_args"]["statement_cache_size"] == 0
+    assert options["connect_args"]["ssl"] == "require"
+
+
+def test_migrations_add_missing_columns():
+    from sqlalchemy import MetaData, create_engine, inspect, text
+
+    import models  # noqa: F401
+    from database import Base
+    from migrations import _ensure_columns
+
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR)"))
+        connection.execute(text("INSERT INTO users (username) VALUES ('old')"))
+
+    users = MetaData()
+    Base.metadata.tables["users"].to_metadata(users)
+    _ensure_columns(engine, users)
+
+    assert "posts_version" in {c["name"] for c in inspect(engine).get_columns("users")}
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT posts_version FROM users")).scalar() == 0
+
+
+def test_migrations_swap_posts_index_for_partial_one():
+    from sqlalchemy import create_engine, inspect, text
+
+    import models  # noqa: F401
+    from database import Base
+    from migrations import run_migrations
+
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE posts (id INTEGER PRIMARY KEY, content TEXT, date_posted DATE, "
+            "owner_id INTEGER, mood VARCHAR, privacy VARCHAR, tags VARCHAR, prompt_id INTEGER)"
+        ))
+        connection.execute(text("CREATE INDEX ix_posts_owner_date_id ON posts (owner_id, date_posted, id)"))
+
+    # Same order as init_db(): new tables first, then existing ones upgraded.
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine, Base.metadata)
+
+    # Reflection can't see expression indexes on SQLite; a second boot must still work.
+    run_migrations(engine, Base.metadata)
+
+    inspector = inspect(engine)
+    assert "deleted_at" in {c["name"] for c in inspector.get_columns("posts")}
+    with engine.connect() as connection:
+        indexes = set(connection.scalars(text("SELECT name FROM sqlite_master WHERE type = 'index'")))
+    assert "ix_posts_owner_date_id" not in indexes
+    assert {"ix_posts_live_owner_date_id", "ix_posts_deleted_at", "ix_posts_live_owner_month_day"} <= indexes
+
+
+def test_backfills_run_once_per_database(monkeypatch):
+    from sqlalchemy import create_engine, text
+
+    import models  # noqa: F401
+    from database import Base
+    from migrations import BACKFILLS, run_migrations
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    ran = []
+    monkeypatch.setattr("similarity.backfill_signatures", lambda db: ran.append("signatures"))
+    run_migrations(engine, Base.metadata)
+    run_migrations(engine, Base.metadata)
+
+    assert ran == ["signatures"]
+    with engine.connect() as connection:
+        done = set(connection.scalars(text("SELECT name FROM completed_backfills")))
+    assert done == set(BACKFILLS)
+
+
+def test_migration_lock_serializes_postgres_workers():
+    from contextlib import contextmanager
+    from types import SimpleNamespace
+
+    from migrations import MIGRATION_LOCK_KEY, migration_lock
+
+    log = []
+
+    class FakeConnection:
+        def execute(self, statement, params):
+            log.append((str(statement), params["key"]))
+
+        def commit(self):
+            log.append("commit")
+
+    @contextmanager
+    def connect():
+        yield FakeConnection()
+
+    engine = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"), connect=connect)
+    with migration_lock(engine):
+        log.append("migrate")
+    assert log == [
+        ("SELECT pg_advisory_lock(:key)", MIGRATION_LOCK_KEY), "commit",
+        "migrate",
+        ("SELECT pg_advisory_unlock(:key)", MIGRATION_LOCK_KEY), "commit",
+    ]
+
+
+def test_migration_lock_is_a_no_op_on_sqlite():
+    from sqlalchemy import create_engine
+
+    from migrations import migration_lock
+
+    with migration_lock(create_engine("sqlite://")):
+        pass
@@ -0,0 +1,78 @@
+"""Tests for request/DB instrumentation and the /metrics endpoint."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import metrics
+from metrics import MetricsMiddleware, Registry, instrument_engine
+from routers.metrics import router as metrics_router
+from tests.conftest import app, async_engine
+
+
+@pytest.fixture
+def instrumented():
+    """The test app wrapped in MetricsMiddleware, with the test engine instrumented."""
+    registry = Registry()
+    instrument_engine(async_engine.sync_engine)
+    yield TestClient(MetricsMiddleware(app, registry=registry)), registry
+    event.remove(async_engine.sync_engine, "before_cursor_execute", metrics._before_cursor_execute)
+    event.remove(async_engine.sync_engine, "after_cursor_execute", metrics._after_cursor_execute)
+
+
+def _timing(header):
+    entries = {}
+    for entry in header.split(", "):
+        name, *params = entry.split(";")
+        entries[name] = dict(param.split("=", 1) for param in params)
+    return entries
+
+
+def test_server_timing_breaks_down_request(instrumented, auth_headers):
+    client, _ = instrumented
+    client.post("/api/posts/", json={"content": "timed"}, headers=auth_headers)
+    r = client.get("/api/posts/", headers=auth_headers)
+    timing = _timing(r.headers["server-timing"])
+    assert {"jwt", "user", "db", "total"} <= timing.keys()
+    # The user comes from the auth cache; posts version + listing hit the database.
+    assert timing["db"]["desc"] == '"2 queries"'
+    assert float(timing["total"]["dur"]) >= float(timing["db"]["dur"])
+
+
+def test_registry_groups_by_route_template(instrumented, auth_headers):
+    client, registry = instrumented
+    for content in ("a", "b"):
+        post_id = client.post("/api/posts/", json={"content": content}, headers=auth_headers).json()["id"]
+        client.get(f"/api/posts/{post_id}", headers=auth_headers)
+    client.get("/nope")
+
+    text = registry.render()
+    series = 'method="GET",route="/api/posts/{post_id}",status="200"'
+    assert f'luma_request_duration_seconds_count{{{series}}} 2' in text
+    assert f'luma_request_duration_seconds_bucket{{{series},le="+Inf"}} 2' in text
+    assert f"luma_db_queries_total{{{series}}} 2" in text
+    assert 'route="unmatched",status="404"' in text
+
+
+def test_queries_outside_requests_are_ignored(instrumented):
+    import asyncio
+
+    from sqlalchemy import text
+
+    async def query():
+        async with async_engine.connect() as connection:
+            return await connection.scalar(text("SELECT 1"))
+
+    _, registry = instrumented
+    assert asyncio.run(query()) == 1
+    assert "luma_db_queries_total{" not in registry.render()
+
+
+def test_metrics_endpoint():
+    metrics_app = FastAPI()
+    metrics_app.include_router(metrics_router)
+    r = TestClient(metrics_app).get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE luma_request_duration_seconds histogram" in r.text
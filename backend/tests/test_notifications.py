@@ -0,0 +1,170 @@
+"""Tests for the notifications router."""
+
+import asyncio
+
+from sqlalchemy import select
+
+from models import Notification, notification_counts
+from notifications import notify_many
+from tests.conftest import TestingAsyncSessionLocal, TestingSessionLocal
+
+
+def _make_user(client, email):
+    r = client.post("/api/auth/register", json={"name": "N", "email": email, "password": "password123"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def _notify(client, headers, n, **fields):
+    r = client.post(
+        "/api/notifications/bulk",
+        json=[{"type": "milestone", "title": f"Title {i}", "message": "m", **fields} for i in range(n)],
+        headers=headers,
+    )
+    assert r.status_code == 200
+    return r.json()
+
+
+def _unread(client, headers):
+    return client.get("/api/notifications/unread-count", headers=headers).json()["count"]
+
+
+def test_create_and_list_notification(client, auth_headers):
+    r = client.post(
+        "/api/notifications/",
+        json={"type": "milestone", "title": "7-day streak!", "message": "Nice", "metadata": {"streak_days": 7}},
+        headers=auth_headers,
+    )
+    assert r.status_code == 200
+    created = r.json()
+    assert created["read"] is False
+    assert created["metadata"] == {"streak_days": 7}
+    assert created["created_at"]
+
+    assert client.get("/api/notifications/", headers=auth_headers).json() == [created]
+    assert _unread(client, auth_headers) == 1
+
+
+def test_cannot_notify_other_users(client, auth_headers):
+    r = client.post(
+        "/api/notifications/",
+        json={"user_id": 999, "type": "t", "title": "t", "message": "m"},
+        headers=auth_headers,
+    )
+    assert r.status_code == 403
+
+
+def test_listing_is_keyset_paginated_and_user_scoped(client, auth_headers):
+    other = _make_user(client, "other@example.com")
+    _notify(client, other, 2)
+    assert _notify(client, auth_headers, 5) == {"inserted": 5}
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/api/notifications/", params=params, headers=auth_headers)
+        seen += [n["title"] for n in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    # Same timestamp for the whole batch, so ids break the tie.
+    assert seen == [f"Title {i}" for i in reversed(range(5))]
+
+
+def test_invalid_cursor(client, auth_headers):
+    r = client.get("/api/notifications/", params={"cursor": "nope"}, headers=auth_headers)
+    assert r.status_code == 400
+
+
+def test_mark_read_keeps_counter_in_step(client, auth_headers):
+    _notify(client, auth_headers, 4)
+    ids = [n["id"] for n in client.get("/api/notifications/", headers=auth_headers).json()]
+
+    r = client.put(f"/api/notifications/{ids[0]}/read", headers=auth_headers)
+    assert r.json()["read"] is True
+    # Marking it again doesn't count twice.
+    client.put(f"/api/notifications/{ids[0]}/read", headers=auth_headers)
+    assert _unread(client, auth_headers) == 3
+
+    r = client.put("/api/notifications/read", json={"ids": ids[:3]}, headers=auth_headers)
+    assert r.json() == {"updated": 2}
+    assert _unread(client, auth_headers) == 1
+    unread = client.get("/api/notifications/", params={"unread": True}, headers=auth_headers).json()
+    assert [n["id"] for n in unread] == [ids[3]]
+
+    assert client.put("/api/notifications/read-all", headers=auth_headers).json() == {"updated": 1}
+    assert _unread(client, auth_headers) == 0
+
+
+def test_cannot_mark_other_users_notification(client, auth_headers):
+    other = _make_user(client, "other@example.com")
+    _notify(client, other, 1)
+    notification_id = client.get("/api/notifications/", headers=other).json()[0]["id"]
+
+    assert client.put(f"/api/notifications/{notification_id}/read", headers=auth_headers).status_code == 404
+    assert client.put("/api/notifications/read", json={"ids": [notification_id]}, headers=auth_headers).json() == {
+        "updated": 0
+    }
+    assert _unread(client, other) == 1
+
+
+def test_unread_count_is_one_lookup(client, auth_headers, count_queries):
+    _notify(client, auth_headers, 50)
+    client.get("/api/notifications/unread-count", headers=auth_headers)
+    with count_queries() as queries:
+        assert _unread(client, auth_headers) == 50
+    assert len(queries) == 1
+    assert "notification_counts" in queries[0]
+
+
+def test_fan_out_is_batched(client, count_queries):
+    user_ids = [
+        client.get("/api/auth/me", headers=_make_user(client, f"u{i}@example.com")).json()["id"]
+        for i in range(3)
+    ]
+
+    async def fan_out():
+        async with TestingAsyncSessionLocal() as db:
+            await notify_many(db, [
+                {"user_id": user_id, "type": "digest", "title": "Week", "message": "m"}
+                for user_id in user_ids for _ in range(10)
+            ])
+            await db.commit()
+
+    with count_queries() as queries:
+        asyncio.run(fan_out())
+    assert len(queries) == 2
+
+    db = TestingSessionLocal()
+    try:
+        counts = dict(db.execute(select(notification_counts.c.user_id, notification_counts.c.unread)).all())
+        assert counts == {user_id: 10 for user_id in user_ids}
+        assert len(db.scalars(select(Notification.id)).all()) == 30
+    finally:
+        db.close()
+
+
+def test_preferences_roundtrip(client, auth_headers):
+    r = client.get("/api/notifications/preferences", headers=auth_headers)
+    assert r.json()["reminder_enabled"] is False
+    assert r.json()["reminder_days"] == []
+
+    r = client.put(
+        "/api/notifications/preferences",
+        json={"reminder_enabled": True, "reminder_time": "08:30", "reminder_days": ["Friday", "mon"]},
+        headers=auth_headers,
+    )
+    assert r.status_code == 200
+    assert r.json()["reminder_days"] == ["mon", "fri"]
+
+    r = client.put("/api/notifications/preferences", json={"push_milestones": False}, headers=auth_headers)
+    prefs = client.get("/api/notifications/preferences", headers=auth_headers).json()
+    assert prefs["push_milestones"] is False
+    assert prefs["reminder_time"] == "08:30"
+    assert prefs["reminder_days"] == ["mon", "fri"]
+
+
+def test_preferences_validation(client, auth_headers):
+    r = client.put("/api/notifications/preferences", json={"reminder_time": "25:00"}, headers=auth_headers)
+    assert r.status_code == 422
+    r = client.put("/api/notifications/preferences", json={"reminder_days": ["someday"]}, headers=auth_headers)
+    assert r.status_code == 400
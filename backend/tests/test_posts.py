@@ -1,5 +1,8 @@
 """Tests for the posts router."""
 
+from models import Post
+from tests.conftest import TestingSessionLocal
+
 
 def _make_user(client, email, name="Test User", password="password123"):
     resp = client.post(
@@ -40,6 +43,16 @@ def test_create_post_with_tags(client, auth_headers):
     assert r.json()["tags"] == "morning,gratitude"
 
 
+def test_create_post_with_mixed_tag_separators(client, auth_headers):
+    r = client.post("/api/posts/", json={"content": "Mixed", "tags": "a, #b"}, headers=auth_headers)
+    assert r.json()["tags"] == "a,b"
+    r = client.get("/api/posts/", params={"tag": "b"}, headers=auth_headers)
+    assert [p["content"] for p in r.json()] == ["Mixed"]
+
+    r = client.post("/api/posts/", json={"content": "Empty", "tags": "[]"}, headers=auth_headers)
+    assert r.json()["tags"] is None
+
+
 def test_create_post_minimal(client, auth_headers):
     """Content is the only required field."""
     r = client.post("/api/posts/", json={"content": "Bare minimum"}, headers=auth_headers)
@@ -116,6 +129,66 @@ def test_delete_post_removed_from_list(client, auth_headers):
     assert r.json() == []
 
 
+def test_deleted_post_is_hidden_everywhere(client, auth_headers):
+    created = client.post(
+        "/api/posts/", json={"content": "Trashed lighthouse entry", "tags": "sea"}, headers=auth_headers
+    ).json()
+    client.delete(f"/api/posts/{created['id']}", headers=auth_headers)
+
+    assert client.get(f"/api/posts/{created['id']}", headers=auth_headers).status_code == 404
+    assert client.put(
+        f"/api/posts/{created['id']}", json={"content": "Back?"}, headers=auth_headers
+    ).status_code == 404
+    assert client.delete(f"/api/posts/{created['id']}", headers=auth_headers).status_code == 403
+    assert client.get("/api/posts/", params={"tag": "sea"}, headers=auth_headers).json() == []
+    assert client.get("/api/posts/search", params={"q": "lighthouse"}, headers=auth_headers).json() == []
+    assert client.get("/api/posts/export", headers=auth_headers).content == b""
+    assert client.get("/api/analytics/summary", headers=auth_headers).json()["totalEntries"] == 0
+
+
+def test_delete_keeps_row_until_purged(client, auth_headers):
+    created = client.post(
+        "/api/posts/", json={"content": "Soft"}, headers=auth_headers
+    ).json()
+    client.delete(f"/api/posts/{created['id']}", headers=auth_headers)
+
+    db = TestingSessionLocal()
+    try:
+        assert db.get(Post, created["id"]).deleted_at is not None
+    finally:
+        db.close()
+
+
+def test_restore_post(client, auth_headers):
+    created = client.post(
+        "/api/posts/", json={"content": "Second thoughts", "tags": "work"}, headers=auth_headers
+    ).json()
+    client.delete(f"/api/posts/{created['id']}", headers=auth_headers)
+
+    r = client.post(f"/api/posts/{created['id']}/restore", headers=auth_headers)
+    assert r.status_code == 200
+    assert r.json()["content"] == "Second thoughts"
+    assert [p["id"] for p in client.get("/api/posts/", params={"tag": "work"}, headers=auth_headers).json()] == [
+        created["id"]
+    ]
+    assert client.get("/api/analytics/summary", headers=auth_headers).json()["totalEntries"] == 1
+
+    # Only posts in the trash can be restored.
+    r = client.post(f"/api/posts/{created['id']}/restore", headers=auth_headers)
+    assert r.status_code == 404
+
+
+def test_cannot_restore_other_users_post(client):
+    headers_a = _make_user(client, "a@example.com", "User A")
+    headers_b = _make_user(client, "b@example.com", "User B")
+
+    post = client.post("/api/posts/", json={"content": "User A post"}, headers=headers_a).json()
+    client.delete(f"/api/posts/{post['id']}", headers=headers_a)
+
+    r = client.post(f"/api/posts/{post['id']}/restore", headers=headers_b)
+    assert r.status_code == 404
+
+
 def test_posts_require_auth(client):
     r = client.get("/api/posts/")
     assert r.status_code == 401
@@ -161,3 +234,364 @@ def test_cannot_update_other_users_post(client):
         f"/api/posts/{post['id']}", json={"content": "Hijacked"}, headers=headers_b
     )
     assert r.status_code == 404
+
+
+def test_list_posts_newest_first(client, auth_headers, seed_posts):
+    seed_posts(auth_headers, [3, 1, 2])
+    r = client.get("/api/posts/", headers=auth_headers)
+    assert [p["content"] for p in r.json()] == ["1 days ago", "2 days ago", "3 days ago"]
+
+
+def test_list_posts_paginates_with_cursor(client, auth_headers, seed_posts):
+    seed_posts(auth_headers, [0, 0, 1, 2, 3])
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/api/posts/", params=params, headers=auth_headers)
+        assert r.status_code == 200
+        assert len(r.json()) <= 2
+        seen.extend(p["id"] for p in r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 5
+
+
+def test_list_posts_follows_cursor_past_default_page(client, auth_headers, seed_posts):
+    # What the dashboard does: keep following X-Next-Cursor until it's gone.
+    from routers.posts import DEFAULT_PAGE_SIZE
+
+    seed_posts(auth_headers, range(DEFAULT_PAGE_SIZE + 7))
+    first = client.get("/api/posts/", headers=auth_headers)
+    assert len(first.json()) == DEFAULT_PAGE_SIZE
+    cursor = first.headers["X-Next-Cursor"]
+
+    rest = client.get("/api/posts/", params={"cursor": cursor}, headers=auth_headers)
+    assert len(rest.json()) == 7
+    assert "X-Next-Cursor" not in rest.headers
+    ids = [p["id"] for p in first.json() + rest.json()]
+    assert len(set(ids)) == DEFAULT_PAGE_SIZE + 7
+
+
+def test_list_posts_no_cursor_on_last_page(client, auth_headers, seed_posts):
+    seed_posts(auth_headers, [1, 2])
+    r = client.get("/api/posts/", params={"limit": 2}, headers=auth_headers)
+    assert len(r.json()) == 2
+    assert "X-Next-Cursor" not in r.headers
+
+
+def test_list_posts_date_range(client, auth_headers, seed_posts):
+    from datetime import date, timedelta
+
+    seed_posts(auth_headers, [1, 5, 10, 20])
+    params = {
+        "from": (date.today() - timedelta(days=10)).isoformat(),
+        "to": (date.today() - timedelta(days=5)).isoformat(),
+    }
+    r = client.get("/api/posts/", params=params, headers=auth_headers)
+    assert [p["content"] for p in r.json()] == ["5 days ago", "10 days ago"]
+
+
+def test_list_posts_page_size_capped(client, auth_headers):
+    r = client.get("/api/posts/", params={"limit": 10_000}, headers=auth_headers)
+    assert r.status_code == 422
+
+
+def test_list_posts_invalid_cursor(client, auth_headers):
+    r = client.get("/api/posts/", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert r.status_code == 400
+
+
+def test_create_post_normalizes_tags(client, auth_headers):
+    r = client.post(
+        "/api/posts/", json={"content": "Hashed", "tags": "#morning #gratitude #morning"},
+        headers=auth_headers,
+    )
+    assert r.json()["tags"] == "morning,gratitude"
+
+
+def test_list_posts_filtered_by_tag(client, auth_headers):
+    client.post("/api/posts/", json={"content": "A", "tags": "work,family"}, headers=auth_headers)
+    client.post("/api/posts/", json={"content": "B", "tags": "family"}, headers=auth_headers)
+    client.post("/api/posts/", json={"content": "C"}, headers=auth_headers)
+
+    r = client.get("/api/posts/", params={"tag": "family"}, headers=auth_headers)
+    assert sorted(p["content"] for p in r.json()) == ["A", "B"]
+    r = client.get("/api/posts/", params={"tag": "work"}, headers=auth_headers)
+    assert [p["content"] for p in r.json()] == ["A"]
+
+
+def test_update_post_retags(client, auth_headers):
+    post = client.post(
+        "/api/posts/", json={"content": "Retag me", "tags": "old"}, headers=auth_headers
+    ).json()
+    client.put(f"/api/posts/{post['id']}", json={"tags": "new"}, headers=auth_headers)
+
+    assert client.get("/api/posts/", params={"tag": "old"}, headers=auth_headers).json() == []
+    assert len(client.get("/api/posts/", params={"tag": "new"}, headers=auth_headers).json()) == 1
+
+
+def test_tag_filter_is_user_scoped(client):
+    headers_a = _make_user(client, "a@example.com", "User A")
+    headers_b = _make_user(client, "b@example.com", "User B")
+    client.post("/api/posts/", json={"content": "A", "tags": "shared"}, headers=headers_a)
+
+    r = client.get("/api/posts/", params={"tag": "shared"}, headers=headers_b)
+    assert r.json() == []
+
+
+def _seed_prompted_posts(headers, client, n):
+    """Seed `n` posts, each pointing at its own prompt."""
+    from models import Prompt
+
+    owner_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    db = TestingSessionLocal()
+    try:
+        for i in range(n):
+            prompt = Prompt(content=f"Prompt {i}")
+            db.add(prompt)
+            db.flush()
+            db.add(Post(content=f"Entry {i}", owner_id=owner_id, prompt_id=prompt.id))
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_list_posts_query_count_is_constant(client, auth_headers, count_queries):
+    _seed_prompted_posts(auth_headers, client, 1)
+    with count_queries() as small:
+        client.get("/api/posts/", headers=auth_headers)
+
+    _seed_prompted_posts(auth_headers, client, 25)
+    with count_queries() as large:
+        r = client.get("/api/posts/", headers=auth_headers)
+
+    assert len(r.json()) == 26
+    assert all(p["prompt"]["content"].startswith("Prompt") for p in r.json())
+    assert all(p["owner"]["email"] == "test@example.com" for p in r.json())
+    # The current user comes from the auth cache; one read of the posts
+    # version for the ETag, then posts and prompts are one join.
+    assert len(small) == len(large) == 2
+
+
+def test_update_post_query_count(client, auth_headers, count_queries):
+    _seed_prompted_posts(auth_headers, client, 1)
+    post_id = client.get("/api/posts/", headers=auth_headers).json()[0]["id"]
+
+    with count_queries() as queries:
+        r = client.put(f"/api/posts/{post_id}", json={"mood": "good"}, headers=auth_headers)
+
+    assert r.json()["prompt"]["content"] == "Prompt 0"
+    assert r.json()["owner"]["email"] == "test@example.com"
+    # The analytics rollups are read and adjusted too; the post itself is loaded once.
+    selects = [q for q in queries if q.lstrip().upper().startswith("SELECT") and "FROM posts" in q]
+    assert len(selects) == 1
+
+
+def test_export_ndjson(client, auth_headers, seed_posts):
+    import json
+
+    seed_posts(auth_headers, [2, 0, 1], mood="good")
+    r = client.get("/api/posts/export", headers=auth_headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["content"] for row in rows] == ["2 days ago", "1 days ago", "0 days ago"]
+    assert rows[0]["mood"] == "good"
+
+
+def test_export_json_array(client, auth_headers, seed_posts, monkeypatch):
+    from routers import posts
+
+    monkeypatch.setattr(posts, "EXPORT_BATCH_SIZE", 2)
+    seed_posts(auth_headers, [4, 3, 2, 1, 0])
+    r = client.get("/api/posts/export", params={"format": "json"}, headers=auth_headers)
+    assert len(r.json()) == 5
+
+
+def test_export_json_array_empty(client, auth_headers):
+    r = client.get("/api/posts/export", params={"format": "json"}, headers=auth_headers)
+    assert r.json() == []
+
+
+def test_export_gzip(client, auth_headers, seed_posts):
+    seed_posts(auth_headers, [0])
+    r = client.get("/api/posts/export", params={"gzip": True}, headers=auth_headers)
+    assert r.headers["content-encoding"] == "gzip"
+    # httpx transparently decodes Content-Encoding: gzip.
+    assert r.text.startswith('{"id":')
+
+
+def test_export_is_user_scoped(client, auth_headers):
+    headers_b = _make_user(client, "b@example.com", "User B")
+    client.post("/api/posts/", json={"content": "B's post"}, headers=headers_b)
+    r = client.get("/api/posts/export", headers=auth_headers)
+    assert r.text == ""
+
+
+def test_bulk_import_ndjson_reports_row_errors(client, auth_headers):
+    lines = [
+        '{"content": "Imported one", "mood": "good", "tags": "#travel #home", "date_posted": "2024-03-01"}',
+        '{"mood": "bad"}',
+        "{not json",
+        '{"content": "Imported two", "prompt_id": 99999}',
+        '{"content": "Imported three"}',
+    ]
+    r = client.post("/api/posts/bulk", content="\n".join(lines), headers=auth_headers)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["inserted"] == 2
+    assert [e["index"] for e in data["errors"]] == [1, 2, 3]
+    assert data["errors"][0]["error"].startswith("content:")
+
+    listed = client.get("/api/posts/", params={"tag": "travel"}, headers=auth_headers).json()
+    assert [p["content"] for p in listed] == ["Imported one"]
+    assert listed[0]["tags"] == "travel,home"
+    assert listed[0]["date_posted"] == "2024-03-01"
+
+
+def test_bulk_import_json_array(client, auth_headers, monkeypatch):
+    import importer
+
+    monkeypatch.setattr(importer, "BULK_IMPORT_BATCH_SIZE", 2)
+    entries = [{"content": f"entry {i}", "tags": "batch"} for i in range(5)]
+    r = client.post("/api/posts/bulk", json=entries, headers=auth_headers)
+    assert r.json() == {"inserted": 5, "errors": []}
+    listed = client.get("/api/posts/", params={"tag": "batch"}, headers=auth_headers).json()
+    assert len(listed) == 5
+
+
+def test_bulk_import_malformed_array(client, auth_headers):
+    r = client.post("/api/posts/bulk", content='[{"content": "a"} {"content": "b"}]', headers=auth_headers)
+    assert r.status_code == 400
+    assert client.get("/api/posts/", headers=auth_headers).json() == []
+
+
+def test_bulk_import_row_cap(client, auth_headers, monkeypatch):
+    import importer
+
+    monkeypatch.setattr(importer, "BULK_IMPORT_MAX_ROWS", 3)
+    monkeypatch.setattr(importer, "BULK_IMPORT_BATCH_SIZE", 2)
+    entries = [{"content": f"entry {i}"} for i in range(4)]
+    r = client.post("/api/posts/bulk", json=entries, headers=auth_headers)
+    assert r.status_code == 413
+    # Nothing from the rejected request is kept, even batches already flushed.
+    assert client.get("/api/posts/", headers=auth_headers).json() == []
+
+
+def test_bulk_import_is_user_scoped(client, auth_headers):
+    headers_b = _make_user(client, "b@example.com", "User B")
+    client.post("/api/posts/bulk", json=[{"content": "B's import"}], headers=headers_b)
+    assert client.get("/api/posts/", headers=auth_headers).json() == []
+
+
+def test_list_posts_conditional_get(client, auth_headers, count_queries):
+    client.post("/api/posts/", json={"content": "first"}, headers=auth_headers)
+    r = client.get("/api/posts/", headers=auth_headers)
+    etag = r.headers["etag"]
+    assert etag.startswith('W/"')
+    assert r.headers["cache-control"] == "private, no-cache"
+
+    with count_queries() as queries:
+        r = client.get("/api/posts/", headers={**auth_headers, "If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+    assert len(queries) == 1
+
+    # A different page of the same journal has its own ETag.
+    r = client.get("/api/posts/", params={"limit": 1}, headers={**auth_headers, "If-None-Match": etag})
+    assert r.status_code == 200
+
+
+def test_post_changes_invalidate_etag(client, auth_headers):
+    post_id = client.post("/api/posts/", json={"content": "first"}, headers=auth_headers).json()["id"]
+    etags = [client.get("/api/posts/", headers=auth_headers).headers["etag"]]
+
+    client.put(f"/api/posts/{post_id}", json={"mood": "good"}, headers=auth_headers)
+    etags.append(client.get("/api/posts/", headers=auth_headers).headers["etag"])
+    client.post("/api/posts/bulk", json=[{"content": "imported"}], headers=auth_headers)
+    etags.append(client.get("/api/posts/", headers=auth_headers).headers["etag"])
+    client.patch("/api/auth/me", json={"first_name": "Renamed"}, headers=auth_headers)
+    etags.append(client.get("/api/posts/", headers=auth_headers).headers["etag"])
+    client.delete(f"/api/posts/{post_id}", headers=auth_headers)
+    etags.append(client.get("/api/posts/", headers=auth_headers).headers["etag"])
+
+    assert len(set(etags)) == 5
+    r = client.get("/api/posts/", headers={**auth_headers, "If-None-Match": etags[0]})
+    assert r.status_code == 200
+
+
+def test_get_post_conditional_get(client, auth_headers):
+    post_id = client.post("/api/posts/", json={"content": "first"}, headers=auth_headers).json()["id"]
+    etag = client.get(f"/api/posts/{post_id}", headers=auth_headers).headers["etag"]
+    r = client.get(f"/api/posts/{post_id}", headers={**auth_headers, "If-None-Match": f'"x", {etag}'})
+    assert r.status_code == 304
+
+    client.put(f"/api/posts/{post_id}", json={"content": "edited"}, headers=auth_headers)
+    r = client.get(f"/api/posts/{post_id}", headers={**auth_headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()["content"] == "edited"
+
+
+def _seed_dated(client, headers, days):
+    from datetime import date
+
+    owner_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    db = TestingSessionLocal()
+    try:
+        posts = [Post(content=f"Entry for {day}", owner_id=owner_id, date_posted=date.fromisoformat(day)) for day in days]
+        db.add_all(posts)
+        db.commit()
+        return {post.content.removeprefix("Entry for "): post.id for post in posts}
+    finally:
+        db.close()
+
+
+def test_on_this_day_lists_earlier_years(client, auth_headers):
+    ids = _seed_dated(client, auth_headers, ["2021-03-04", "2024-03-04", "2024-03-05", "2025-03-04", "2026-03-04"])
+    client.delete(f"/api/posts/{ids['2021-03-04']}", headers=auth_headers)
+    other = _make_user(client, "other@example.com")
+    _seed_dated(client, other, ["2023-03-04"])
+
+    r = client.get("/api/posts/on-this-day", params={"date": "2026-03-04"}, headers=auth_headers)
+    assert r.status_code == 200
+    assert [p["date_posted"] for p in r.json()] == ["2025-03-04", "2024-03-04"]
+    assert r.json()[0]["owner"]["email"] == "test@example.com"
+
+    r = client.get("/api/posts/on-this-day", params={"date": "2026-03-04", "limit": 1}, headers=auth_headers)
+    assert [p["date_posted"] for p in r.json()] == ["2025-03-04"]
+
+
+def test_on_this_day_shows_leap_day_on_the_28th(client, auth_headers):
+    _seed_dated(client, auth_headers, ["2024-02-29", "2024-02-28"])
+    r = client.get("/api/posts/on-this-day", params={"date": "2025-02-28"}, headers=auth_headers)
+    assert [p["date_posted"] for p in r.json()] == ["2024-02-29", "2024-02-28"]
+    r = client.get("/api/posts/on-this-day", params={"date": "2028-02-28"}, headers=auth_headers)
+    assert [p["date_posted"] for p in r.json()] == ["2024-02-28"]
+
+
+def test_on_this_day_uses_month_day_index(client, auth_headers):
+    import sqlite3
+
+    from sqlalchemy import event
+
+    from tests.conftest import TEST_DB_PATH, async_engine
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, *args):
+        if "FROM posts" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        client.get("/api/posts/on-this-day", params={"date": "2026-03-04"}, headers=auth_headers)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    [(statement, parameters)] = statements
+    with sqlite3.connect(TEST_DB_PATH) as connection:
+        plan = connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    assert any("ix_posts_live_owner_month_day" in row[-1] for row in plan)
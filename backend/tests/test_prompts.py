@@ -1,16 +1,29 @@
 """
 Tests for the prompts router.
-All tests run without a database — the prompt-of-the-day endpoint
-uses a static in-memory list, making it fast and dependency-free.
+The endpoints run without a database — prompts are served from the
+in-memory catalog snapshot — so the app here has no DB at all. Only the
+catalog loading tests at the bottom use the test database.
 """
 
-from datetime import date
-from fastapi.testclient import TestClient
+import asyncio
+from datetime import UTC, date, datetime, time, timedelta
+from email.utils import parsedate_to_datetime
+from itertools import pairwise
+from zoneinfo import ZoneInfo
+
+import pytest
 
 # Import the router directly and build a minimal app so we don't need
 # a running database or real environment variables.
 from fastapi import FastAPI
-from routers.prompts import router, PROMPTS
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+import prompt_catalog
+from models import Prompt
+from prompt_catalog import CatalogPrompt, load_catalog, rotation, seed_prompts
+from routers.auth import create_access_token
+from routers.prompts import PROMPTS, router
 
 app = FastAPI()
 app.include_router(router, prefix="/api/prompts")
@@ -60,3 +73,144 @@ def test_prompt_id_within_valid_range():
 def test_prompts_list_has_sufficient_variety():
     """Sanity check — enough prompts to go weeks without repeating."""
     assert len(PROMPTS) >= 30
+
+
+def test_prompt_cached_until_midnight():
+    response = client.get("/api/prompts/prompt-of-the-day")
+    max_age = int(response.headers["cache-control"].split("max-age=")[1])
+    assert 0 <= max_age <= 24 * 60 * 60
+    expires = parsedate_to_datetime(response.headers["expires"])
+    assert abs((expires - datetime.now(UTC)).total_seconds() - max_age) < 5
+    assert expires.astimezone().time() == time(0, 0)
+
+
+def test_prompt_conditional_get():
+    etag = client.get("/api/prompts/prompt-of-the-day").headers["etag"]
+    response = client.get("/api/prompts/prompt-of-the-day", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert "expires" in response.headers
+
+
+def _auth(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+def test_rotation_never_repeats_within_or_across_cycles():
+    size = len(PROMPTS)
+    for user_id in (0, 1, 42):
+        days = [i for cycle in range(50) for i in rotation(user_id, cycle, size)]
+        for cycle in range(50):
+            assert sorted(days[cycle * size:(cycle + 1) * size]) == list(range(size))
+        assert all(a != b for a, b in pairwise(days))
+
+
+def test_rotation_differs_per_user_and_is_stable():
+    size = len(PROMPTS)
+    assert rotation(1, 7, size) == rotation(1, 7, size)
+    assert rotation(1, 7, size) != rotation(2, 7, size)
+    assert rotation(1, 7, size) != rotation(1, 8, size)
+
+
+def test_catalog_for_day_covers_every_prompt_once_per_cycle():
+    catalog = prompt_catalog.current()
+    start = date.fromordinal(len(catalog) * 12000)
+    shown = [prompt.id for _, prompt in catalog.upcoming(7, start, len(catalog))]
+    assert sorted(shown) == [prompt.id for prompt in catalog.prompts]
+
+
+def test_signed_in_user_gets_private_personal_rotation():
+    response = client.get("/api/prompts/prompt-of-the-day", headers=_auth(5))
+    assert response.status_code == 200
+    assert response.headers["cache-control"].startswith("private, ")
+    assert response.headers["vary"] == "Authorization"
+    expected = prompt_catalog.current().for_day(5, date.today())
+    assert response.json()["id"] == expected.id
+
+    anonymous = client.get("/api/prompts/prompt-of-the-day")
+    assert anonymous.headers["cache-control"].startswith("public, ")
+    assert anonymous.headers["etag"] != response.headers["etag"]
+
+
+def test_invalid_token_is_rejected():
+    response = client.get("/api/prompts/prompt-of-the-day", headers={"Authorization": "Bearer nope"})
+    assert response.status_code == 401
+
+
+def test_prompt_follows_callers_timezone():
+    tz = "Pacific/Kiritimati"
+    today = datetime.now(ZoneInfo(tz)).date()
+    response = client.get("/api/prompts/prompt-of-the-day", params={"tz": tz}, headers=_auth(3))
+    assert response.json()["date_created"] == today.isoformat()
+    assert response.json()["id"] == prompt_catalog.current().for_day(3, today).id
+    expires = parsedate_to_datetime(response.headers["expires"])
+    assert expires.astimezone(ZoneInfo(tz)).time() == time(0, 0)
+
+
+def test_unknown_timezone_is_rejected():
+    response = client.get("/api/prompts/prompt-of-the-day", params={"tz": "Mars/Olympus"})
+    assert response.status_code == 400
+
+
+def test_upcoming_lists_next_days_without_repeats():
+    response = client.get("/api/prompts/upcoming", params={"days": 10}, headers=_auth(9))
+    assert response.status_code == 200
+    data = response.json()
+    today = date.today()
+    assert [item["date_created"] for item in data] == [
+        (today + timedelta(days=offset)).isoformat() for offset in range(10)
+    ]
+    assert len({item["id"] for item in data}) == 10
+    first = client.get("/api/prompts/prompt-of-the-day", headers=_auth(9)).json()
+    assert data[0] == first
+
+
+def test_upcoming_is_bounded():
+    assert client.get("/api/prompts/upcoming", params={"days": 0}).status_code == 422
+    assert client.get("/api/prompts/upcoming", params={"days": 32}).status_code == 422
+
+
+def test_upcoming_conditional_get():
+    etag = client.get("/api/prompts/upcoming", params={"days": 3}).headers["etag"]
+    assert client.get("/api/prompts/upcoming", params={"days": 3}, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/prompts/upcoming", params={"days": 4}, headers={"If-None-Match": etag}).status_code == 200
+
+
+@pytest.fixture
+def restore_catalog(monkeypatch):
+    monkeypatch.setattr(prompt_catalog, "_catalog", prompt_catalog.current())
+
+
+def test_seed_and_load_catalog_match_builtin_ids(restore_catalog):
+    from tests.conftest import TestingAsyncSessionLocal, engine
+
+    seed_prompts(engine)
+    seed_prompts(engine)
+    assert asyncio.run(load_catalog(TestingAsyncSessionLocal)) is False
+    assert prompt_catalog.current().prompts == tuple(
+        CatalogPrompt(index + 1, content) for index, content in enumerate(PROMPTS)
+    )
+
+
+def test_load_catalog_swaps_in_new_prompts(restore_catalog):
+    from tests.conftest import TestingAsyncSessionLocal, engine
+
+    seed_prompts(engine)
+    before = prompt_catalog.current()
+    with engine.begin() as connection:
+        connection.execute(insert(Prompt).values(content="What made you smile?"))
+
+    assert asyncio.run(load_catalog(TestingAsyncSessionLocal)) is True
+    after = prompt_catalog.current()
+    assert after is not before and after.version != before.version
+    assert after.prompts[-1] == CatalogPrompt(len(PROMPTS) + 1, "What made you smile?")
+    # The snapshot a request already holds doesn't change under it.
+    assert len(before) == len(PROMPTS)
+
+
+def test_load_catalog_keeps_snapshot_when_table_is_empty(restore_catalog):
+    from tests.conftest import TestingAsyncSessionLocal
+
+    before = prompt_catalog.current()
+    assert asyncio.run(load_catalog(TestingAsyncSessionLocal)) is False
+    assert prompt_catalog.current() is before
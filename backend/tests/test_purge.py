@@ -0,0 +1,60 @@
+"""Tests for purging soft-deleted posts."""
+
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import func, select
+
+from models import Post, post_lsh_buckets, post_signatures, post_tags
+from purge import POST_RETENTION_DAYS, purge_deleted_posts
+from tests.conftest import TestingAsyncSessionLocal, TestingSessionLocal
+from utils import utcnow
+
+
+def _purge(now, batch_size=500):
+    return asyncio.run(purge_deleted_posts(TestingAsyncSessionLocal, now=now, batch_size=batch_size))
+
+
+def _surviving_ids():
+    db = TestingSessionLocal()
+    try:
+        return set(db.scalars(select(Post.id)))
+    finally:
+        db.close()
+
+
+def test_purge_removes_only_expired_posts(client, auth_headers):
+    ids = [
+        client.post("/api/posts/", json={"content": f"Entry {i}", "tags": "a,b"}, headers=auth_headers).json()["id"]
+        for i in range(5)
+    ]
+    live, recent, *expired = ids
+    for post_id in (recent, *expired):
+        client.delete(f"/api/posts/{post_id}", headers=auth_headers)
+
+    db = TestingSessionLocal()
+    try:
+        long_ago = utcnow() - timedelta(days=POST_RETENTION_DAYS + 1)
+        for post_id in expired:
+            db.get(Post, post_id).deleted_at = long_ago
+        db.commit()
+    finally:
+        db.close()
+
+    # A batch size smaller than the backlog exercises the batching loop.
+    assert _purge(utcnow(), batch_size=2) == 3
+    assert _surviving_ids() == {live, recent}
+
+    db = TestingSessionLocal()
+    try:
+        for table in (post_tags, post_signatures, post_lsh_buckets):
+            linked = db.scalar(select(func.count()).select_from(table).where(table.c.post_id.in_(expired)))
+            assert linked == 0
+    finally:
+        db.close()
+
+    # Nothing left to do until the recent deletion ages out too.
+    assert _purge(utcnow()) == 0
+    assert _purge(utcnow() + timedelta(days=POST_RETENTION_DAYS + 1)) == 1
+    assert _surviving_ids() == {live}
+    assert client.get("/api/posts/", headers=auth_headers).json()[0]["id"] == live
@@ -0,0 +1,213 @@
+"""Tests for rate limiting and admission control."""
+
+import pytest
+
+from ratelimit import MemoryBuckets, Rate, SQLiteBuckets
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_parse():
+    assert Rate.parse("10/60") == Rate(10, 60.0)
+    assert Rate.parse("5") == Rate(5, 1.0)
+
+
+@pytest.mark.parametrize("make", [
+    lambda clock, tmp_path: MemoryBuckets(timer=clock),
+    lambda clock, tmp_path: SQLiteBuckets(str(tmp_path / "buckets.sqlite3"), timer=clock),
+])
+def test_bucket_allows_burst_then_refills(make, tmp_path):
+    clock = FakeClock()
+    buckets = make(clock, tmp_path)
+    rate = Rate(3, 30)  # one token every 10 seconds
+
+    assert [buckets.take("k", rate) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("k", rate) == pytest.approx(10)
+    assert buckets.take("other", rate) == 0
+
+    clock.now += 10
+    assert buckets.take("k", rate) == 0
+    assert buckets.take("k", rate) > 0
+
+    # Refills never exceed the capacity.
+    clock.now += 1000
+    assert [buckets.take("k", rate) for _ in range(4)][-1] > 0
+
+
+def test_negative_cost_refunds_up_to_capacity():
+    buckets = MemoryBuckets(timer=FakeClock())
+    rate = Rate(2, 60)
+    assert buckets.take("k", rate) == 0
+    assert buckets.take("k", rate, cost=-1) == 0
+    assert buckets.take("k", rate, cost=-1) == 0
+    assert [buckets.take("k", rate) for _ in range(3)] == [0, 0, pytest.approx(30)]
+
+
+def test_sqlite_buckets_are_shared_between_workers(tmp_path):
+    path = str(tmp_path / "buckets.sqlite3")
+    first, second = SQLiteBuckets(path), SQLiteBuckets(path)
+    rate = Rate(2, 60)
+    assert first.take("k", rate) == 0
+    assert second.take("k", rate) == 0
+    assert first.take("k", rate) > 0
+
+
+def test_memory_buckets_forget_oldest_keys():
+    buckets = MemoryBuckets(max_keys=2)
+    rate = Rate(1, 60)
+    for key in ("a", "b", "c"):
+        buckets.take(key, rate)
+    # "a" was forgotten, so it starts again from a full bucket.
+    assert buckets.take("a", rate) == 0
+    assert buckets.take("c", rate) > 0
+
+
+def test_login_is_limited_per_account(client, registered_user, monkeypatch):
+    from routers import auth
+
+    monkeypatch.setattr(auth, "AUTH_ACCOUNT_RATE", Rate(2, 60))
+    body = {"email": "test@example.com", "password": "wrong-password"}
+    assert client.post("/api/auth/login", json=body).status_code == 401
+    assert client.post("/api/auth/login", json=body).status_code == 401
+
+    r = client.post("/api/auth/login", json={**body, "password": "password123"})
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) > 0
+
+    # Other accounts aren't affected.
+    r = client.post("/api/auth/login", json={"email": "other@example.com", "password": "x"})
+    assert r.status_code == 401
+
+
+def test_failed_logins_elsewhere_dont_lock_the_owner_out(client, registered_user, monkeypatch):
+    from routers import auth
+
+    monkeypatch.setattr(auth, "AUTH_ACCOUNT_RATE", Rate(2, 60))
+    monkeypatch.setattr("ratelimit.TRUSTED_PROXY_HOPS", 1)
+    body = {"email": "test@example.com", "password": "wrong-password"}
+    attacker = {"X-Forwarded-For": "203.0.113.9"}
+    for _ in range(3):
+        client.post("/api/auth/login", json=body, headers=attacker)
+    assert client.post("/api/auth/login", json=body, headers=attacker).status_code == 429
+
+    owner = {"X-Forwarded-For": "198.51.100.7"}
+    r = client.post("/api/auth/login", json={**body, "password": "password123"}, headers=owner)
+    assert r.status_code == 200
+
+
+def test_failed_logins_are_limited_per_account_across_ips(client, registered_user, monkeypatch):
+    from routers import auth
+
+    monkeypatch.setattr(auth, "AUTH_ACCOUNT_FAILURE_RATE", Rate(3, 60))
+    monkeypatch.setattr("ratelimit.TRUSTED_PROXY_HOPS", 1)
+    body = {"email": "test@example.com", "password": "wrong-password"}
+    for i in range(3):
+        headers = {"X-Forwarded-For": f"203.0.113.{i}"}
+        assert client.post("/api/auth/login", json=body, headers=headers).status_code == 401
+
+    r = client.post("/api/auth/login", json=body, headers={"X-Forwarded-For": "203.0.113.50"})
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) > 0
+
+
+def test_successful_logins_dont_count_against_the_account(client, registered_user, monkeypatch):
+    from routers import auth
+
+    monkeypatch.setattr(auth, "AUTH_ACCOUNT_FAILURE_RATE", Rate(2, 60))
+    monkeypatch.setattr("ratelimit.TRUSTED_PROXY_HOPS", 1)
+    body = {"email": "test@example.com", "password": "password123"}
+    for i in range(4):
+        headers = {"X-Forwarded-For": f"198.51.100.{i}"}
+        assert client.post("/api/auth/login", json=body, headers=headers).status_code == 200
+
+
+def test_auth_is_limited_per_ip(client, monkeypatch):
+    from ratelimit import AUTH_IP_RATE
+
+    # Stop the clock so nothing refills while bcrypt runs.
+    monkeypatch.setattr("ratelimit.buckets", MemoryBuckets(timer=FakeClock()))
+    statuses = [
+        client.post(
+            "/api/auth/register",
+            json={"name": "N", "email": f"user{i}@example.com", "password": "password123"},
+        ).status_code
+        for i in range(AUTH_IP_RATE.capacity + 2)
+    ]
+    assert statuses == [200] * AUTH_IP_RATE.capacity + [429] * 2
+
+
+def test_spoofed_forwarded_for_does_not_dodge_ip_limit(client, monkeypatch):
+    from ratelimit import AUTH_IP_RATE
+
+    monkeypatch.setattr("ratelimit.buckets", MemoryBuckets(timer=FakeClock()))
+    monkeypatch.setattr("ratelimit.TRUSTED_PROXY_HOPS", 1)
+    statuses = [
+        client.post(
+            "/api/auth/register",
+            json={"name": "N", "email": f"user{i}@example.com", "password": "password123"},
+            # The client writes a fresh leftmost entry each time; the proxy appends the real one.
+            headers={"X-Forwarded-For": f"10.0.0.{i}, 203.0.113.9"},
+        ).status_code
+        for i in range(AUTH_IP_RATE.capacity + 1)
+    ]
+    assert statuses == [200] * AUTH_IP_RATE.capacity + [429]
+
+
+def test_client_ip_ignores_forwarded_for_without_trusted_proxy():
+    from starlette.requests import Request
+
+    from ratelimit import client_ip
+
+    request = Request({
+        "type": "http", "client": ("192.0.2.1", 1234),
+        "headers": [(b"x-forwarded-for", b"10.0.0.1, 203.0.113.9"), (b"x-forwarded-for", b"198.51.100.7")],
+    })
+    assert client_ip(request, hops=0) == "192.0.2.1"
+    assert client_ip(request, hops=1) == "198.51.100.7"
+    assert client_ip(request, hops=2) == "203.0.113.9"
+    assert client_ip(request, hops=4) == "192.0.2.1"
+
+
+def test_sqlite_buckets_take_off_the_event_loop(tmp_path):
+    import asyncio
+
+    buckets = SQLiteBuckets(str(tmp_path / "buckets.sqlite3"))
+    rate = Rate(1, 60)
+    assert asyncio.run(buckets.atake("k", rate)) == 0
+    assert asyncio.run(buckets.atake("k", rate)) > 0
+
+
+def test_auth_sheds_load_when_saturated(client, registered_user, monkeypatch):
+    from ratelimit import auth_admission
+
+    monkeypatch.setattr(auth_admission, "in_flight", auth_admission.limit)
+    r = client.post("/api/auth/login", json={"email": "test@example.com", "password": "password123"})
+    assert r.status_code == 503
+    assert int(r.headers["Retry-After"]) > 0
+
+
+def test_admission_slot_is_released(client, registered_user):
+    from ratelimit import auth_admission
+
+    for _ in range(auth_admission.limit + 1):
+        client.post("/api/auth/login", json={"email": "nobody@example.com", "password": "x"})
+    assert auth_admission.in_flight == 0
+
+
+def test_writes_are_limited_per_user(client, auth_headers, monkeypatch):
+    from routers import auth
+
+    monkeypatch.setattr(auth, "WRITE_RATE", Rate(2, 60))
+    statuses = [
+        client.post("/api/posts/", json={"content": f"Entry {i}"}, headers=auth_headers).status_code
+        for i in range(3)
+    ]
+    assert statuses == [200, 200, 429]
+    # Reads aren't charged.
+    assert client.get("/api/posts/", headers=auth_headers).status_code == 200
@@ -0,0 +1,158 @@
+"""Tests for the prompt recommender."""
+
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+import prompt_catalog
+from metrics import registry
+from models import PromptProfile
+from recommender import (
+    PromptVectors,
+    fold,
+    fold_new_posts,
+    recommendations,
+    recommended_prompt,
+    refresh_recommendations,
+    run_recommendations,
+    tokenize,
+)
+from tests.conftest import TestingAsyncSessionLocal, TestingSessionLocal
+
+DAY = date(2026, 3, 4)
+# Entries that keep circling the same prompt's words.
+BODY_ENTRY = "My body needs rest. Resting my body, rest and nourishment and movement for the body."
+
+
+def _catalog() -> prompt_catalog.Catalog:
+    return prompt_catalog.current()
+
+
+def _prompt_index(text: str) -> int:
+    return next(i for i, prompt in enumerate(_catalog().prompts) if text in prompt.content)
+
+
+def _profile(user_id: int) -> PromptProfile:
+    db = TestingSessionLocal()
+    try:
+        return db.scalar(select(PromptProfile).where(PromptProfile.user_id == user_id))
+    finally:
+        db.close()
+
+
+def test_tokenize_drops_stopwords_and_stems():
+    assert tokenize("What does your body need — rest, movement?") == ["body", "need", "rest", "movement"]
+    assert tokenize("Feeling grateful, walked home") == ["feel", "grateful", "walk", "home"]
+
+
+def test_fold_decays_older_entries():
+    profile = fold({}, "garden garden")
+    profile = fold(profile, "work")
+    assert profile["work"] == pytest.approx(1.0)
+    assert profile["garden"] < profile["work"] * 2
+    assert fold(profile, "work")["garden"] < profile["garden"]
+
+
+def test_rank_avoids_what_the_user_writes_about():
+    model = PromptVectors.build(_catalog())
+    body = _prompt_index("What does your body need")
+    profile = fold({}, BODY_ENTRY)
+
+    picks = model.rank(1, profile, [], DAY)
+    assert sorted(picks) == list(range(len(_catalog())))
+    assert picks.index(body) >= len(picks) - 3
+    for index in picks[:7]:
+        assert "body" not in _catalog().prompts[index].content
+
+
+def test_rank_skips_answered_prompts():
+    model = PromptVectors.build(_catalog())
+    profile = fold({}, BODY_ENTRY)
+    picks = model.rank(1, profile, [], DAY)
+    answered = [_catalog().prompts[picks[0]].id]
+    assert picks[0] not in model.rank(1, profile, answered, DAY)
+
+
+def test_rank_leaves_out_excluded_prompts():
+    model = PromptVectors.build(_catalog())
+    profile = fold({}, BODY_ENTRY)
+    picks = model.rank(1, profile, [], DAY)
+    assert model.rank(1, profile, [], DAY, exclude=picks[:3]) == picks[3:]
+
+
+def test_rank_needs_overlap_with_catalog():
+    model = PromptVectors.build(_catalog())
+    assert model.rank(1, {}, [], DAY) == ()
+    assert model.rank(1, {"zzz": 3.0}, [], DAY) == ()
+
+
+def test_fold_new_posts_is_incremental(client, auth_headers, seed_posts):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    seed_posts(auth_headers, [3, 2, 1], content=BODY_ENTRY)
+
+    assert asyncio.run(fold_new_posts(TestingAsyncSessionLocal, batch_size=2)) == 3
+    profile = _profile(user_id)
+    assert profile.terms["body"] > 0
+    first_id = profile.last_post_id
+    assert asyncio.run(fold_new_posts(TestingAsyncSessionLocal)) == 0
+
+    client.post("/api/posts/", json={"content": "Long walk by the sea", "prompt_id": 4}, headers=auth_headers)
+    assert asyncio.run(fold_new_posts(TestingAsyncSessionLocal)) == 1
+    profile = _profile(user_id)
+    assert profile.last_post_id > first_id
+    assert profile.answered == [4]
+    assert "sea" in profile.terms
+
+
+def test_prompt_of_the_day_serves_recommendation_from_cache(client, auth_headers, seed_posts, count_queries):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    seed_posts(auth_headers, [2, 1], content=BODY_ENTRY)
+    registry.clear()
+
+    assert asyncio.run(run_recommendations(TestingAsyncSessionLocal)) == 1
+    assert "recommendations" in registry.render()
+    version, _, picks = recommendations.get(user_id)
+    assert version == _catalog().version
+
+    with count_queries() as queries:
+        response = client.get("/api/prompts/prompt-of-the-day", headers=auth_headers)
+    assert queries == []
+    data = response.json()
+    expected = recommended_prompt(_catalog(), user_id, date.fromisoformat(data["date_created"]))
+    assert data["id"] == expected.id
+    assert "body" not in data["content"]
+
+    upcoming = client.get("/api/prompts/upcoming", params={"days": 3}, headers=auth_headers).json()
+    assert upcoming[0] == data
+    assert {item["id"] for item in upcoming} <= {_catalog().prompts[i].id for i in picks}
+
+
+def test_stale_recommendations_fall_back_to_rotation(client, auth_headers):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    recommendations.set(user_id, ("old-catalog", 0, (0,)))
+    today = date.fromisoformat(client.get("/api/prompts/prompt-of-the-day").json()["date_created"])
+
+    data = client.get("/api/prompts/prompt-of-the-day", headers=auth_headers).json()
+    assert data["id"] == _catalog().for_day(user_id, today).id
+
+
+def test_recommendations_dont_repeat_across_the_catalog(client, auth_headers, seed_posts):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    seed_posts(auth_headers, [2, 1], content=BODY_ENTRY)
+    asyncio.run(fold_new_posts(TestingAsyncSessionLocal))
+
+    catalog = _catalog()
+    served = []
+    for offset in range(len(catalog)):
+        day = date.fromordinal(DAY.toordinal() + offset)
+        # Re-ranking every day keeps what was already served.
+        asyncio.run(refresh_recommendations(TestingAsyncSessionLocal, day))
+        served.append(recommended_prompt(catalog, user_id, day).id)
+    assert len(set(served)) == len(catalog)
+
+    # Once the order is used up a new one starts.
+    next_day = date.fromordinal(DAY.toordinal() + len(catalog))
+    asyncio.run(refresh_recommendations(TestingAsyncSessionLocal, next_day))
+    assert recommended_prompt(catalog, user_id, next_day) is not None
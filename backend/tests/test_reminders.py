@@ -0,0 +1,130 @@
+"""Tests for the journal reminder scheduler."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from metrics import registry
+from models import Notification, NotificationPreference, User
+from reminders import LocalSender, Sender, fire_due_reminders, next_fire_time
+from tests.conftest import TestingAsyncSessionLocal, TestingSessionLocal
+from utils import utcnow
+
+# A Wednesday.
+NOW = datetime(2026, 3, 4, 12, 0)
+
+
+def test_next_fire_time_daily():
+    assert next_fire_time("18:30", [], "UTC", NOW) == datetime(2026, 3, 4, 18, 30)
+    assert next_fire_time("08:00", [], "UTC", NOW) == datetime(2026, 3, 5, 8, 0)
+    # Strictly after: a reminder due right now is rescheduled for tomorrow.
+    assert next_fire_time("12:00", [], "UTC", NOW) == datetime(2026, 3, 5, 12, 0)
+
+
+def test_next_fire_time_on_chosen_days():
+    assert next_fire_time("09:00", ["mon", "fri"], "UTC", NOW) == datetime(2026, 3, 6, 9, 0)
+    assert next_fire_time("09:00", ["wed"], "UTC", NOW) == datetime(2026, 3, 11, 9, 0)
+
+
+def test_next_fire_time_uses_local_time():
+    # 08:00 in New York is 13:00 UTC before the DST switch on 8 March and 12:00 after.
+    assert next_fire_time("08:00", [], "America/New_York", NOW) == datetime(2026, 3, 4, 13, 0)
+    assert next_fire_time("08:00", ["mon"], "America/New_York", NOW) == datetime(2026, 3, 9, 12, 0)
+    with pytest.raises(ValueError):
+        next_fire_time("08:00", [], "Mars/Olympus", NOW)
+
+
+def test_preferences_schedule_next_reminder(client, auth_headers):
+    client.put(
+        "/api/notifications/preferences",
+        json={"reminder_enabled": True, "reminder_time": "07:15", "timezone": "Europe/Paris"},
+        headers=auth_headers,
+    )
+    db = TestingSessionLocal()
+    try:
+        prefs = db.scalars(select(NotificationPreference)).one()
+        assert prefs.next_fire_at > utcnow()
+        assert prefs.next_fire_at.minute == 15
+    finally:
+        db.close()
+
+    client.put("/api/notifications/preferences", json={"reminder_enabled": False}, headers=auth_headers)
+    db = TestingSessionLocal()
+    try:
+        assert db.scalars(select(NotificationPreference)).one().next_fire_at is None
+    finally:
+        db.close()
+
+
+def test_preferences_reject_unknown_timezone(client, auth_headers):
+    r = client.put("/api/notifications/preferences", json={"timezone": "Nowhere/Land"}, headers=auth_headers)
+    assert r.status_code == 400
+
+
+def _seed(due: int, later: int) -> list[int]:
+    """Users with reminders enabled: `due` of them overdue at NOW, `later` due tomorrow."""
+    db = TestingSessionLocal()
+    try:
+        users = [User(username=f"u{i}", email=f"u{i}@example.com") for i in range(due + later)]
+        db.add_all(users)
+        db.flush()
+        for i, user in enumerate(users):
+            db.add(NotificationPreference(
+                user_id=user.id, reminder_enabled=True, reminder_time="12:00", timezone="UTC",
+                next_fire_at=NOW - timedelta(minutes=i + 1) if i < due else NOW + timedelta(days=1),
+            ))
+        db.commit()
+        return [user.id for user in users[:due]]
+    finally:
+        db.close()
+
+
+def _fire(sender, now=NOW, batch_size=500):
+    return asyncio.run(fire_due_reminders(TestingAsyncSessionLocal, sender, now=now, batch_size=batch_size))
+
+
+def test_fires_only_due_reminders(client):
+    registry.clear()
+    due_ids = _seed(due=3, later=2)
+    sender = LocalSender()
+
+    # A batch size below the backlog exercises the batching loop.
+    assert _fire(sender, batch_size=2) == 3
+    assert sorted(reminder.user_id for reminder in sender.sent) == sorted(due_ids)
+
+    db = TestingSessionLocal()
+    try:
+        notifications = db.scalars(select(Notification)).all()
+        assert sorted(n.user_id for n in notifications) == sorted(due_ids)
+        assert {n.type for n in notifications} == {"journal_reminder"}
+        # Rescheduled for the next occurrence, not the missed one.
+        due_prefs = db.scalars(select(NotificationPreference).where(NotificationPreference.user_id.in_(due_ids)))
+        assert {prefs.next_fire_at for prefs in due_prefs} == {datetime(2026, 3, 5, 12, 0)}
+    finally:
+        db.close()
+
+    assert _fire(sender) == 0
+    assert len(sender.sent) == 3
+
+    rendered = registry.render()
+    assert 'luma_job_items_total{job="reminders"} 3' in rendered
+    assert 'luma_job_lag_seconds_count{job="reminders"} 3' in rendered
+    assert 'luma_job_ticks_total{job="reminders"} 2' in rendered
+
+
+def test_idle_tick_cost_does_not_grow_with_users(client, count_queries):
+    _seed(due=0, later=300)
+    with count_queries() as queries:
+        assert _fire(LocalSender()) == 0
+    assert len(queries) == 1
+    assert "next_fire_at <=" in queries[0]
+
+
+def test_sender_must_implement_send():
+    class Silent(Sender):
+        pass
+
+    with pytest.raises(TypeError):
+        Silent()
@@ -0,0 +1,103 @@
+"""Tests for full-text search over posts (SQLite FTS5 in the test suite)."""
+
+from search import _fallback_snippet, _fts5_query
+
+
+def _post(client, headers, content):
+    return client.post("/api/posts/", json={"content": content}, headers=headers).json()
+
+
+def test_search_finds_and_highlights(client, auth_headers):
+    _post(client, auth_headers, "Walked by the ocean and felt calm.")
+    _post(client, auth_headers, "Busy day at work, no time to think.")
+
+    r = client.get("/api/posts/search", params={"q": "ocean"}, headers=auth_headers)
+    assert r.status_code == 200
+    hits = r.json()
+    assert len(hits) == 1
+    assert "<mark>ocean</mark>" in hits[0]["snippet"]
+
+
+def test_search_escapes_html_in_snippets(client, auth_headers):
+    _post(client, auth_headers, '<img src=x onerror="alert(1)"> ocean <b>waves</b>')
+
+    snippet = client.get("/api/posts/search", params={"q": "ocean"}, headers=auth_headers).json()[0]["snippet"]
+    assert "<img" not in snippet and "<b>" not in snippet
+    assert "&lt;img" in snippet and "&lt;b&gt;waves" in snippet
+    assert "<mark>ocean</mark>" in snippet
+
+
+def test_search_ranks_better_matches_first(client, auth_headers):
+    weak = _post(client, auth_headers, "A long entry about many things, gratitude once, and a lot more filler text here.")
+    strong = _post(client, auth_headers, "Gratitude, gratitude, gratitude.")
+
+    hits = client.get("/api/posts/search", params={"q": "gratitude"}, headers=auth_headers).json()
+    assert [h["id"] for h in hits] == [strong["id"], weak["id"]]
+
+
+def test_search_follows_updates_and_deletes(client, auth_headers):
+    post = _post(client, auth_headers, "Thinking about mountains.")
+    client.put(f"/api/posts/{post['id']}", json={"content": "Thinking about rivers."}, headers=auth_headers)
+
+    assert client.get("/api/posts/search", params={"q": "mountains"}, headers=auth_headers).json() == []
+    assert len(client.get("/api/posts/search", params={"q": "rivers"}, headers=auth_headers).json()) == 1
+
+    client.delete(f"/api/posts/{post['id']}", headers=auth_headers)
+    assert client.get("/api/posts/search", params={"q": "rivers"}, headers=auth_headers).json() == []
+
+
+def test_search_is_user_scoped(client, auth_headers):
+    other = client.post(
+        "/api/auth/register",
+        json={"name": "Other", "email": "other@example.com", "password": "password123"},
+    ).json()
+    _post(client, {"Authorization": f"Bearer {other['access_token']}"}, "Secret garden.")
+
+    assert client.get("/api/posts/search", params={"q": "garden"}, headers=auth_headers).json() == []
+
+
+def test_search_tolerates_fts_syntax(client, auth_headers):
+    _post(client, auth_headers, "Quotes and stars.")
+    r = client.get("/api/posts/search", params={"q": 'stars" OR NEAR(*'}, headers=auth_headers)
+    assert r.status_code == 200
+
+
+def test_search_requires_query(client, auth_headers):
+    assert client.get("/api/posts/search", headers=auth_headers).status_code == 422
+
+
+def test_fts5_query_quotes_terms():
+    assert _fts5_query('calm "ocean" OR') == '"calm" "ocean" "OR"'
+    assert _fts5_query("***") == ""
+
+
+def test_search_falls_back_to_ilike_without_an_index(client, auth_headers, monkeypatch):
+    import search
+
+    older = _post(client, auth_headers, "Snow_day by the OCEAN, so calm.")
+    newer = _post(client, auth_headers, "The ocean again, calm once more.")
+    _post(client, auth_headers, "Calm at work.")
+
+    async def no_index(db, owner_id, q, limit):
+        return await search._search_ilike(db, owner_id, q, limit)
+
+    monkeypatch.setattr("routers.posts.search_posts", no_index)
+    hits = client.get("/api/posts/search", params={"q": "ocean calm"}, headers=auth_headers).json()
+    assert [h["id"] for h in hits] == [newer["id"], older["id"]]
+    assert "<mark>ocean</mark>" in hits[0]["snippet"]
+    # "_" is matched literally, not as a LIKE wildcard.
+    assert [h["id"] for h in client.get("/api/posts/search", params={"q": "snow_day"}, headers=auth_headers).json()] == [older["id"]]
+    assert client.get("/api/posts/search", params={"q": "snowaday"}, headers=auth_headers).json() == []
+
+
+def test_fallback_snippet_marks_first_match():
+    content = "x" * 100 + " Ocean waves " + "y" * 100
+    snippet = _fallback_snippet(content, ["waves", "ocean"])
+    assert "<mark>Ocean</mark> waves" in snippet
+    assert snippet.startswith("…") and snippet.endswith("…")
+
+
+def test_fallback_snippet_escapes_html():
+    snippet = _fallback_snippet("<script>alert(1)</script> by the ocean", ["ocean"])
+    assert snippet == "&lt;script&gt;alert(1)&lt;/script&gt; by the <mark>ocean</mark>"
+    assert _fallback_snippet("<i>no match</i>", ["ocean"]) == "&lt;i&gt;no match&lt;/i&gt;"
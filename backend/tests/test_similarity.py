@@ -0,0 +1,124 @@
+"""Tests for similar-entry lookups."""
+
+from sqlalchemy import func, select
+
+from models import Post, post_lsh_buckets, post_signatures
+from similarity import LSH_BANDS, backfill_signatures, estimate, signature
+from tests.conftest import TestingSessionLocal
+
+GARDEN = [
+    "Spent the morning in the garden planting tomatoes and basil with the kids.",
+    "Watered the garden, the tomatoes are finally ripening and the basil smells wonderful.",
+    "Garden day again: weeding around the tomatoes, picked basil for dinner.",
+]
+WORK = [
+    "Deadline stress at work, the quarterly report kept my manager anxious all afternoon.",
+    "Another meeting about the quarterly report; work stress is building before the deadline.",
+]
+
+
+def _make_user(client, email):
+    resp = client.post("/api/auth/register", json={"name": "Other", "email": email, "password": "password123"})
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def _create(client, headers, contents):
+    return [
+        client.post("/api/posts/", json={"content": content}, headers=headers).json()["id"]
+        for content in contents
+    ]
+
+
+def _count(table, post_id):
+    db = TestingSessionLocal()
+    try:
+        return db.scalar(select(func.count()).select_from(table).where(table.c.post_id == post_id))
+    finally:
+        db.close()
+
+
+def test_signature_estimates_word_overlap():
+    assert estimate(signature(GARDEN[0]), signature(GARDEN[0])) == 1.0
+    assert estimate(signature(GARDEN[0]), signature(GARDEN[1])) > estimate(signature(GARDEN[0]), signature(WORK[0]))
+    # Word order and case don't matter; only the set of content words does.
+    assert signature("Tomatoes basil garden") == signature("garden BASIL tomatoes")
+    assert signature("and the of it") is None
+
+
+def test_similar_ranks_related_entries_first(client, auth_headers):
+    garden = _create(client, auth_headers, GARDEN)
+    work = _create(client, auth_headers, WORK)
+
+    r = client.get(f"/api/posts/{garden[0]}/similar", headers=auth_headers)
+    assert r.status_code == 200
+    hits = r.json()
+    assert garden[0] not in [hit["id"] for hit in hits]
+    assert {hit["id"] for hit in hits[:2]} == set(garden[1:])
+    assert all(0 < hit["score"] <= 1 for hit in hits)
+    assert hits[0]["excerpt"] in GARDEN
+
+    r = client.get(f"/api/posts/{work[0]}/similar", params={"limit": 1}, headers=auth_headers)
+    assert [hit["id"] for hit in r.json()] == [work[1]]
+
+
+def test_similar_query_count(client, auth_headers, count_queries):
+    garden = _create(client, auth_headers, GARDEN * 5)
+    with count_queries() as queries:
+        client.get(f"/api/posts/{garden[0]}/similar", headers=auth_headers)
+    # The source post's signature, then candidates, their posts and signatures in one join.
+    assert len(queries) == 2
+
+
+def test_similar_follows_edits_and_deletes(client, auth_headers):
+    garden = _create(client, auth_headers, GARDEN)
+    work = _create(client, auth_headers, WORK[:1])
+
+    client.put(f"/api/posts/{work[0]}", json={"content": GARDEN[0]}, headers=auth_headers)
+    hits = client.get(f"/api/posts/{garden[0]}/similar", headers=auth_headers).json()
+    assert hits[0] == {**hits[0], "id": work[0], "score": 1.0}
+
+    client.delete(f"/api/posts/{work[0]}", headers=auth_headers)
+    hits = client.get(f"/api/posts/{garden[0]}/similar", headers=auth_headers).json()
+    assert work[0] not in [hit["id"] for hit in hits]
+    assert _count(post_lsh_buckets, work[0]) == LSH_BANDS
+
+
+def test_similar_is_user_scoped(client, auth_headers):
+    mine = _create(client, auth_headers, GARDEN[:1])
+    other = _make_user(client, "other@example.com")
+    theirs = _create(client, other, GARDEN[1:])
+
+    hits = client.get(f"/api/posts/{mine[0]}/similar", headers=auth_headers).json()
+    assert hits == []
+    r = client.get(f"/api/posts/{theirs[0]}/similar", headers=auth_headers)
+    assert r.status_code == 404
+
+
+def test_similar_for_entry_without_content_words(client, auth_headers):
+    [post_id] = _create(client, auth_headers, ["and then it was"])
+    assert _count(post_signatures, post_id) == 0
+    r = client.get(f"/api/posts/{post_id}/similar", headers=auth_headers)
+    assert r.status_code == 200
+    assert r.json() == []
+
+
+def test_bulk_import_indexes_entries(client, auth_headers):
+    body = "\n".join(f'{{"content": "{content}"}}' for content in GARDEN)
+    client.post("/api/posts/bulk", content=body, headers=auth_headers)
+    ids = [post["id"] for post in client.get("/api/posts/", headers=auth_headers).json()]
+    assert all(_count(post_signatures, post_id) == 1 for post_id in ids)
+    assert len(client.get(f"/api/posts/{ids[0]}/similar", headers=auth_headers).json()) == 2
+
+
+def test_backfill_indexes_existing_posts(client, auth_headers):
+    owner_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    db = TestingSessionLocal()
+    try:
+        posts = [Post(content=content, owner_id=owner_id) for content in [*GARDEN, "and so it was"]]
+        db.add_all(posts)
+        db.commit()
+        assert backfill_signatures(db) == 4
+        assert backfill_signatures(db) == 1
+        assert db.scalar(select(func.count()).select_from(post_signatures)) == 3
+    finally:
+        db.close()
@@ -0,0 +1,164 @@
+"""Tests for the incrementally maintained analytics rollups."""
+
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from models import (
+    User,
+    streak_runs,
+    user_day_counts,
+    user_mood_counts,
+    user_stats,
+    user_tag_counts,
+)
+from stats import main, rebuild_stats, stat_row, update_stats
+from tests.conftest import TestingSessionLocal
+
+TODAY = date.today()
+
+
+def _snapshot(db, owner_id):
+    tables = (user_day_counts, user_mood_counts, user_tag_counts, streak_runs, user_stats)
+    return {
+        table.name: sorted(tuple(row) for row in db.execute(select(table).where(table.c.user_id == owner_id)))
+        for table in tables
+    }
+
+
+def _make_owner(db):
+    user = User(username="stats", email="stats@example.com", first_name="S", last_name="")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def test_streak_runs_merge_and_split():
+    db = TestingSessionLocal()
+    try:
+        owner_id = _make_owner(db)
+        for n in (5, 3, 4, 1):
+            update_stats(db, owner_id, added=[stat_row(TODAY - timedelta(days=n), None, None)])
+        runs = db.execute(select(streak_runs.c.start_day, streak_runs.c.end_day)).all()
+        assert sorted(runs) == [
+            (TODAY - timedelta(days=5), TODAY - timedelta(days=3)),
+            (TODAY - timedelta(days=1), TODAY - timedelta(days=1)),
+        ]
+        assert db.execute(select(user_stats.c.longest_streak)).scalar() == 3
+
+        update_stats(db, owner_id, removed=[stat_row(TODAY - timedelta(days=4), None, None)])
+        assert db.execute(select(user_stats.c.longest_streak)).scalar() == 1
+        assert db.execute(select(user_stats.c.total_entries)).scalar() == 3
+    finally:
+        db.close()
+
+
+def test_incremental_stats_match_rebuild(client, auth_headers, seed_posts):
+    """Random creates, edits and deletes through the API leave the same rollups a rebuild would."""
+    rng = random.Random(7)
+    seed_posts(auth_headers, [rng.randrange(20) for _ in range(30)], mood="good", tags="seed")
+    post_ids = [p["id"] for p in client.get("/api/posts/", headers=auth_headers).json()]
+    for _ in range(40):
+        action = rng.choice(["create", "update", "delete"])
+        if action == "create" or not post_ids:
+            r = client.post("/api/posts/", json={
+                "content": "new", "mood": rng.choice([None, "good", "low"]),
+                "tags": rng.choice(["", "a", "a,b"]),
+            }, headers=auth_headers)
+            post_ids.append(r.json()["id"])
+        elif action == "update":
+            client.put(f"/api/posts/{rng.choice(post_ids)}", json={
+                "mood": rng.choice([None, "good", "low"]), "tags": rng.choice(["", "b", "seed,c"]),
+            }, headers=auth_headers)
+        else:
+            post_id = post_ids.pop(rng.randrange(len(post_ids)))
+            client.delete(f"/api/posts/{post_id}", headers=auth_headers)
+    client.post("/api/posts/bulk", json=[
+        {"content": "imported", "date_posted": (TODAY - timedelta(days=n)).isoformat(), "mood": "ok"}
+        for n in (25, 26, 26)
+    ], headers=auth_headers)
+
+    owner_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    db = TestingSessionLocal()
+    try:
+        incremental = _snapshot(db, owner_id)
+        rebuild_stats(db, owner_id)
+        assert _snapshot(db, owner_id) == incremental
+    finally:
+        db.close()
+
+
+def test_bulk_import_statements_dont_grow_with_days(client, auth_headers, count_queries):
+    def import_days(days):
+        entries = [
+            {"content": "imported", "date_posted": (TODAY - timedelta(days=n)).isoformat(), "mood": "ok"}
+            for n in days
+        ]
+        with count_queries() as queries:
+            assert client.post("/api/posts/bulk", json=entries, headers=auth_headers).json()["inserted"] == 40
+        return len(queries)
+
+    client.get("/api/auth/me", headers=auth_headers)  # warm the user cache for both
+    # Forty entries on one day, then forty on forty scattered days.
+    assert import_days([100] * 40) == import_days(range(200, 280, 2))
+    stats = client.get("/api/analytics/summary", headers=auth_headers).json()
+    assert stats["totalEntries"] == 80
+
+
+def test_rebuild_command_repairs_drift(client, auth_headers, seed_posts, monkeypatch):
+    import database
+
+    seed_posts(auth_headers, [0, 1, 2], mood="good")
+    owner_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    db = TestingSessionLocal()
+    try:
+        db.execute(user_stats.update().values(total_entries=99, longest_streak=0))
+        db.execute(user_day_counts.delete())
+        db.commit()
+    finally:
+        db.close()
+
+    monkeypatch.setattr(database, "SessionLocal", TestingSessionLocal)
+    main(["rebuild", "--user", str(owner_id)])
+
+    data = client.get("/api/analytics/summary", headers=auth_headers).json()
+    assert data["totalEntries"] == 3
+    assert data["longestStreak"] == data["currentStreak"] == 3
+    assert len(data["entryDates"]) == 3
+
+
+def test_summary_query_count_is_constant(client, auth_headers, seed_posts, count_queries):
+    seed_posts(auth_headers, [0])
+    with count_queries() as small:
+        client.get("/api/analytics/summary", headers=auth_headers)
+    seed_posts(auth_headers, list(range(40)), mood="good", tags="x")
+    with count_queries() as large:
+        client.get("/api/analytics/summary", headers=auth_headers)
+    assert len(small) == len(large)
+    assert not any("FROM posts" in q for q in large)
+
+
+def test_concurrent_writes_on_the_same_day(auth_headers):
+    import asyncio
+
+    import httpx
+
+    from tests.conftest import app
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(
+                client.post("/api/posts/", json={"content": f"burst {i}"}, headers=auth_headers)
+                for i in range(8)
+            ))
+        return [r.status_code for r in responses]
+
+    assert asyncio.run(burst()) == [200] * 8
+    db = TestingSessionLocal()
+    try:
+        assert db.execute(select(user_day_counts.c.entries)).scalar() == 8
+        assert db.execute(select(streak_runs.c.start_day, streak_runs.c.end_day)).all() == [(TODAY, TODAY)]
+    finally:
+        db.close()
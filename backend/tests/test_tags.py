@@ -0,0 +1,52 @@
+"""Tests for tag parsing and the normalized-tag backfill."""
+
+from models import Post, Tag, User
+from tags import backfill_tags
+from tests.conftest import TestingSessionLocal
+from utils import parse_tags
+
+
+def test_parse_tags_formats():
+    assert parse_tags("work, school ,family") == ["work", "school", "family"]
+    assert parse_tags("#work #school") == ["work", "school"]
+    assert parse_tags("work|school") == ["work", "school"]
+    assert parse_tags('["work", "school"]') == ["work", "school"]
+    assert parse_tags("a,a,b") == ["a", "b"]
+    assert parse_tags("") == []
+    assert parse_tags(None) == []
+
+
+def test_parse_tags_mixed_separators():
+    assert parse_tags("a, #b") == ["a", "b"]
+    assert parse_tags("#a,#b | c") == ["a", "b", "c"]
+    assert parse_tags('["a", "#b,c"]') == ["a", "b", "c"]
+
+
+def test_parse_tags_empty_json_array():
+    assert parse_tags("[]") == []
+    assert parse_tags(" [ ] ") == []
+
+
+def test_backfill_normalizes_legacy_tag_strings():
+    db = TestingSessionLocal()
+    try:
+        user = User(username="legacy", email="legacy@example.com", first_name="L", last_name="")
+        db.add(user)
+        db.commit()
+        db.add_all([
+            Post(content="one", owner_id=user.id, tags="#walk #sleep"),
+            Post(content="two", owner_id=user.id, tags="walk|read"),
+            Post(content="three", owner_id=user.id, tags=" "),
+        ])
+        db.commit()
+
+        assert backfill_tags(db) == 3
+        assert backfill_tags(db) == 0
+
+        assert sorted(t.name for t in db.query(Tag)) == ["read", "sleep", "walk"]
+        posts = {p.content: p for p in db.query(Post)}
+        assert posts["one"].tags == "walk,sleep"
+        assert sorted(t.name for t in posts["two"].tag_list) == ["read", "walk"]
+        assert posts["three"].tags is None
+    finally:
+        db.close()
@@ -0,0 +1,40 @@
+"""Tests for the shared helpers in utils.py."""
+
+import asyncio
+
+import pytest
+
+from utils import run_periodically
+
+
+def test_run_periodically_survives_failures(caplog):
+    calls = []
+
+    async def tick():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        if len(calls) == 3:
+            raise asyncio.CancelledError
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(run_periodically("Ticking", tick, 0))
+    assert calls == [0, 1, 2]
+    assert "Ticking failed" in caplog.text
+
+
+def test_run_periodically_can_wait_first(monkeypatch):
+    events = []
+
+    async def sleep(seconds):
+        events.append(("sleep", seconds))
+        if len(events) > 2:
+            raise asyncio.CancelledError
+
+    async def tick():
+        events.append("tick")
+
+    monkeypatch.setattr("utils.asyncio.sleep", sleep)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(run_periodically("Ticking", tick, 5, wait_first=True))
+    assert events == [("sleep", 5), "tick", ("sleep", 5)]
@@ -1,5 +1,24 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import re
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import UTC, datetime
+
 from passlib.context import CryptContext
 
+logger = logging.getLogger(__name__)
+
+
+def utcnow() -> datetime:
+    """The current UTC time as a naive datetime, the form DateTime columns store."""
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(password: str):
@@ -7,3 +26,111 @@ def hash_password(password: str):
 
 def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
+
+
+class HashingBusy(Exception):
+    """Raised when too many hash/verify calls are already queued."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a bounded process pool so a burst of logins can't tie up
+    the event loop or the request threadpool. At most `max_pending` calls
+    may be queued or running; beyond that callers get HashingBusy straight
+    away rather than waiting behind the backlog. `workers=0` hashes on the
+    default thread executor instead of in separate processes.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self.workers and self._executor is None:
+            # spawn, not fork: the server process has threads running.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise HashingBusy()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        except BrokenProcessPool:
+            self._executor = None
+            raise
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "2"))
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
+def parse_tags(tags: str | None) -> list[str]:
+    """
+    Split a free-text tags value into individual tag names.
+
+    Accepts the formats the frontend has historically sent: "a, b",
+    "#a #b", "a|b", any mix of those, and JSON arrays like '["a","b"]'.
+    Commas, pipes and whitespace all separate tags, so no name can contain
+    the comma that joins them in storage. Order is kept and duplicates are
+    dropped; an empty JSON array means no tags.
+    """
+    if not tags:
+        return []
+
+    trimmed = tags.strip()
+    chunks = [trimmed]
+    if trimmed.startswith("[") and trimmed.endswith("]"):
+        try:
+            parsed = json.loads(trimmed)
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, list):
+            chunks = [str(t) for t in parsed]
+
+    names = (
+        token.lstrip("#")
+        for chunk in chunks
+        for token in re.split(r"[,|\s]+", chunk)
+    )
+    return list(dict.fromkeys(t for t in names if t))
+
+
+async def run_periodically(
+    name: str, fn: Callable[[], Awaitable[object]], interval: float, *, wait_first: bool = False
+) -> None:
+    """
+    Await `fn` every `interval` seconds until cancelled, sleeping first when
+    `wait_first` is set. A failed run is logged as "`name` failed" and
+    retried on the next tick rather than ending the task.
+    """
+    if wait_first:
+        await asyncio.sleep(interval)
+    while True:
+        try:
+            await fn()
+        except Exception:
+            logger.exception("%s failed", name)
+        await asyncio.sleep(interval)
@@ -2,9 +2,12 @@ import React from 'react';
 
 interface WritingStreakProps {
   entryDates: string[];
+  // Precomputed by /api/analytics/summary; when present they are used as-is.
+  currentStreak?: number;
+  longestStreak?: number;
 }
 
-const WritingStreak: React.FC<WritingStreakProps> = ({ entryDates }) => {
+const WritingStreak: React.FC<WritingStreakProps> = ({ entryDates, currentStreak, longestStreak }) => {
   // Calculate streaks
   const calculateStreaks = (dates: string[]) => {
     if (!dates || !Array.isArray(dates) || dates.length === 0) {
@@ -90,7 +93,10 @@ const WritingStreak: React.FC<WritingStreakProps> = ({ entryDates }) => {
     return calendarData;
   };
 
-  const streaks = calculateStreaks(entryDates || []);
+  const streaks =
+    currentStreak !== undefined && longestStreak !== undefined
+      ? { current: currentStreak, longest: longestStreak }
+      : calculateStreaks(entryDates || []);
   const calendarData = generateCalendarData();
   const totalEntries = entryDates && Array.isArray(entryDates) ? new Set(entryDates).size : 0;
 
@@ -2,10 +2,13 @@ import React, { useMemo } from 'react';
 import { Card, CardContent, CardHeader, CardTitle } from './card';
 import { AreaChart, Area, BarChart, Bar, PieChart, Pie, Cell, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 import { JournalEntry } from '@/hooks/useJournalEntries';
+import { TagCount } from '@/services/analyticsService';
 import { TrendingUp, TrendingDown, Calendar, Heart, Brain, Target, Tag, Flame } from 'lucide-react';
 
 interface MoodAnalyticsProps {
   entries: JournalEntry[];
+  // Server-side tag totals; when given they replace the counts taken from `entries`.
+  tagCounts?: TagCount[];
 }
 
 const moodValues = {
@@ -32,7 +35,7 @@ const moodLabels = {
   difficult: 'Difficult'
 };
 
-export const MoodAnalytics = ({ entries }: MoodAnalyticsProps) => {
+export const MoodAnalytics = ({ entries, tagCounts }: MoodAnalyticsProps) => {
   const analytics = useMemo(() => {
     if (!entries.length) return null;
 
@@ -131,7 +134,9 @@ export const MoodAnalytics = ({ entries }: MoodAnalyticsProps) => {
         tagCountsMap[tag] = (tagCountsMap[tag] || 0) + 1;
       });
     });
-    const tagUsage = Object.entries(tagCountsMap)
+    const tagUsage = (tagCounts
+      ? tagCounts.map(({ name, count }) => [name, count] as [string, number])
+      : Object.entries(tagCountsMap))
       .sort((a, b) => b[1] - a[1])
       .slice(0, 8)
       .map(([tag, count]) => ({ tag, count }));
@@ -185,7 +190,7 @@ export const MoodAnalytics = ({ entries }: MoodAnalyticsProps) => {
       bestDay,
       topTag,
     };
-  }, [entries]);
+  }, [entries, tagCounts]);
 
   if (!analytics) {
     return (
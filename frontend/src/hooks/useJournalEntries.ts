@@ -1,5 +1,5 @@
 import { useState, useEffect } from "react";
-import { apiFetch } from "../lib/api";
+import { apiFetch, apiFetchPage } from "../lib/api";
 import { useToast } from "./use-toast";
 import { useAuth } from "./useAuth";
 
@@ -44,16 +44,30 @@ function mapPost(post: any): JournalEntry {
   };
 }
 
+// Search hits carry a highlighted snippet rather than the whole post, so the
+// entry shows the snippet's text in place of the content.
+function mapSearchHit(hit: any): JournalEntry {
+  const text =
+    new DOMParser().parseFromString(hit.snippet ?? "", "text/html").body
+      .textContent ?? "";
+  return { ...mapPost(hit), title: text.slice(0, 60), content: text };
+}
+
+const PAGE_SIZE = 20;
+
 export function useJournalEntries() {
   const [entries, setEntries] = useState<JournalEntry[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const { toast } = useToast();
   const { user } = useAuth();
 
   const fetchEntries = async () => {
     if (!user) {
       setEntries([]);
+      setNextCursor(null);
       setLoading(false);
       return;
     }
@@ -61,8 +75,9 @@ export function useJournalEntries() {
     try {
       setLoading(true);
       setError(null);
-      const data = await apiFetch<any[]>("/api/posts/");
-      setEntries((data || []).map(mapPost));
+      const page = await apiFetchPage<any>("/api/posts/", PAGE_SIZE);
+      setEntries(page.items.map(mapPost));
+      setNextCursor(page.nextCursor);
     } catch (err) {
       const errorMessage =
         err instanceof Error ? err.message : "Failed to fetch entries";
@@ -77,6 +92,35 @@ export function useJournalEntries() {
     }
   };
 
+  // Appends the next page to the list; a no-op once the last page is in.
+  const loadMore = async () => {
+    if (!user || !nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const page = await apiFetchPage<any>("/api/posts/", PAGE_SIZE, nextCursor);
+      setEntries((prev) => [...prev, ...page.items.map(mapPost)]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      toast({
+        title: "Error",
+        description: err instanceof Error ? err.message : "Failed to fetch entries",
+        variant: "destructive",
+      });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Full-text search runs server-side over the whole journal, not just the
+  // pages loaded so far.
+  const searchEntries = async (query: string): Promise<JournalEntry[]> => {
+    if (!user || !query.trim()) return [];
+    const hits = await apiFetch<any[]>(
+      `/api/posts/search?${new URLSearchParams({ q: query.trim() })}`
+    );
+    return (hits || []).map((hit) => mapSearchHit({ ...hit, owner: user }));
+  };
+
   const createEntry = async (entry: {
     title: string;
     content: string;
@@ -205,6 +249,10 @@ export function useJournalEntries() {
     createEntry,
     updateEntry,
     deleteEntry,
+    loadMore,
+    loadingMore,
+    hasMore: nextCursor !== null,
+    searchEntries,
     refreshEntries: fetchEntries,
   };
 }
@@ -29,3 +29,53 @@ export async function apiFetch<T = any>(path: string, options: RequestInit = {})
 
   return data as T;
 }
+
+// Fetches one page of a keyset-paginated listing. `nextCursor` is the
+// X-Next-Cursor header, or null on the last page.
+export async function apiFetchPage<T = any>(
+  path: string,
+  pageSize: number,
+  cursor: string | null = null
+): Promise<{ items: T[]; nextCursor: string | null }> {
+  const token = localStorage.getItem("access_token");
+  const params = new URLSearchParams({ limit: String(pageSize) });
+  if (cursor) params.set("cursor", cursor);
+  const separator = path.includes("?") ? "&" : "?";
+
+  const res = await fetch(`${BASE_URL}${path}${separator}${params}`, {
+    headers: {
+      "Content-Type": "application/json",
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+  });
+
+  const text = await res.text();
+  const data = text ? JSON.parse(text) : null;
+
+  if (!res.ok) {
+    throw new Error(data?.detail || `Request failed: ${res.status}`);
+  }
+
+  return { items: (data || []) as T[], nextCursor: res.headers.get("X-Next-Cursor") };
+}
+
+// Fetches a (possibly streamed) response as a Blob, e.g. for file downloads.
+export async function apiDownload(path: string, options: RequestInit = {}): Promise<Blob> {
+  const token = localStorage.getItem("access_token");
+
+  const res = await fetch(`${BASE_URL}${path}`, {
+    ...options,
+    headers: {
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      ...(options.headers || {}),
+    },
+  });
+
+  if (!res.ok) {
+    const text = await res.text();
+    const data = text ? JSON.parse(text) : null;
+    throw new Error(data?.detail || `Request failed: ${res.status}`);
+  }
+
+  return res.blob();
+}
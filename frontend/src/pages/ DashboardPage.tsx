@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Button } from '../components/ui/button';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Badge } from '../components/ui/badge';
@@ -8,9 +8,10 @@ import { CreateJournal } from '../components/ui/create-journal';
 import { SimpleJournalCard } from '../components/ui/simple-journal-card';
 import { DashboardHeader } from '../components/layout/dashboard-header';
 import { MoodAnalytics } from '../components/ui/mood-analytics';
-import { useJournalEntries } from '../hooks/useJournalEntries';
+import { JournalEntry, useJournalEntries } from '../hooks/useJournalEntries';
 import { useAuth } from '../hooks/useAuth';
 import { apiFetch } from '../lib/api';
+import { AnalyticsData, entriesFromSummary, getAnalyticsData } from '../services/analyticsService';
 import {
   TrendingUp,
   Calendar,
@@ -47,17 +48,72 @@ const moodColors = {
 
  const DashboardPage = () => {
   const { user, loading: authLoading } = useAuth();
-  const { entries, loading: entriesLoading, createEntry, updateEntry, deleteEntry } = useJournalEntries();
+  const {
+    entries,
+    loading: entriesLoading,
+    createEntry,
+    updateEntry,
+    deleteEntry,
+    loadMore,
+    loadingMore,
+    hasMore,
+    searchEntries,
+  } = useJournalEntries();
   const [currentPrompt, setCurrentPrompt] = useState("What's on your mind today?");
 
   useEffect(() => {
-    apiFetch<{ content: string }>('/api/prompts/prompt-of-the-day')
+    // Ask for the prompt of the user's own day, not the server's.
+    const tz = Intl.DateTimeFormat().resolvedOptions().timeZone;
+    apiFetch<{ content: string }>(
+      `/api/prompts/prompt-of-the-day${tz ? `?${new URLSearchParams({ tz })}` : ''}`
+    )
       .then(data => setCurrentPrompt(data.content))
       .catch(() => {}); // silently keep the fallback
   }, []);
   const [activeTab, setActiveTab] = useState<"entries" | "analytics" | "resources">("entries");
   const [showCreateForm, setShowCreateForm] = useState(false);
   const [searchQuery, setSearchQuery] = useState("");
+  const [searchResults, setSearchResults] = useState<JournalEntry[]>([]);
+  const [summary, setSummary] = useState<AnalyticsData | null>(null);
+
+  // Totals, streaks and charts come from the server-side summary, so only the
+  // first page of entries is ever downloaded up front.
+  const refreshSummary = () => {
+    getAnalyticsData()
+      .then(setSummary)
+      .catch(() => {}); // keep the previous figures
+  };
+
+  useEffect(() => {
+    if (user) refreshSummary();
+  }, [user]);
+
+  // Pull in the next page as the bottom of the list scrolls into view.
+  const loadMoreRef = useRef<HTMLDivElement | null>(null);
+  useEffect(() => {
+    const node = loadMoreRef.current;
+    if (!node || !hasMore) return;
+    const observer = new IntersectionObserver(([entry]) => {
+      if (entry.isIntersecting) loadMore();
+    });
+    observer.observe(node);
+    return () => observer.disconnect();
+  }, [hasMore, loadMore, searchQuery, activeTab]);
+
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults([]);
+      return;
+    }
+    const timer = setTimeout(() => {
+      searchEntries(query)
+        .then(setSearchResults)
+        .catch(() => setSearchResults([]));
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
+
   const handleCreateEntry = async (newEntry: { title: string; content: string; isPrivate: boolean; isAnonymous: boolean; mood: 'great' | 'good' | 'okay' | 'low' | 'difficult'; hashtags: string[] }) => {
     await createEntry({
       title: newEntry.title,
@@ -67,14 +123,17 @@ const moodColors = {
       hashtags: newEntry.hashtags
     });
     setShowCreateForm(false);
+    refreshSummary();
   };
 
   const handleUpdateEntry = async (id: string, updates: any) => {
     await updateEntry(id, updates);
+    refreshSummary();
   };
 
   const handleDeleteEntry = async (id: string) => {
     await deleteEntry(id);
+    refreshSummary();
   };
 
   // Show loading spinner while auth is loading
@@ -100,80 +159,19 @@ const moodColors = {
 
   const userName = `${user.first_name} ${user.last_name}`.trim() || user.username;
 
-  // Calculate actual streak based on journal entries
-  const calculateStreak = (journalEntries: any[]) => {
-    if (!journalEntries.length) return 0;
-
-    const today = new Date();
-    today.setHours(0, 0, 0, 0);
-
-    // Get unique dates with entries (sorted newest first)
-    const entryDates = [...new Set(journalEntries.map(entry => {
-      const date = new Date(entry.created_at);
-      date.setHours(0, 0, 0, 0);
-      return date.getTime();
-    }))].sort((a: number, b: number) => b - a);
-
-    if (!entryDates.length) return 0;
-
-    let streak = 0;
-    let currentDate = today.getTime();
-
-    // Check if there's an entry today or yesterday (to account for different time zones)
-    const mostRecentEntry = entryDates[0];
-    const yesterday = new Date(today);
-    yesterday.setDate(yesterday.getDate() - 1);
-
-    if (mostRecentEntry === today.getTime()) {
-      // Entry today
-      streak = 1;
-      currentDate = today.getTime();
-    } else if (mostRecentEntry === yesterday.getTime()) {
-      // Entry yesterday, start from yesterday
-      streak = 1;
-      currentDate = yesterday.getTime();
-    } else {
-      // No recent entries, streak is 0
-      return 0;
-    }
-
-    // Count consecutive days backwards
-    for (let i = 1; i < entryDates.length; i++) {
-      const prevDay = new Date(currentDate);
-      prevDay.setDate(prevDay.getDate() - 1);
-
-      if (entryDates[i] === prevDay.getTime()) {
-        streak++;
-        currentDate = prevDay.getTime();
-      } else {
-        break;
-      }
-    }
-
-    return streak;
-  };
-
-  const userStreak = calculateStreak(entries);
-
-  // Filter entries based on search query
-  const filteredEntries = entries.filter(entry => {
-    if (!searchQuery.trim()) return true;
-
-    const query = searchQuery.toLowerCase();
-    const titleMatch = entry.title?.toLowerCase().includes(query);
-    const contentMatch = entry.content?.toLowerCase().includes(query);
-    const hashtagMatch = entry.hashtags?.some(tag => tag.toLowerCase().includes(query));
+  const userStreak = summary?.currentStreak ?? 0;
 
-    return titleMatch || contentMatch || hashtagMatch;
-  });
+  // Search results are read-only snippets; the list otherwise shows the
+  // loaded pages.
+  const filteredEntries = searchQuery.trim() ? searchResults : entries;
 
-  const totalEntries = entries.length;
-  const thisWeekEntries = entries.filter(entry => {
-    const entryDate = new Date(entry.created_at);
-    const weekAgo = new Date();
-    weekAgo.setDate(weekAgo.getDate() - 7);
-    return entryDate > weekAgo;
-  }).length;
+  const totalEntries = summary?.totalEntries ?? entries.length;
+  const weekAgo = new Date();
+  weekAgo.setDate(weekAgo.getDate() - 7);
+  const weekAgoStr = weekAgo.toISOString().split('T')[0];
+  const thisWeekEntries = (summary?.moodOverTime ?? [])
+    .filter(point => point.date > weekAgoStr)
+    .reduce((sum, point) => sum + point.count, 0);
 
   const streakProgress = Math.min((userStreak / 30) * 100, 100);
 
@@ -324,7 +322,7 @@ const moodColors = {
                             Found {filteredEntries.length} {filteredEntries.length === 1 ? 'entry' : 'entries'} matching "{searchQuery}"
                           </div>
                         )}
-                        {filteredEntries.slice(0, searchQuery ? 10 : 5).map((entry) => (
+                        {filteredEntries.map((entry) => (
                           <SimpleJournalCard
                             key={entry.id}
                             entry={{
@@ -334,13 +332,15 @@ const moodColors = {
                             }}
                             onEdit={handleUpdateEntry}
                             onDelete={handleDeleteEntry}
-                            showManagement={true}
+                            showManagement={!searchQuery.trim()}
                             avatarUrl={null}
                           />
                         ))}
-                        {!searchQuery && entries.length > 5 && (
-                          <div className="text-center pt-4">
-                            <Button variant="outline">View All Entries</Button>
+                        {!searchQuery && hasMore && (
+                          <div ref={loadMoreRef} className="text-center pt-4">
+                            <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+                              {loadingMore ? 'Loading...' : 'Load More Entries'}
+                            </Button>
                           </div>
                         )}
                       </div>
@@ -378,7 +378,10 @@ const moodColors = {
 
             {activeTab === "analytics" && (
               <div className="space-y-6">
-                <MoodAnalytics entries={entries} />
+                <MoodAnalytics
+                  entries={summary ? entriesFromSummary(summary) : []}
+                  tagCounts={summary?.tagCounts}
+                />
               </div>
             )}
 
@@ -10,7 +10,7 @@ import { Avatar, AvatarFallback } from '@/components/ui/avatar';
 import { ThemeCustomizer } from '@/components/ui/theme-customizer';
 import { useAuth } from '@/hooks/useAuth';
 import { useToast } from '@/hooks/use-toast';
-import { apiFetch } from '@/lib/api';
+import { apiDownload, apiFetch } from '@/lib/api';
 
 import { useNavigate } from 'react-router-dom';
 import { useTheme } from '@/components/ui/theme-provider';
@@ -741,8 +741,7 @@ const AccountSettingsPage: React.FC<{ onBack: () => void }> = ({ onBack }) => {
   const handleExportData = async () => {
     try {
       setLoading(true);
-      const data = await apiFetch('/api/posts/');
-      const blob = new Blob([JSON.stringify(data || [], null, 2)], { type: 'application/json' });
+      const blob = await apiDownload('/api/posts/export?format=json&gzip=true');
       const url = URL.createObjectURL(blob);
       const a = document.createElement('a');
       a.href = url;
@@ -751,8 +750,7 @@ const AccountSettingsPage: React.FC<{ onBack: () => void }> = ({ onBack }) => {
       a.click();
       a.remove();
       URL.revokeObjectURL(url);
-      const count = Array.isArray(data) ? data.length : 0;
-      toast({ title: "Export complete", description: `Downloaded ${count} entries.` });
+      toast({ title: "Export complete", description: "Your journal has been downloaded." });
     } catch (e: any) {
       toast({ title: "Export failed", description: e?.message || "Unable to export data.", variant: "destructive" });
     } finally {